@@ -1,34 +1,79 @@
+import asyncio
+import importlib.util
+import math
+from typing import Any, Dict
+import orjson
 from fastapi import APIRouter, HTTPException
-from ..domain.agent_state import ChatRequest, ChatResponse, MapData
-from ..services.agent_service import invoke_agent_service
-import requests
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from ..domain.agent_state import ChatRequest, ChatResponse
+from ..services.agent_service import ainvoke_agent_service, astream_agent_service
+from ..services.geometry import shape_map_data
+from ..services.images import ImageValidationError
+from ..services.aqi_services import aqi_cache_stats
+from ..services.geocoding import geocode_cache_stats
+from ..services.google_maps import maps_cache_stats
+from ..services.intent_router import fast_path_stats
+from ..services.response_cache import response_cache_stats
+from ..services import health, metrics
+from ..services.resilience import UpstreamUnavailable
 from ..core.config import settings
 
 router = APIRouter()
 
 
-@router.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest):
+def _shape_for_request(request: ChatRequest, map_data: dict | None) -> dict | None:
+    """Applies the client's requested route geometry options to a map payload."""
+    with metrics.span("polyline", "shape"):
+        return shape_map_data(map_data, zoom=request.map_zoom, max_points=request.max_route_points,
+                              route_format=request.route_format, lods=request.route_lods)
+
+
+def _json_response(payload: Dict[str, Any]) -> Response:
     """
-    Processes a user's geographical query using the LangGraph agent.
+    Serializes a `ChatResponse`-shaped dict in one orjson pass (route `coords`
+    straight from their NumPy array), timed as its own stage.
+    """
+    with metrics.span("serialize", "chat_response"):
+        return ORJSONResponse(payload)
+
+
+def _ndjson(event: Dict[str, Any]) -> bytes:
+    return orjson.dumps(event, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE)
+
+
+def _retry_after(error: UpstreamUnavailable) -> dict:
+    return {"Retry-After": str(max(1, math.ceil(error.retry_after)))}
+
+
+async def _run_chat(request: ChatRequest, image_bytes: bytes | None = None) -> Dict[str, Any]:
+    """
+    Runs the agent for a chat request and builds the response payload. The map
+    data is the tools' own dict after the geometry stage; it is not re-validated.
     """
     try:
 
-        result = invoke_agent_service(
+        result = await ainvoke_agent_service(
             query=request.query,
             location=request.location,
-            image_b64=request.image
+            image_b64=request.image,
+            session_id=request.session_id,
+            image_bytes=image_bytes
         )
 
-        # Safely parse map data
         final_map_data = None
         if result.get("map_data"):
-            final_map_data = MapData(**result["map_data"])
+            final_map_data = _shape_for_request(request, result["map_data"])
 
-        return ChatResponse(
-            response_text=result["response_text"],
-            map_data=final_map_data
-        )
+        return {
+            "response_text": result["response_text"],
+            "map_data": final_map_data,
+            "session_id": result["session_id"]
+        }
+    except ImageValidationError as ie:
+        raise HTTPException(status_code=ie.status_code, detail=str(ie))
+    except UpstreamUnavailable as ue:
+        # Rate limit, quota or open circuit: fail fast and tell the client when to come back
+        raise HTTPException(status_code=503, detail=str(ue), headers=_retry_after(ue))
     except ValueError as ve:
         # To catch explicit validation errors (e.g., missing API key)
         raise HTTPException(status_code=503, detail=str(ve))
@@ -37,29 +82,123 @@ async def chat_endpoint(request: ChatRequest):
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
 
-@router.get("/health")
-async def health_check():
+@router.post("/chat", response_model=ChatResponse)
+async def chat_endpoint(request: ChatRequest):
     """
-    Standard health check for orchestration (Docker/K8s).
-    Checks connectivity to external dependencies.
+    Processes a user's geographical query using the LangGraph agent.
     """
-    health_status = {
-        "status": "healthy",
-        "dependencies": {
-            "google_maps_api": "unknown",
-            "gemini_api": "ok" if settings.GEMINI_API_KEY else "missing"
-        }
-    }
+    return _json_response(await _run_chat(request))
+
 
+# Multipart needs python-multipart; without it FastAPI refuses to register form routes
+if importlib.util.find_spec("python_multipart") or importlib.util.find_spec("multipart"):
+    from fastapi import File, Form, UploadFile
+
+    @router.post("/chat/upload", response_model=ChatResponse)
+    async def chat_upload_endpoint(query: str = Form(...), lat: float = Form(...), lng: float = Form(...),
+                                   session_id: str | None = Form(None), image: UploadFile | None = File(None)):
+        """
+        Same as /chat, but takes the photo as a multipart file instead of base64 in JSON.
+        """
+        image_bytes = None
+        if image is not None:
+            image_bytes = await image.read(settings.IMAGE_MAX_BYTES + 1)
+            if len(image_bytes) > settings.IMAGE_MAX_BYTES:
+                raise HTTPException(status_code=413, detail="Image too large.")
+
+        request = ChatRequest(query=query, location={"lat": lat, "lng": lng}, session_id=session_id)
+        return _json_response(await _run_chat(request, image_bytes=image_bytes))
+
+
+@router.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Streaming variant of /chat. Returns newline-delimited JSON events: tool starts,
+    map data as soon as the Maps tool returns, LLM tokens, and a final 'done' event.
+    """
     try:
-        res = requests.get("https://maps.googleapis.com/maps/api/staticmap", timeout=2)
-        health_status["dependencies"]["google_maps_api"] = "reachable" if res.status_code == 200 else "error"
-    except Exception:
-        health_status["dependencies"]["google_maps_api"] = "unreachable"
+        # Validating the photo decodes and resizes it; keep that CPU work off the event loop
+        events = await asyncio.to_thread(
+            astream_agent_service,
+            query=request.query,
+            location=request.location,
+            image_b64=request.image,
+            session_id=request.session_id
+        )
+    except ImageValidationError as ie:
+        raise HTTPException(status_code=ie.status_code, detail=str(ie))
+    except ValueError as ve:
+        raise HTTPException(status_code=503, detail=str(ve))
+
+    async def ndjson():
+        try:
+            async for event in events:
+                if event.get("map_data"):
+                    event["map_data"] = _shape_for_request(request, event["map_data"])
+                with metrics.span("serialize", "stream_event"):
+                    line = _ndjson(event)
+                yield line
+        except UpstreamUnavailable as ue:
+            yield _ndjson({"type": "error", "detail": str(ue), "retry_after": _retry_after(ue)["Retry-After"]})
+        except Exception as e:
+            print(f"Error in chat stream: {e}")
+            yield _ndjson({"type": "error", "detail": "Internal Server Error"})
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@router.get("/cache/stats")
+async def cache_stats():
+    """
+    Hit rates and sizes of the response, Maps, geocode and AQI caches, plus fast-path counts.
+    """
+    return {
+        "responses": response_cache_stats(),
+        "fast_path": fast_path_stats(),
+        "maps": maps_cache_stats(),
+        "geocode": geocode_cache_stats(),
+        "aqi": aqi_cache_stats(),
+    }
+
+
+@router.get("/metrics")
+async def metrics_endpoint():
+    """
+    Prometheus scrape target: per-stage latency histograms, request counts,
+    LLM calls and tokens by role, upstream and cache counters.
+    """
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
-    if health_status["dependencies"]["google_maps_api"] == "unreachable" or not settings.GEMINI_API_KEY:
-        health_status["status"] = "unhealthy"
+
+@router.get("/livez")
+async def liveness():
+    """
+    Liveness probe: the process is up and serving. Does no I/O.
+    """
+    return {"status": "alive"}
+
+
+@router.get("/readyz")
+async def readiness():
+    """
+    Readiness probe, served from the background health checker's last results:
+    503 until startup completes or while a required dependency is down.
+    """
+    snapshot = health.checker.snapshot()
+    if not snapshot["ready"]:
+        raise HTTPException(status_code=503, detail=snapshot)
+    return snapshot
+
+
+@router.get("/health")
+async def health_check():
+    """
+    Standard health check for orchestration (Docker/K8s). Reports the cached
+    status of external dependencies; never calls them.
+    """
+    snapshot = health.checker.snapshot()
+    health_status = {"status": "healthy" if snapshot["ready"] else "unhealthy", **snapshot}
+    if not snapshot["ready"]:
         # Return a 503 so Docker knows the service is degraded
         raise HTTPException(status_code=503, detail=health_status)
-
     return health_status
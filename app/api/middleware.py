@@ -0,0 +1,45 @@
+"""
+ASGI middleware that times every request.
+
+It opens the per-request span breakdown (see `services.metrics`), records the
+request count and latency per route template, and adds a `Server-Timing`
+header listing the slowest stages and the LLM tokens used. For streaming
+responses the header can only cover the work done before the first byte; the
+latency histogram still covers the full stream.
+"""
+import time
+
+from ..core.config import settings
+from ..services import metrics
+
+
+class TimingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        token = metrics.begin_request()
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if settings.SERVER_TIMING_ENABLED:
+                    header = metrics.server_timing(metrics.current_timings(), time.perf_counter() - start)
+                    message.setdefault("headers", [])
+                    message["headers"] = [*message["headers"], (b"server-timing", header.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.end_request(token)
+            route = getattr(scope.get("route"), "path", "unmatched")
+            metrics.REQUESTS.inc(route=route, method=scope["method"], status=status)
+            metrics.REQUEST_SECONDS.observe(elapsed, route=route)
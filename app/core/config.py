@@ -14,11 +14,146 @@ class Settings(BaseSettings):
     # Maps Settings
     MAPS_API_KEY: str = os.environ.get("MAPS_API_KEY", "YOUR_MAPS_API_KEY_HERE")
     MAPS_MOCK_ENABLED: bool = MAPS_API_KEY == "YOUR_MAPS_API_KEY_HERE"
+    MAPS_BASE_URL: str = "https://maps.googleapis.com/maps/api/"
+    AIR_QUALITY_BASE_URL: str = "https://airquality.googleapis.com/v1/"
+
+    # Outbound HTTP (shared pool for all Google API calls)
+    HTTP_TIMEOUT_SECONDS: float = 10.0
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 3.0
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = 20
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    HTTP_MAX_RETRIES: int = 2
+    HTTP_BACKOFF_BASE_SECONDS: float = 0.2
+    HTTP_BACKOFF_MAX_SECONDS: float = 2.0
+
+    # Geocode cache (normalized address -> coordinates)
+    GEOCODE_CACHE_MAX_ENTRIES: int = 5000
+    GEOCODE_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    GEOCODE_NEGATIVE_TTL_SECONDS: int = 3600
+    GEOCODE_CACHE_DB_PATH: str = ""  # e.g. "geocode_cache.sqlite3"; empty keeps the cache in memory only
+
+    # AQI cache (readings shared per grid cell within the freshness window)
+    AQI_CACHE_TTL_SECONDS: int = 15 * 60
+    AQI_CACHE_CELL_DEGREES: float = 0.005  # ~550 m of latitude
+    AQI_CACHE_MAX_CELLS: int = 10000
+
+    # Directions / Places response cache
+    MAPS_DIRECTIONS_CACHE_TTL_SECONDS: int = 5 * 60
+    MAPS_PLACES_CACHE_TTL_SECONDS: int = 60 * 60
+    MAPS_CACHE_COORD_DECIMALS: int = 3  # ~110 m; origins closer than this share a cached route
+    MAPS_CACHE_MAX_ENTRIES: int = 2000
+    MAPS_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+
+    # Nearby results ranked by driving time (one Distance Matrix call for all candidates, cached per origin cell)
+    NEARBY_ETA_RANKING: bool = False  # rank every nearby search; otherwise only when a time budget is given
+    NEARBY_MINUTES_PER_STAR: float = 5.0  # one rating star is worth this many minutes of driving
+    NEARBY_UNRATED_STARS: float = 3.5
+    NEARBY_MAX_TOP_K: int = 10
+
+    # Route geometry sent to the client
+    ROUTE_MAX_POINTS: int = 1000  # default vertex budget per route
+    ROUTE_SIMPLIFY_PIXELS: float = 1.0  # tolerance in screen pixels when a zoom level is requested
+    ROUTE_LOD_ZOOMS: list = [8, 11, 14]
+
+    # Tool execution (independent calls of one AI message run concurrently)
+    TOOL_MAX_CONCURRENCY: int = 4
+    TOOL_TIMEOUT_SECONDS: float = 20.0
+    TOOL_TIMEOUTS: dict = {"maps_api_search": 25.0, "plan_itinerary": 25.0}  # per-tool overrides
+
+    # Itinerary planning (one Distance Matrix call for all stops; 100 pairs max, so 9 stops plus the start)
+    ITINERARY_MAX_STOPS: int = 9
+
+    # Traffic tip enrichment on routes: "concurrent", "deferred" or "off"
+    TRAFFIC_TIP_MODE: str = "concurrent"
+    TRAFFIC_TIP_TIMEOUT_SECONDS: float = 1.5  # longest a route waits for its tip
+    TRAFFIC_TIP_CACHE_TTL_SECONDS: int = 30 * 60
+    TRAFFIC_TIP_CACHE_MAX_ENTRIES: int = 1000
+
+    # Conversation sessions: "memory", "sqlite", "postgres" or "redis"
+    CHECKPOINT_BACKEND: str = "memory"
+    CHECKPOINT_DB_URL: str = "checkpoints.sqlite3"  # file path for sqlite, connection URL otherwise
+    SESSION_MAX_THREADS: int = 1000
+    SESSION_TTL_SECONDS: int = 2 * 3600
+    SESSION_MAX_BYTES: int = 128 * 1024 * 1024
+    CHECKPOINTS_PER_THREAD: int = 2
+
+    # Conversation context sent to the LLM each turn
+    CONTEXT_MAX_TOKENS: int = 6000  # estimated budget for history + summary
+    CONTEXT_KEEP_TURNS: int = 4  # earlier turns kept as messages; older ones are summarized
+    CONTEXT_TOOL_RESULT_MAX_CHARS: int = 400  # earlier tool results are cut to this
+    CONTEXT_SUMMARY_MAX_CHARS: int = 2000
+    CONTEXT_SUMMARY_LINE_MAX_CHARS: int = 240
+
+    # Photo queries (downscaling needs Pillow; /chat/upload needs python-multipart)
+    IMAGE_MAX_BYTES: int = 10 * 1024 * 1024  # decoded upload size limit
+    IMAGE_MAX_DIMENSION: int = 1024  # long side after downscaling, in pixels
+    IMAGE_JPEG_QUALITY: int = 85
+    IMAGE_PREPARED_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    IMAGE_PLACE_CACHE_TTL_SECONDS: int = 30 * 24 * 3600
+    IMAGE_PLACE_CACHE_MAX_ENTRIES: int = 5000
+
+    # Fast path: simple queries ("AQI here", "route to X") answered without the LLM
+    FAST_PATH_ENABLED: bool = True
+    FAST_PATH_MIN_CONFIDENCE: float = 0.8
+
+    # Response cache for repeated queries (per query, intent kind and location cell)
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_TTLS: dict = {"aqi": 15 * 60, "route": 5 * 60, "nearby": 60 * 60, "general": 10 * 60}
+    RESPONSE_CACHE_CELL_DEGREES: float = 0.005  # ~550 m of latitude
+    RESPONSE_CACHE_MAX_ENTRIES: int = 5000
+    RESPONSE_CACHE_SEMANTIC: bool = True  # also reuse answers to similar queries in the same cell
+    RESPONSE_CACHE_SIMILARITY: float = 0.85  # cosine threshold for a similar-query hit
+    RESPONSE_CACHE_SIMILAR_PER_CELL: int = 64  # recent queries compared per cell and intent
+
+    # Dependency health (background checker behind /readyz and /health)
+    HEALTH_CHECK_ENABLED: bool = True
+    HEALTH_CHECK_INTERVAL_SECONDS: float = 30.0  # probe only if traffic has not shown the dependency healthy
+    HEALTH_CHECK_TIMEOUT_SECONDS: float = 3.0
+    HEALTH_CHECK_MAX_BACKOFF_SECONDS: float = 300.0
+    HEALTH_STALE_AFTER_SECONDS: float = 300.0  # failing for longer than this since the last success -> "down"
+    HEALTH_REQUIRED_DEPENDENCIES: list = ["gemini", "maps"]  # "down" here makes /readyz return 503
+
+    # Upstream protection: rate limits (calls/second), daily budgets and circuit breakers per Google API.
+    # Rates are the sustained project quota (RPM / 60); bursts admit what 200 concurrent chats fire at
+    # once (two Gemini calls and a Maps call each) without queueing. Omit an upstream to not limit it.
+    UPSTREAM_RATE_LIMITS: dict = {"maps": 50.0, "air_quality": 25.0, "gemini": 25.0}
+    UPSTREAM_BURSTS: dict = {"maps": 200, "air_quality": 100, "gemini": 400}
+    UPSTREAM_DAILY_QUOTAS: dict = {"maps": 0, "air_quality": 0, "gemini": 0}  # calls per UTC day; 0 = unlimited
+    SESSION_RATE_LIMIT: float = 5.0  # per session and upstream, so one session cannot starve the rest
+    SESSION_BURST: int = 10
+    SESSION_BUCKETS_MAX: int = 10000
+    RATE_LIMIT_MAX_WAIT_SECONDS: float = 2.0  # longest a call queues for a token before failing fast
+    CIRCUIT_FAILURE_THRESHOLD: int = 5  # consecutive failures (5xx, 429, transport) that open the circuit
+    CIRCUIT_RESET_SECONDS: float = 30.0  # open time before a single trial call is let through
+    STALE_SERVE_SECONDS: int = 3600  # expired Maps/AQI cache entries kept this long for outages
+
+    # Startup: optional warm-up run by the lifespan before /readyz reports ready
+    WARMUP_ENABLED: bool = True
+    WARMUP_GEOCODE_SEEDS: list = [  # popular addresses geocoded at startup (primes the Maps pool and geocode cache)
+        "India Gate, New Delhi", "Connaught Place, New Delhi", "Indira Gandhi International Airport, New Delhi",
+        "Qutub Minar, New Delhi", "New Delhi Railway Station",
+    ]
+    WARMUP_TIMEOUT_SECONDS: float = 10.0  # warm-up gives up after this; the app starts anyway
+
+    # Observability (/metrics, Server-Timing header, optional OpenTelemetry spans)
+    SERVER_TIMING_ENABLED: bool = True
+    OTEL_ENABLED: bool = False  # needs opentelemetry-api; exporters come from the deployment
 
     # LangChain/LLM Model
     LLM_MODEL: str = "gemini-3-flash-preview"
     LLM_TEMPERATURE: float = 1.0
     LLM_THINKING_LEVEL: str = "high"
+    LLM_BASE_URL: str = ""  # empty uses Google's endpoint; set to a Gemini-compatible stand-in for load tests
+    # Model profiles: overrides of the LLM_* defaults above, and the profile each call role runs on
+    LLM_PROFILES: dict = {"fast": {"thinking_level": "low"}, "rich": {}}
+    LLM_ROLE_PROFILES: dict = {"routing": "fast", "synthesis": "rich", "weather": "fast", "traffic_tip": "fast"}
+    LLM_BUDGET_PROFILE: str = "fast"  # every call of a request that ran over budget; empty never downgrades
+
+    # Per-request budget of an agent run (0 = unlimited): over it, calls downgrade and the traffic tip is skipped
+    REQUEST_LATENCY_BUDGET_SECONDS: float = 15.0
+    REQUEST_TOKEN_BUDGET: int = 40000  # prompt tokens across the request's LLM calls
 
     # FastAPI Settings
     APP_NAME: str = "CompassGenie Backend API"
@@ -29,8 +164,12 @@ class Settings(BaseSettings):
 
 settings = Settings()
 
-# Runtime check
-if not settings.GEMINI_API_KEY:
-    print("⚠️ WARNING: GEMINI_API_KEY environment variable not set. LLM calls will fail.")
-if settings.MAPS_MOCK_ENABLED:
-    print("ℹ️ INFO: MAPS_API_KEY not set. Using mock data for Google Maps.")
\ No newline at end of file
+
+def startup_warnings(settings: Settings) -> list:
+    """Configuration problems worth printing when the app starts (not at import)."""
+    warnings = []
+    if not settings.GEMINI_API_KEY:
+        warnings.append("⚠️ WARNING: GEMINI_API_KEY environment variable not set. LLM calls will fail.")
+    if settings.MAPS_MOCK_ENABLED:
+        warnings.append("ℹ️ INFO: MAPS_API_KEY not set. Using mock data for Google Maps.")
+    return warnings
\ No newline at end of file
@@ -1,4 +1,4 @@
-from typing import Annotated, List, Dict, Any, TypedDict
+from typing import Annotated, List, Dict, Any, Literal, NotRequired, Tuple, TypedDict
 from langchain_core.messages import BaseMessage
 from langgraph.graph.message import add_messages
 from pydantic import BaseModel, Field
@@ -8,19 +8,60 @@ class AgentState(TypedDict):
     """The state of the LangGraph agent."""
     messages: Annotated[List[BaseMessage], add_messages]
     user_location: Dict[str, float]
+    summary: NotRequired[str]  # rolling summary of turns dropped from `messages`
+    prompt_tokens: NotRequired[int]  # prompt tokens sent to the LLM during the current turn
+    map_data: NotRequired[Dict[str, Any] | None]  # latest map payload of the current turn (tool artifact)
 
 class ChatRequest(BaseModel):
     """Input model for the chat endpoint."""
     query: str = Field(..., description="The user's natural language query.")
     location: Dict[str, float] = Field(..., description="The user's current latitude and longitude.")
     image: str | None = Field(default=None, description="Optional Base64 encoded image string.")
+    session_id: str | None = Field(default=None, max_length=128,
+                                   description="Conversation to continue; omit to start a new one.")
+    map_zoom: int | None = Field(default=None, ge=0, le=22,
+                                 description="Zoom level the route will be shown at; sets the simplification tolerance.")
+    max_route_points: int | None = Field(default=None, gt=1, description="Vertex budget per route.")
+    route_format: Literal["path", "coords", "polyline"] = Field(
+        default="path", description="'path' for a list of {lat, lng}, 'coords' for compact [lat, lng] pairs, "
+                                    "'polyline' for an encoded polyline string.")
+    route_lods: bool = Field(default=False, description="Also return encoded levels of detail per zoom band.")
+
+class MapPoint(BaseModel):
+    """A marker on the map."""
+    name: str
+    latitude: float
+    longitude: float
+    color: str | None = None
+    eta_minutes: int | None = Field(None, description="Driving time from the user, for time-ranked results.")
+
+class LatLng(BaseModel):
+    lat: float
+    lng: float
+
+class RouteLevel(BaseModel):
+    """One level of detail of a route, for the zoom band starting at `zoom`."""
+    zoom: int
+    polyline: str
+
+class MapRoute(BaseModel):
+    """A route line; the geometry comes in the field matching the request's `route_format`."""
+    path: List[LatLng] | None = None
+    coords: List[Tuple[float, float]] | None = Field(None, description="[lat, lng] pairs.")
+    polyline: str | None = Field(None, description="Google encoded polyline, precision 5.")
+    lods: List[RouteLevel] | None = None
 
 class MapData(BaseModel):
-    """Structure for map visualization data."""
-    points: List[Dict[str, Any]] | None = None
-    routes: List[Dict[str, Any]] | None = None
+    """
+    Structure for map visualization data. Documents the /chat payload; the
+    endpoint serializes the tools' dicts directly rather than validating
+    thousands of route vertices through these models on every request.
+    """
+    points: List[MapPoint] | None = None
+    routes: List[MapRoute] | None = None
 
 class ChatResponse(BaseModel):
     """Output model for the chat endpoint."""
     response_text: str = Field(..., description="The text response from the AI.")
-    map_data: MapData | None = Field(None, description="Optional data for rendering a map.")
\ No newline at end of file
+    map_data: MapData | None = Field(None, description="Optional data for rendering a map.")
+    session_id: str | None = Field(None, description="Pass back on the next request to continue the conversation.")
\ No newline at end of file
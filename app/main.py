@@ -1,28 +1,68 @@
 import uvicorn
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .core.config import settings
+from fastapi.responses import ORJSONResponse
+from .core.config import settings, startup_warnings
 from .api.endpoints import router as api_router
+from .api.middleware import TimingMiddleware
+from .services import agent_service, geocoding, health, http_client, warmup
+from .services.checkpoints import open_checkpointer
 
 # --- Application Setup ---
 
-app = FastAPI(title=settings.APP_NAME)
 
-# Middleware setup
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.CORS_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Builds everything the first request would otherwise pay for: the LLM client
+    and agent graph (against the session checkpoint store), the outbound
+    connection pool and the geocode store. Then optionally warms up (seed
+    geocodes, one round of dependency probes) and only after that starts the
+    health checker, which is what lets /readyz report ready. Shutdown releases
+    all of it.
+    """
+    for warning in startup_warnings(settings):
+        print(warning)
+    async with open_checkpointer() as checkpointer:
+        agent_service.configure_checkpointer(checkpointer)
+        agent_service.warm_up()
+        http_client.get_async_client()
+        geocoding.open_geocode_store()
+        if settings.WARMUP_ENABLED:
+            app.state.warmup = await warmup.warm_up()
+        health.checker.start()
+        yield
+        await health.checker.stop()
+    await http_client.aclose_clients()
+    geocoding.close_geocode_store()
 
-# Include the API router
-app.include_router(api_router)
+
+def create_app() -> FastAPI:
+    """Application factory; `uvicorn --factory app.main:create_app` builds a fresh app per process."""
+    app = FastAPI(title=settings.APP_NAME, lifespan=lifespan, default_response_class=ORJSONResponse)
+
+    # Middleware setup
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.CORS_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["Server-Timing"],
+    )
+    app.add_middleware(TimingMiddleware)
+
+    # Include the API router
+    app.include_router(api_router)
+    return app
+
+
+app = create_app()
 
 # --- Entry Point ---
 
 if __name__ == "__main__":
     # You would typically run this via 'uvicorn app.main:app --reload'
     # This block is for direct execution
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
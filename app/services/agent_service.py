@@ -1,47 +1,112 @@
-import json
-from typing import Literal, Dict
+import asyncio
+import logging
+import uuid
+from typing import Any, AsyncIterator, Literal, Dict
 from langgraph.graph import StateGraph, START, END
-from langgraph.prebuilt import ToolNode
-from langgraph.checkpoint.memory import MemorySaver
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import SystemMessage, HumanMessage, ToolMessage
-from langchain_core.tools import tool
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langchain_core.messages import AIMessage, SystemMessage, HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
+from langchain_core.tools import StructuredTool
 
 from ..core.config import settings
 from ..domain.agent_state import AgentState
 from .google_maps import maps_api_search
 from .aqi_services import get_aqi
+from .itinerary import plan_itinerary
+from .checkpoints import create_memory_checkpointer
+from .context import compact_history, prompt_tokens
+from . import budget, health, images, intent_router, llm, metrics, resilience, response_cache
+from .tool_executor import make_tool_node
 
-
-llm = ChatGoogleGenerativeAI(
-    model=settings.LLM_MODEL,
-    google_api_key=settings.GEMINI_API_KEY,
-    temperature=settings.LLM_TEMPERATURE,
-    thinking_level=settings.LLM_THINKING_LEVEL
-)
+logger = logging.getLogger(__name__)
 
 
-@tool
-def google_search_for_weather(query: str, location: str) -> str:
+def _google_search_for_weather(query: str, location: str) -> str:
     """Finds weather or current facts."""
     try:
         # Use the configured LLM directly for the search
-        response = llm.invoke(f"Answer briefly in bullet points: {query} near {location}")
+        with resilience.guard("gemini"), metrics.span("llm", "weather"):
+            response = llm.llm_for("weather").invoke(f"Answer briefly in bullet points: {query} near {location}")
+        budget.spend(metrics.record_llm_usage("weather", response)[0])
+        return response.content
+    except Exception as e:
+        return f"Search failed: {e}"
+
+
+async def _agoogle_search_for_weather(query: str, location: str) -> str:
+    """Finds weather or current facts."""
+    try:
+        async with resilience.aguard("gemini"):
+            with metrics.span("llm", "weather"):
+                response = await llm.llm_for("weather").ainvoke(
+                    f"Answer briefly in bullet points: {query} near {location}")
+        budget.spend(metrics.record_llm_usage("weather", response)[0])
         return response.content
     except Exception as e:
         return f"Search failed: {e}"
 
 
-tools = [google_search_for_weather, maps_api_search, get_aqi]
-llm_with_tools = llm.bind_tools(tools)
+google_search_for_weather = StructuredTool.from_function(
+    func=_google_search_for_weather,
+    coroutine=_agoogle_search_for_weather,
+    name="google_search_for_weather",
+)
 
 
-def agent_node(state: AgentState):
-    """The main agent function for decision making."""
-    messages = state["messages"]
-    user_loc = state["user_location"]
+tools = [google_search_for_weather, maps_api_search, get_aqi, plan_itinerary]
+
+
+# --- Lazily built module state ---
+# The tool-bound models (one per profile) and `app_graph` are created on first
+# use (or by the app's lifespan via `warm_up`), not at import. Tests and
+# benchmarks may still assign `llm_with_tools` or `app_graph` directly.
+
+llm_with_tools: Any = None  # when assigned, this one model answers every agent call regardless of profile
+_bound_models: Dict[str, tuple] = {}  # profile -> (model, model with the tools bound)
+
+_BUILDERS = {
+    "app_graph": lambda: setup_agent_graph(),
+}
+
+
+def _lazy(name: str) -> Any:
+    value = globals().get(name)
+    if value is None:
+        value = globals()[name] = _BUILDERS[name]()
+    return value
+
+
+def __getattr__(name: str) -> Any:
+    if name in _BUILDERS:
+        return _lazy(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _bound_model(profile: str) -> Any:
+    model = llm.get_llm(profile)
+    cached = _bound_models.get(profile)
+    if cached is None or cached[0] is not model:
+        cached = _bound_models[profile] = (model, model.bind_tools(tools))
+    return cached[1]
+
+
+def _agent_model(role: str) -> Any:
+    """The tool-bound model for an agent call of `role`, on the profile the request's budget allows."""
+    profile = budget.profile_for(role)
+    return llm_with_tools if llm_with_tools is not None else _bound_model(profile)
 
-    system_msg = SystemMessage(content=(
+
+def warm_up():
+    """Builds the model clients, their tool bindings and the graph now rather than on the first request."""
+    for profile in llm.profiles_in_use():
+        _bound_model(profile)
+    _lazy("app_graph")
+
+
+def _system_message(user_loc: Dict[str, float], summary: str = "") -> SystemMessage:
+    """Builds the routing/AQI instructions for the current user location."""
+    earlier = f" **EARLIER IN THIS CONVERSATION:**\n{summary}" if summary else ""
+    return SystemMessage(content=(
         "You are CompassGenie, an AI map assistant. "
         f"User Location: Lat: {user_loc.get('lat')}, Lng: {user_loc.get('lng')}. "
         "**CRITICAL ROUTING INSTRUCTIONS:** "
@@ -50,16 +115,58 @@ def agent_node(state: AgentState):
         "2. If the user says 'via [Location]', pass that location to the 'waypoints' parameter. "
         "3. NEVER explain a route in text without also triggering the map tool. "
         "The map and chat must always stay synchronized. "
-        "4. If an image is provided, identify the place and use it as the destination."
+        "4. If an image is provided, identify the place and use it as the destination. "
+        "5. To visit several places ('plan my afternoon', 'visit A, B and C'), call 'plan_itinerary' ONCE "
+        "with all stops (and opening hours as time_windows if known); it picks the order and draws the route. "
+        "6. For time-bounded searches ('within a 20-minute drive'), call 'maps_api_search' with "
+        "search_type='nearby' and max_travel_minutes; results come back ranked by driving time."
         "**AQI INSTRUCTIONS:** "
         "1. If the user asks about air quality 'here' or 'nearby', call 'get_aqi' using the lat/lng provided above. "
         "2. If the user mentions a specific city (e.g., 'AQI in Paris'), call 'get_aqi' with the 'location_name' "
         "parameter. "
         "Avoid saying mentioning any other apps name"
-    ))
+    ) + earlier)
+
+
+def _prompt(state: AgentState) -> list:
+    return [_system_message(state["user_location"], state.get("summary", ""))] + state["messages"]
+
+
+def _agent_role(state: AgentState) -> str:
+    """"synthesis" when answering from this turn's tool results, otherwise "routing" (choosing tools)."""
+    return "synthesis" if isinstance(state["messages"][-1], ToolMessage) else "routing"
+
+
+def _record_usage(state: AgentState, response, prompt: list) -> dict:
+    """Adds this call's prompt tokens to the turn total and the request budget (debug-logged; see `metrics`)."""
+    metrics.record_llm_usage("agent", response)
+    health.checker.observe("gemini", True)
+    used = prompt_tokens(response, prompt)
+    budget.spend(used)
+    total = state.get("prompt_tokens", 0) + used
+    logger.debug("Agent LLM call: %d prompt tokens (%d this turn, %d messages)", used, total, len(prompt))
+    return {"messages": [response], "prompt_tokens": total}
+
+
+@metrics.timed("node", "agent")
+def agent_node(state: AgentState):
+    """The main agent function for decision making."""
+    prompt = _prompt(state)
+    model = _agent_model(_agent_role(state))
+    with resilience.guard("gemini"), metrics.span("llm", "agent"):
+        response = model.invoke(prompt)
+    return _record_usage(state, response, prompt)
+
 
-    response = llm_with_tools.invoke([system_msg] + messages)
-    return {"messages": [response]}
+@metrics.timed("node", "agent")
+async def aagent_node(state: AgentState):
+    """Async variant of `agent_node`, used when the graph runs via `ainvoke`."""
+    prompt = _prompt(state)
+    model = _agent_model(_agent_role(state))
+    async with resilience.aguard("gemini"):
+        with metrics.span("llm", "agent"):
+            response = await model.ainvoke(prompt)
+    return _record_usage(state, response, prompt)
 
 
 def should_continue(state: AgentState) -> Literal["tools", "end"]:
@@ -69,77 +176,238 @@ def should_continue(state: AgentState) -> Literal["tools", "end"]:
     return "end"
 
 
-def setup_agent_graph():
+def setup_agent_graph(checkpointer: BaseCheckpointSaver | None = None):
     """Initializes and compiles the LangGraph workflow."""
     workflow = StateGraph(AgentState)
-    workflow.add_node("agent", agent_node)
-    workflow.add_node("tools", ToolNode(tools))
-    workflow.add_edge(START, "agent")
+    workflow.add_node("compact", metrics.timed("node", "compact")(compact_history))
+    workflow.add_node("agent", RunnableLambda(agent_node, afunc=aagent_node))
+    workflow.add_node("tools", make_tool_node(tools))
+    workflow.add_edge(START, "compact")
+    workflow.add_edge("compact", "agent")
     workflow.add_conditional_edges("agent", should_continue, {"tools": "tools", "end": END})
     workflow.add_edge("tools", "agent")
 
-    # Using in-memory checkpointing for simplicity
-    memory = MemorySaver()
-    return workflow.compile(checkpointer=memory)
+    # Bounded in-memory sessions unless the app opened a persistent backend
+    return workflow.compile(checkpointer=checkpointer or create_memory_checkpointer())
 
 
-app_graph = setup_agent_graph()
+def configure_checkpointer(checkpointer: BaseCheckpointSaver):
+    """Compiles the agent graph against the checkpointer opened at startup."""
+    globals()["app_graph"] = setup_agent_graph(checkpointer)
 
 
-def invoke_agent_service(query: str, location: Dict[str, float], image_b64: str = None) -> dict:
-    """
-    The main callable function to run the LangGraph agent.
-    Returns the final AI text response and map data.
-    """
-    if not settings.GEMINI_API_KEY:
-        raise ValueError("Gemini API Key missing")
+def _session_config(session_id: str | None) -> tuple[str, dict]:
+    """Resolves the conversation thread for a request, starting a new one if needed."""
+    session_id = session_id or uuid.uuid4().hex
+    resilience.bind_session(session_id)  # upstream calls of this request count against the session's rate
+    return session_id, {"configurable": {"thread_id": session_id}}
+
+
+def _prepare_image(image_b64: str | None = None, image_bytes: bytes | None = None) -> images.PreparedImage | None:
+    """Runs an uploaded photo (base64 or raw bytes) through the ingestion stage."""
+    if image_bytes:
+        return images.prepare(image_bytes)
+    if image_b64:
+        return images.prepare_base64(image_b64)
+    return None
+
 
-    # 1. Prepare Multimodal Content
+def _build_initial_state(query: str, location: Dict[str, float], image: images.PreparedImage | None = None) -> dict:
+    """Prepares the multimodal user message and the initial graph state."""
     # Start with the user's text query
     content = [{"type": "text", "text": query}]
 
-    # Append the image if provided
-    if image_b64:
-        content.append({
-            "type": "image_url",
-            "image_url": {"url": f"data:image/jpeg;base64,{image_b64}"}
-        })
+    if image and (place := images.identified_place(image.digest)):
+        # Seen this photo before: name the place instead of paying for vision again
+        content.append({"type": "text", "text": (
+            f"[The attached photo shows {place['name']} "
+            f"({place['latitude']}, {place['longitude']}); use it as the destination.]")})
+    elif image:
+        content.append({"type": "image_url", "image_url": {"url": image.data_url}})
 
-    # 2. Setup initial state with the multimodal message
-    initial_state = {
+    return {
         "messages": [HumanMessage(content=content)],
-        "user_location": location
+        "user_location": location,
+        "map_data": None  # set by the tools node if this turn produces a map
     }
 
-    config = {"configurable": {"thread_id": "unique_user_session_id"}}
 
-    # 3. Run the Graph
-    final_state = app_graph.invoke(initial_state, config=config)
-
-    # --- POST-PROCESSING ---
-    last_message = final_state["messages"][-1]
-    response_text = ""
-
-    if isinstance(last_message.content, str):
-        response_text = last_message.content
-    elif isinstance(last_message.content, list):
+def _text_content(content: Any, separator: str = "\n") -> str:
+    """Flattens message content (plain string or Gemini's list of parts) into text."""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
         content_parts = []
-        for part in last_message.content:
+        for part in content:
             if isinstance(part, dict) and part.get('type') == 'text':
                 content_parts.append(part.get('text', ''))
-        response_text = "\n".join(content_parts)
-
-    map_data = None
-    for msg in reversed(final_state["messages"]):
-        if isinstance(msg, HumanMessage):
-            break
-        if isinstance(msg, ToolMessage):
-            try:
-                data = json.loads(msg.content)
-                if "map_data" in data and (data["map_data"].get("points") or data["map_data"].get("routes")):
-                    map_data = data["map_data"]
-                    break
-            except Exception:
-                continue
-
-    return {"response_text": response_text, "map_data": map_data}
+        return separator.join(content_parts)
+    return ""
+
+
+def _tool_map_data(msg: ToolMessage) -> dict | None:
+    """Returns the map payload a tool attached as its artifact, if it has one."""
+    artifact = getattr(msg, "artifact", None)
+    if isinstance(artifact, dict) and (artifact.get("points") or artifact.get("routes")):
+        return artifact
+    return None
+
+
+def _extract_result(final_state: dict) -> dict:
+    """Pulls the final AI text and the current turn's map data out of the graph state."""
+    return {"response_text": _text_content(final_state["messages"][-1].content),
+            "map_data": final_state.get("map_data"),
+            "prompt_tokens": final_state.get("prompt_tokens", 0)}
+
+
+def _finish(final_state: dict, image: images.PreparedImage | None, session_id: str) -> dict:
+    """Builds the service result and remembers where a photo query led."""
+    result = _extract_result(final_state)
+    if image:
+        images.remember_place(image.digest, result["map_data"])
+    return {**result, "session_id": session_id}
+
+
+def _shortcut(query: str, location: Dict[str, float], image, new_session: bool) -> dict | None:
+    """A cached or fast-path answer that makes the agent unnecessary, or None."""
+    if image is not None:
+        return None
+    return response_cache.lookup(query, location, new_session) or intent_router.route(query, location)
+
+
+async def _ashortcut(query: str, location: Dict[str, float], image, new_session: bool) -> dict | None:
+    if image is not None:
+        return None
+    return response_cache.lookup(query, location, new_session) or await intent_router.aroute(query, location)
+
+
+def _shortcut_state(initial_state: dict, answer: dict) -> dict:
+    """The turn a shortcut answer adds to the session, as if the agent had replied."""
+    return {**initial_state,
+            "messages": initial_state["messages"] + [AIMessage(content=answer["response_text"])],
+            "map_data": answer["map_data"], "prompt_tokens": 0}
+
+
+def _remember(query: str, location: Dict[str, float], image, new_session: bool, answer: dict | None, result: dict):
+    """Offers a freshly computed answer to the response cache."""
+    if image is None and not (answer or {}).get("cached"):
+        response_cache.store(query, location, result, new_session)
+
+
+def invoke_agent_service(query: str, location: Dict[str, float], image_b64: str = None,
+                         session_id: str | None = None, image_bytes: bytes | None = None) -> dict:
+    """
+    The main callable function to run the LangGraph agent.
+    Returns the final AI text response, map data and the session id of the thread.
+    Repeated queries are answered from `response_cache` and simple, fully specified
+    ones by `intent_router`, both without the LLM.
+    Raises `images.ImageValidationError` for an unusable photo.
+    """
+    if not settings.GEMINI_API_KEY:
+        raise ValueError("Gemini API Key missing")
+
+    image = _prepare_image(image_b64, image_bytes)
+    initial_state = _build_initial_state(query, location, image)
+    new_session = session_id is None
+    session_id, config = _session_config(session_id)
+    budget.start()
+
+    if answer := _shortcut(query, location, image, new_session):
+        final_state = _shortcut_state(initial_state, answer)
+        _lazy("app_graph").update_state(config, final_state, as_node="agent")
+    else:
+        final_state = _lazy("app_graph").invoke(initial_state, config=config)
+        budget.report()
+
+    result = _finish(final_state, image, session_id)
+    _remember(query, location, image, new_session, answer, result)
+    return result
+
+
+async def ainvoke_agent_service(query: str, location: Dict[str, float], image_b64: str = None,
+                                session_id: str | None = None, image_bytes: bytes | None = None) -> dict:
+    """
+    Async variant of `invoke_agent_service`. Runs the graph with `ainvoke` so LLM
+    and tool I/O never block the event loop.
+    """
+    if not settings.GEMINI_API_KEY:
+        raise ValueError("Gemini API Key missing")
+
+    # Decoding and resizing a photo is CPU work; keep it off the event loop
+    image = await asyncio.to_thread(_prepare_image, image_b64, image_bytes)
+    initial_state = _build_initial_state(query, location, image)
+    new_session = session_id is None
+    session_id, config = _session_config(session_id)
+    budget.start()
+
+    if answer := await _ashortcut(query, location, image, new_session):
+        final_state = _shortcut_state(initial_state, answer)
+        await _lazy("app_graph").aupdate_state(config, final_state, as_node="agent")
+    else:
+        final_state = await _lazy("app_graph").ainvoke(initial_state, config=config)
+        budget.report()
+
+    result = _finish(final_state, image, session_id)
+    _remember(query, location, image, new_session, answer, result)
+    return result
+
+
+def astream_agent_service(query: str, location: Dict[str, float], image_b64: str = None,
+                         session_id: str | None = None,
+                         image_bytes: bytes | None = None) -> AsyncIterator[dict]:
+    """
+    Streaming variant of `ainvoke_agent_service`. Validates eagerly (decoding the
+    photo, so async callers run it via `asyncio.to_thread`), then returns an
+    async iterator of events built on LangGraph's event stream:
+
+    * ``{"type": "tool_start", "tool": name}`` when a tool begins,
+    * ``{"type": "map_data", "map_data": {...}}`` as soon as a tool returns map data,
+    * ``{"type": "token", "text": "..."}`` for each agent LLM token,
+    * ``{"type": "done", "response_text": ..., "map_data": ..., "session_id": ...}`` once the run finishes.
+    """
+    if not settings.GEMINI_API_KEY:
+        raise ValueError("Gemini API Key missing")
+
+    image = _prepare_image(image_b64, image_bytes)
+    initial_state = _build_initial_state(query, location, image)
+    new_session = session_id is None
+    session_id, config = _session_config(session_id)
+
+    async def events():
+        graph = _lazy("app_graph")
+        # Here, not above: the stream may be built in another context (e.g. a worker thread)
+        resilience.bind_session(session_id)
+        budget.start()
+        if answer := await _ashortcut(query, location, image, new_session):
+            state = _shortcut_state(initial_state, answer)
+            await graph.aupdate_state(config, state, as_node="agent")
+            if answer["map_data"]:
+                yield {"type": "map_data", "map_data": answer["map_data"]}
+            yield {"type": "token", "text": answer["response_text"]}
+            result = _finish(state, None, session_id)
+            _remember(query, location, image, new_session, answer, result)
+            yield {"type": "done", **result}
+            return
+
+        async for event in graph.astream_events(initial_state, config=config, version="v2"):
+            kind = event["event"]
+            node = event.get("metadata", {}).get("langgraph_node")
+
+            if kind == "on_tool_start":
+                yield {"type": "tool_start", "tool": event["name"]}
+            elif kind == "on_tool_end":
+                output = event["data"].get("output")
+                if isinstance(output, ToolMessage) and (map_data := _tool_map_data(output)):
+                    yield {"type": "map_data", "map_data": map_data}
+            elif kind == "on_chat_model_stream" and node == "agent":
+                # Only the agent's own tokens; nested calls inside tools are not user-facing
+                if text := _text_content(event["data"]["chunk"].content, separator=""):
+                    yield {"type": "token", "text": text}
+
+        budget.report()
+        final_state = await graph.aget_state(config)
+        result = _finish(final_state.values, image, session_id)
+        _remember(query, location, image, new_session, None, result)
+        yield {"type": "done", **result}
+
+    return events()
@@ -1,23 +1,135 @@
-import requests
-from langchain_core.tools import tool
+import math
+from typing import Any, Dict, Tuple
+import httpx
+from langchain_core.tools import StructuredTool
 from ..core.config import settings
+from . import http_client, resilience
+from .cache import MISSING, SingleFlight, TTLCache
+from .geocoding import ageocode, geocode
 
 
-@tool
-def get_aqi(location_name: str = None, lat: float = None, lng: float = None) -> str:
+# Readings are shared by every request that falls in the same grid cell
+_aqi_cache = TTLCache(maxsize=settings.AQI_CACHE_MAX_CELLS, ttl=settings.AQI_CACHE_TTL_SECONDS, name="aqi",
+                      stale_ttl=settings.STALE_SERVE_SECONDS)
+_aqi_flights = SingleFlight()
+
+
+def aqi_cell(lat: float, lng: float) -> Tuple[int, int]:
+    """Quantizes a coordinate onto the AQI cache grid."""
+    size = settings.AQI_CACHE_CELL_DEGREES
+    return math.floor(lat / size), math.floor(lng / size)
+
+
+def _aqi_payload(target_lat: float, target_lng: float) -> Dict[str, Any]:
+    return {
+        "location": {"latitude": target_lat, "longitude": target_lng},
+        "extraComputations": [
+            "LOCAL_AQI",
+            "HEALTH_RECOMMENDATIONS",
+            "DOMINANT_POLLUTANT_CONCENTRATION"
+        ]
+    }
+
+
+def _aqi_url() -> str:
+    return f"{settings.AIR_QUALITY_BASE_URL}currentConditions:lookup?key={settings.MAPS_API_KEY}"
+
+
+def _stale_reading(cell: Tuple[int, int]) -> Any:
+    """A recently expired reading for the cell, served while the API is failing."""
+    if (stale := _aqi_cache.get_stale(cell)) is not MISSING:
+        resilience.stale_served("aqi")
+    return stale
+
+
+def _store_reading(cell: Tuple[int, int], data: Dict[str, Any]) -> Dict[str, Any]:
+    # Only complete readings are cached; error payloads fall back to a stale reading, else to the formatter
+    if data.get("indexes"):
+        _aqi_cache.set(cell, data)
+        return data
+    stale = _stale_reading(cell)
+    return data if stale is MISSING else stale
+
+
+def _lookup_conditions(target_lat: float, target_lng: float) -> Dict[str, Any]:
+    """Current conditions for the cell containing the point, fetched at most once per window."""
+    cell = aqi_cell(target_lat, target_lng)
+    if (cached := _aqi_cache.get(cell)) is not MISSING:
+        return cached
+
+    def fetch():
+        try:
+            response = http_client.post(_aqi_url(), json=_aqi_payload(target_lat, target_lng))
+        except httpx.HTTPError:
+            if (stale := _stale_reading(cell)) is MISSING:
+                raise
+            return stale
+        return _store_reading(cell, response.json())
+
+    return _aqi_flights.do(cell, fetch)
+
+
+async def _alookup_conditions(target_lat: float, target_lng: float) -> Dict[str, Any]:
+    """Async variant of `_lookup_conditions`."""
+    cell = aqi_cell(target_lat, target_lng)
+    if (cached := _aqi_cache.get(cell)) is not MISSING:
+        return cached
+
+    async def fetch():
+        try:
+            response = await http_client.apost(_aqi_url(), json=_aqi_payload(target_lat, target_lng))
+        except httpx.HTTPError:
+            if (stale := _stale_reading(cell)) is MISSING:
+                raise
+            return stale
+        return _store_reading(cell, response.json())
+
+    return await _aqi_flights.ado(cell, fetch)
+
+
+def aqi_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters for the AQI cell cache, plus coalesced in-flight lookups."""
+    stats = _aqi_cache.stats()
+    stats["coalesced"] = _aqi_flights.coalesced
+    return stats
+
+
+def _format_aqi(data: Dict[str, Any], display_name: str) -> str:
+    """Formats a `currentConditions:lookup` response for the agent."""
+    # 1. Get 0-500 scale (Local AQI)
+    indexes = data.get("indexes", [])
+    local_aqi = next((idx for idx in indexes if idx["code"] != "uaqi"), indexes[0])
+
+    # 2. Get Health Recommendations
+    recs = data.get("healthRecommendations", {})
+
+    # Format the output with clear sections
+    output = [
+        f"## Air Quality for {display_name}",
+        f"**AQI:** {local_aqi['aqi']} ({local_aqi['category']})",
+        f"**Dominant Pollutant:** {data.get('dominantPollutant', 'N/A')}",
+        "\n### 💡 Health Recommendations",
+        f"* **General Public:** {recs.get('generalPopulation', 'No specific advice.')}",
+        f"* **Sensitive Groups:** {recs.get('lungDiseasePopulation', recs.get('children', 'Take extra precautions if you have respiratory issues.'))}"
+    ]
+
+    # Add a specific alert for high pollution
+    if local_aqi['aqi'] > 150:
+        output.insert(1, "⚠️ **WARNING: Unhealthy air levels detected.**")
+
+    return "\n".join(output)
+
+
+def _get_aqi(location_name: str = None, lat: float = None, lng: float = None) -> str:
     """
     Fetches the Air Quality Index (0-500 scale) and health recommendations.
     Uses 'location_name' or 'lat'/'lng' coordinates.
     """
-    api_key = settings.MAPS_API_KEY
-
     # --- Geocoding Logic ---
     if location_name:
-        geo_url = f"https://maps.googleapis.com/maps/api/geocode/json?address={location_name}&key={api_key}"
-        geo_res = requests.get(geo_url).json()
-        if not geo_res.get("results"):
+        loc = geocode(location_name)
+        if not loc:
             return f"Could not find coordinates for {location_name}."
-        loc = geo_res["results"][0]["geometry"]["location"]
         target_lat, target_lng = loc["lat"], loc["lng"]
         display_name = location_name
     else:
@@ -25,42 +137,32 @@ def get_aqi(location_name: str = None, lat: float = None, lng: float = None) ->
         display_name = "your current location"
 
     # --- AQI & Recommendations Request ---
-    aqi_url = f"https://airquality.googleapis.com/v1/currentConditions:lookup?key={api_key}"
-    payload = {
-        "location": {"latitude": target_lat, "longitude": target_lng},
-        "extraComputations": [
-            "LOCAL_AQI",
-            "HEALTH_RECOMMENDATIONS",
-            "DOMINANT_POLLUTANT_CONCENTRATION"
-        ]
-    }
-
     try:
-        response = requests.post(aqi_url, json=payload)
-        data = response.json()
-
-        # 1. Get 0-500 scale (Local AQI)
-        indexes = data.get("indexes", [])
-        local_aqi = next((idx for idx in indexes if idx["code"] != "uaqi"), indexes[0])
-
-        # 2. Get Health Recommendations
-        recs = data.get("healthRecommendations", {})
-
-        # Format the output with clear sections
-        output = [
-            f"## Air Quality for {display_name}",
-            f"**AQI:** {local_aqi['aqi']} ({local_aqi['category']})",
-            f"**Dominant Pollutant:** {data.get('dominantPollutant', 'N/A')}",
-            "\n### 💡 Health Recommendations",
-            f"* **General Public:** {recs.get('generalPopulation', 'No specific advice.')}",
-            f"* **Sensitive Groups:** {recs.get('lungDiseasePopulation', recs.get('children', 'Take extra precautions if you have respiratory issues.'))}"
-        ]
+        return _format_aqi(_lookup_conditions(target_lat, target_lng), display_name)
 
-        # Add a specific alert for high pollution
-        if local_aqi['aqi'] > 150:
-            output.insert(1, "⚠️ **WARNING: Unhealthy air levels detected.**")
+    except Exception as e:
+        return f"Error retrieving data: {str(e)}"
 
-        return "\n".join(output)
+
+async def _aget_aqi(location_name: str = None, lat: float = None, lng: float = None) -> str:
+    """Async variant of `_get_aqi`."""
+    # --- Geocoding Logic ---
+    if location_name:
+        loc = await ageocode(location_name)
+        if not loc:
+            return f"Could not find coordinates for {location_name}."
+        target_lat, target_lng = loc["lat"], loc["lng"]
+        display_name = location_name
+    else:
+        target_lat, target_lng = lat, lng
+        display_name = "your current location"
+
+    # --- AQI & Recommendations Request ---
+    try:
+        return _format_aqi(await _alookup_conditions(target_lat, target_lng), display_name)
 
     except Exception as e:
-        return f"Error retrieving data: {str(e)}"
\ No newline at end of file
+        return f"Error retrieving data: {str(e)}"
+
+
+get_aqi = StructuredTool.from_function(func=_get_aqi, coroutine=_aget_aqi, name="get_aqi")
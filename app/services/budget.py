@@ -0,0 +1,119 @@
+"""
+Per-request latency and token budgets, and the model profile each LLM role runs on.
+
+Every LLM call names a role: ``routing`` (the agent picking tools),
+``synthesis`` (the agent answering from tool results), and the auxiliary
+``weather`` and ``traffic_tip`` calls. `LLM_ROLE_PROFILES` maps roles to the
+profiles in `LLM_PROFILES` (overrides of the `LLM_*` defaults), so cheap
+routing decisions do not pay for maximum reasoning.
+
+A request's `Budget` starts with the agent run (`start`) and follows it into
+graph nodes and tools through a context variable. Once it has run longer than
+`REQUEST_LATENCY_BUDGET_SECONDS` or sent more than `REQUEST_TOKEN_BUDGET`
+prompt tokens:
+
+* every further LLM call is downgraded to `LLM_BUDGET_PROFILE`;
+* optional enrichments (the traffic tip) are skipped.
+
+Both are counted in `compassgenie_budget_exceeded_total`, profile choices in
+`compassgenie_llm_profile_calls_total`, and the share of each budget a
+request used in `compassgenie_request_budget_used_ratio`.
+"""
+import time
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+
+from ..core.config import settings
+from . import metrics
+
+
+RATIO_BUCKETS = (0.1, 0.25, 0.5, 0.75, 0.9, 1.0, 1.5, 2.0, 4.0)
+
+EXCEEDED = metrics.Counter("compassgenie_budget_exceeded_total",
+                           "LLM calls downgraded and enrichments skipped after a request ran over budget.",
+                           ("budget", "action"))
+PROFILE_CALLS = metrics.Counter("compassgenie_llm_profile_calls_total", "LLM calls by role and model profile.",
+                                ("role", "profile"))
+USED = metrics.Histogram("compassgenie_request_budget_used_ratio",
+                         "Share of the latency / token budget used per agent request.", ("budget",),
+                         buckets=RATIO_BUCKETS)
+
+
+@dataclass
+class Budget:
+    seconds: float  # 0 = no latency budget
+    tokens: int  # 0 = no token budget
+    started: float = field(default_factory=time.monotonic)
+    used_tokens: int = 0
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def remaining(self) -> float | None:
+        """Seconds left, or None without a latency budget."""
+        return max(0.0, self.seconds - self.elapsed()) if self.seconds else None
+
+    def exceeded(self) -> str | None:
+        """"latency" or "tokens" once either budget is spent, else None."""
+        if self.seconds and self.elapsed() > self.seconds:
+            return "latency"
+        if self.tokens and self.used_tokens > self.tokens:
+            return "tokens"
+        return None
+
+
+_budget: ContextVar[Budget | None] = ContextVar("request_budget", default=None)
+
+
+def start() -> Token:
+    """Starts the budget of the agent run in the current context."""
+    return _budget.set(Budget(settings.REQUEST_LATENCY_BUDGET_SECONDS, settings.REQUEST_TOKEN_BUDGET))
+
+
+def current() -> Budget | None:
+    return _budget.get()
+
+
+def clear():
+    """Drops the current context's budget: later calls run unbudgeted."""
+    _budget.set(None)
+
+
+def spend(tokens: int):
+    """Adds prompt tokens sent by an LLM call of the current request."""
+    if (budget := _budget.get()) is not None:
+        budget.used_tokens += int(tokens)
+
+
+def profile_for(role: str) -> str:
+    """
+    The profile `role` runs on: its configured one, or `LLM_BUDGET_PROFILE` once
+    the request is over budget. "" means the plain `LLM_*` settings.
+    """
+    profile = settings.LLM_ROLE_PROFILES.get(role, "")
+    budget = _budget.get()
+    if budget is not None and settings.LLM_BUDGET_PROFILE and profile != settings.LLM_BUDGET_PROFILE:
+        if reason := budget.exceeded():
+            EXCEEDED.inc(budget=reason, action="downgrade")
+            profile = settings.LLM_BUDGET_PROFILE
+    PROFILE_CALLS.inc(role=role, profile=profile or "default")
+    return profile
+
+
+def skip_enrichment(name: str) -> bool:
+    """True (and counted) if the optional enrichment `name` should be skipped because the request is over budget."""
+    budget = _budget.get()
+    if budget is None or not (reason := budget.exceeded()):
+        return False
+    EXCEEDED.inc(budget=reason, action=f"skip_{name}")
+    return True
+
+
+def report():
+    """Records how much of each budget the current request used."""
+    if (budget := _budget.get()) is None:
+        return
+    if budget.seconds:
+        USED.observe(budget.elapsed() / budget.seconds, budget="latency")
+    if budget.tokens:
+        USED.observe(budget.used_tokens / budget.tokens, budget="tokens")
@@ -0,0 +1,194 @@
+"""In-process caching primitives shared by the tool services."""
+import asyncio
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from . import metrics
+
+
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries also expire after a time-to-live.
+    Optionally also bounded by total size, as measured by `sizeof`.
+    Thread-safe; keeps hit/miss/eviction counters for metrics. Named caches
+    also time their lookups and report hits, misses and size on /metrics.
+    With `stale_ttl`, expired entries are kept that much longer for
+    `get_stale`, so callers can fall back to them when the upstream fails.
+    `on_remove` is called (under the cache's lock) with the key of every entry
+    that is evicted, expired or replaced, so side indexes can follow.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, max_bytes: int | None = None,
+                 sizeof: Callable[[Any], int] | None = None, name: str | None = None,
+                 stale_ttl: float = 0, on_remove: Callable[[Hashable], None] | None = None):
+        self.name = name
+        self.on_remove = on_remove
+        self.stale_ttl = stale_ttl
+        if name is not None:
+            _named_caches.add(self)
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof if max_bytes is not None else None
+        self._data: "OrderedDict[Hashable, tuple[float, Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """Returns the cached value, or `default` when absent or expired."""
+        if self.name is None:
+            return self._get(key, default)
+        start = time.perf_counter()
+        value = self._get(key, default)
+        metrics.record("cache", self.name, time.perf_counter() - start)
+        metrics.CACHE_LOOKUPS.inc(cache=self.name, result="miss" if value is default else "hit")
+        return value
+
+    def _get(self, key: Hashable, default: Any) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value, _ = entry
+                now = time.monotonic()
+                if expires_at > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                if expires_at + self.stale_ttl <= now:
+                    self._pop(key)
+            self.misses += 1
+            return default
+
+    def get_stale(self, key: Hashable, default: Any = MISSING) -> Any:
+        """Returns the value even if expired, as long as it is within `stale_ttl`."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] + self.stale_ttl <= time.monotonic():
+                return default
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        """Stores `value`; `ttl` overrides the cache default for this entry."""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        size = self._sizeof(value) if self._sizeof else 0
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            self._data[key] = (expires_at, value, size)
+            self._bytes += size
+            while len(self._data) > self.maxsize or (self.max_bytes is not None and self._bytes > self.max_bytes):
+                self._pop(next(iter(self._data)))
+                self.evictions += 1
+
+    def _pop(self, key: Hashable):
+        self._bytes -= self._data.pop(key)[2]
+        if self.on_remove is not None:
+            self.on_remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_named_caches: "weakref.WeakSet[TTLCache]" = weakref.WeakSet()
+
+metrics.Gauge("compassgenie_cache_entries", "Entries held per named cache.", ("cache",),
+              lambda: {(c.name,): len(c) for c in list(_named_caches)})
+metrics.Gauge("compassgenie_cache_bytes", "Tracked bytes per size-bounded cache.", ("cache",),
+              lambda: {(c.name,): c.stats()["bytes"] for c in list(_named_caches) if c.max_bytes is not None})
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into a single execution;
+    every caller waiting on the key receives the leader's result (or error).
+
+    With `cancel_abandoned`, an async call is cancelled once every caller
+    waiting on it has been cancelled; otherwise it runs to completion (and
+    fills its cache) regardless.
+    """
+
+    def __init__(self, cancel_abandoned: bool = False):
+        self.cancel_abandoned = cancel_abandoned
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        else:
+            self.coalesced += 1
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            # Shielded so one cancelled waiter does not cancel the shared upstream call
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self.cancel_abandoned and self._waiters[task] == 1:
+                task.cancel()
+            raise
+        finally:
+            if left := self._waiters.pop(task) - 1:
+                self._waiters[task] = left
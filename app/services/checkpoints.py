@@ -0,0 +1,187 @@
+"""
+Checkpoint stores for per-session conversation threads.
+
+The default is an in-memory saver bounded by session count, idle TTL and
+total serialized size, which also keeps only the most recent checkpoints of
+each thread. Persistent backends (SQLite, Postgres, Redis) are optional
+packages selected with `CHECKPOINT_BACKEND` and opened for the lifetime of
+the app; they let sessions survive restarts and be shared across workers.
+"""
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Sequence, Set, Tuple
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import InMemorySaver
+
+from ..core.config import settings
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """
+    In-memory checkpointer with LRU/TTL eviction of whole threads and a cap on
+    the total serialized bytes held. Only the newest `keep_per_thread`
+    checkpoints of each thread are retained, so a long session costs the size
+    of its latest state rather than of its entire step history.
+    """
+
+    def __init__(self, max_threads: int, ttl_seconds: float, max_bytes: int, keep_per_thread: int = 2):
+        super().__init__()
+        self.max_threads = max_threads
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.keep_per_thread = keep_per_thread
+        self._lock = threading.RLock()
+        self._last_access: "OrderedDict[str, float]" = OrderedDict()
+        self._thread_bytes: Dict[str, int] = defaultdict(int)
+        self._sizes: Dict[Tuple, int] = {}
+        self._thread_keys: Dict[str, Set[Tuple]] = defaultdict(set)
+        self._history: Dict[Tuple[str, str], deque] = defaultdict(deque)
+        self.evictions = 0
+
+    # --- Accounting ---
+
+    def _track(self, thread_id: str, key: Tuple, size: int):
+        self._thread_bytes[thread_id] += size - self._sizes.get(key, 0)
+        self._sizes[key] = size
+        self._thread_keys[thread_id].add(key)
+
+    def _untrack(self, thread_id: str, key: Tuple):
+        self._thread_bytes[thread_id] -= self._sizes.pop(key, 0)
+        self._thread_keys[thread_id].discard(key)
+
+    def _touch(self, thread_id: str):
+        self._last_access[thread_id] = time.monotonic()
+        self._last_access.move_to_end(thread_id)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(self._thread_bytes.values())
+
+    # --- Saver API ---
+
+    def get_tuple(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            if thread_id in self._last_access:
+                self._touch(thread_id)
+            return super().get_tuple(config)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        with self._lock:
+            result = super().put(config, checkpoint, metadata, new_versions)
+            for channel, version in new_versions.items():
+                key = ("blob", thread_id, checkpoint_ns, channel, version)
+                self._track(thread_id, key, len(self.blobs[(thread_id, checkpoint_ns, channel, version)][1]))
+            saved = self.storage[thread_id][checkpoint_ns][checkpoint["id"]]
+            self._track(thread_id, ("checkpoint", thread_id, checkpoint_ns, checkpoint["id"]),
+                        len(saved[0][1]) + len(saved[1][1]))
+
+            history = self._history[(thread_id, checkpoint_ns)]
+            history.append((checkpoint["id"], dict(checkpoint["channel_versions"])))
+            self._prune_history(thread_id, checkpoint_ns, history)
+            self._touch(thread_id)
+            self._evict(protect=thread_id)
+            return result
+
+    def put_writes(self, config, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str = ""):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        with self._lock:
+            super().put_writes(config, writes, task_id, task_path)
+            outer_key = (thread_id, checkpoint_ns, checkpoint_id)
+            size = sum(len(w[2][1]) for w in self.writes.get(outer_key, {}).values())
+            self._track(thread_id, ("writes",) + outer_key, size)
+
+    def delete_thread(self, thread_id: str):
+        with self._lock:
+            self.storage.pop(thread_id, None)
+            for key in self._thread_keys.pop(thread_id, ()):
+                self._sizes.pop(key, None)
+                kind, rest = key[0], key[1:]
+                if kind == "blob":
+                    self.blobs.pop(rest, None)
+                elif kind == "writes":
+                    self.writes.pop(rest, None)
+            for history_key in [k for k in self._history if k[0] == thread_id]:
+                del self._history[history_key]
+            self._thread_bytes.pop(thread_id, None)
+            self._last_access.pop(thread_id, None)
+
+    # --- Eviction ---
+
+    def _prune_history(self, thread_id: str, checkpoint_ns: str, history: deque):
+        """Drops checkpoints older than the newest `keep_per_thread`, with their writes and blobs."""
+        while len(history) > self.keep_per_thread:
+            old_id, _ = history.popleft()
+            self.storage[thread_id][checkpoint_ns].pop(old_id, None)
+            self._untrack(thread_id, ("checkpoint", thread_id, checkpoint_ns, old_id))
+            self.writes.pop((thread_id, checkpoint_ns, old_id), None)
+            self._untrack(thread_id, ("writes", thread_id, checkpoint_ns, old_id))
+
+        live = {(channel, version) for _, versions in history for channel, version in versions.items()}
+        for key in [k for k in self._thread_keys[thread_id] if k[0] == "blob" and k[2] == checkpoint_ns]:
+            if (key[3], key[4]) not in live:
+                self.blobs.pop(key[1:], None)
+                self._untrack(thread_id, key)
+
+    def _evict(self, protect: str):
+        now = time.monotonic()
+        for thread_id, last in list(self._last_access.items()):
+            if thread_id != protect and now - last > self.ttl_seconds:
+                self.delete_thread(thread_id)
+                self.evictions += 1
+        while len(self._last_access) > 1 and (
+                len(self._last_access) > self.max_threads or self.total_bytes > self.max_bytes):
+            oldest = next(iter(self._last_access))
+            if oldest == protect:
+                break
+            self.delete_thread(oldest)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {"threads": len(self._last_access), "bytes": self.total_bytes, "evictions": self.evictions}
+
+
+def create_memory_checkpointer() -> BoundedMemorySaver:
+    return BoundedMemorySaver(
+        max_threads=settings.SESSION_MAX_THREADS,
+        ttl_seconds=settings.SESSION_TTL_SECONDS,
+        max_bytes=settings.SESSION_MAX_BYTES,
+        keep_per_thread=settings.CHECKPOINTS_PER_THREAD,
+    )
+
+
+@asynccontextmanager
+async def open_checkpointer() -> AsyncIterator[BaseCheckpointSaver]:
+    """
+    Opens the checkpointer selected by `CHECKPOINT_BACKEND` for the app's lifetime.
+    Persistent backends need their optional packages:
+    sqlite -> langgraph-checkpoint-sqlite, postgres -> langgraph-checkpoint-postgres,
+    redis -> langgraph-checkpoint-redis.
+    """
+    backend = settings.CHECKPOINT_BACKEND
+
+    if backend == "memory":
+        yield create_memory_checkpointer()
+    elif backend == "sqlite":
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+        async with AsyncSqliteSaver.from_conn_string(settings.CHECKPOINT_DB_URL) as saver:
+            yield saver
+    elif backend == "postgres":
+        from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+        async with AsyncPostgresSaver.from_conn_string(settings.CHECKPOINT_DB_URL) as saver:
+            await saver.setup()
+            yield saver
+    elif backend == "redis":
+        from langgraph.checkpoint.redis.aio import AsyncRedisSaver
+        async with AsyncRedisSaver.from_conn_string(settings.CHECKPOINT_DB_URL) as saver:
+            await saver.asetup()
+            yield saver
+    else:
+        raise ValueError(f"Unknown CHECKPOINT_BACKEND: {backend}")
@@ -0,0 +1,166 @@
+"""
+Context management stage for the agent graph.
+
+Runs once at the start of every turn, before the agent node, and keeps the
+history sent to the LLM within `CONTEXT_MAX_TOKENS`:
+
+* tool results from earlier turns are replaced by short stubs (the map payload
+  already reached the client; the model only needs the gist),
+* image parts are dropped once the turn that sent them is over,
+* turns beyond `CONTEXT_KEEP_TURNS`, or still over budget, are removed and
+  folded into a rolling extractive summary that goes into the system prompt.
+
+Token counts are estimated from characters; the agent node reports the real
+prompt token count from the model's usage metadata when it is available.
+"""
+import json
+from typing import Any, Dict, List
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, RemoveMessage, ToolMessage
+
+from ..core.config import settings
+
+
+CHARS_PER_TOKEN = 4
+IMAGE_TOKENS = 258  # Gemini's flat cost for one image part
+IMAGE_PLACEHOLDER = "[image omitted]"
+STUB_PREFIX = "[earlier result, shortened] "
+
+
+def _part_text(part: Any) -> str:
+    if isinstance(part, str):
+        return part
+    if isinstance(part, dict) and part.get("type") == "text":
+        return part.get("text", "")
+    return ""
+
+
+def _text(message: BaseMessage) -> str:
+    if isinstance(message.content, str):
+        return message.content
+    return " ".join(t for t in (_part_text(p) for p in message.content) if t)
+
+
+def _has_image(message: BaseMessage) -> bool:
+    return isinstance(message.content, list) and any(
+        isinstance(p, dict) and p.get("type") in ("image_url", "image", "media") for p in message.content)
+
+
+def estimate_tokens(messages: List[BaseMessage], summary: str = "") -> int:
+    """Rough prompt size: characters / 4, plus a flat cost per image and per tool call."""
+    chars = len(summary)
+    images = 0
+    for message in messages:
+        chars += len(_text(message))
+        if _has_image(message):
+            images += sum(1 for p in message.content if isinstance(p, dict) and p.get("type") != "text")
+        if isinstance(message, AIMessage):
+            chars += sum(len(json.dumps(call["args"])) + len(call["name"]) for call in message.tool_calls)
+    return chars // CHARS_PER_TOKEN + images * IMAGE_TOKENS
+
+
+def _split_turns(messages: List[BaseMessage]) -> List[List[BaseMessage]]:
+    """Groups the history into turns, each starting at a user message."""
+    turns: List[List[BaseMessage]] = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + "..."
+
+
+def _tool_stub(message: ToolMessage) -> ToolMessage | None:
+    """A compact replacement for a bulky tool result, or None if it is already small."""
+    limit = settings.CONTEXT_TOOL_RESULT_MAX_CHARS
+    if len(message.content) <= limit or not isinstance(message.content, str):
+        return None
+    try:
+        data = json.loads(message.content)
+        text = data.get("response_text") if isinstance(data, dict) else None
+    except ValueError:
+        text = None
+    text = _clip(text or message.content, limit - len(STUB_PREFIX))
+    return ToolMessage(content=STUB_PREFIX + text, tool_call_id=message.tool_call_id,
+                       name=message.name, id=message.id, status=message.status)
+
+
+def _without_images(message: HumanMessage) -> HumanMessage:
+    parts = [p for p in message.content if _part_text(p)] + [{"type": "text", "text": IMAGE_PLACEHOLDER}]
+    return HumanMessage(content=parts, id=message.id)
+
+
+def _summarize_turn(turn: List[BaseMessage]) -> str:
+    """One extractive line per turn: what was asked, which tools ran, what was answered."""
+    limit = settings.CONTEXT_SUMMARY_LINE_MAX_CHARS
+    asked = _clip(_text(turn[0]), limit // 2) if isinstance(turn[0], HumanMessage) else ""
+    used = sorted({call["name"] for m in turn if isinstance(m, AIMessage) for call in m.tool_calls})
+    answers = [m for m in turn if isinstance(m, AIMessage) and not m.tool_calls]
+    answered = _clip(_text(answers[-1]), limit // 2) if answers else ""
+    line = f"- User: {asked}"
+    if used:
+        line += f" (tools: {', '.join(used)})"
+    return line + (f" -> Assistant: {answered}" if answered else "")
+
+
+def _merge_summary(summary: str, lines: List[str]) -> str:
+    """Appends new lines, dropping the oldest ones once the summary is over its cap."""
+    merged = [line for line in summary.splitlines() if line] + lines
+    while len(merged) > 1 and sum(len(line) + 1 for line in merged) > settings.CONTEXT_SUMMARY_MAX_CHARS:
+        merged.pop(0)
+    return "\n".join(merged)
+
+
+def compact_history(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Graph node: returns the message updates (replacements by id and removals)
+    that bring the history within budget, plus the new rolling summary.
+    """
+    turns = _split_turns(state["messages"])
+    summary = state.get("summary", "")
+    updates: List[BaseMessage] = []
+    if len(turns) <= 1:
+        return {"prompt_tokens": 0}
+
+    # 1. Shrink earlier turns in place: tool payloads to stubs, images to a placeholder
+    compacted: List[List[BaseMessage]] = []
+    for turn in turns[:-1]:
+        kept = []
+        for message in turn:
+            replacement = None
+            if isinstance(message, ToolMessage):
+                replacement = _tool_stub(message)
+            elif isinstance(message, HumanMessage) and _has_image(message):
+                replacement = _without_images(message)
+            if replacement is not None:
+                updates.append(replacement)
+            kept.append(replacement or message)
+        compacted.append(kept)
+
+    # 2. Fold the oldest turns into the summary while over the turn count or the token budget
+    folded = []
+    current = turns[-1]
+    while compacted and (
+            len(compacted) > settings.CONTEXT_KEEP_TURNS
+            or estimate_tokens([m for t in compacted for m in t] + current,
+                               _merge_summary(summary, [_summarize_turn(t) for t in folded]))
+            > settings.CONTEXT_MAX_TOKENS):
+        folded.append(compacted.pop(0))
+
+    if folded:
+        summary = _merge_summary(summary, [_summarize_turn(t) for t in folded])
+        folded_ids = {m.id for t in folded for m in t}
+        updates = [m for m in updates if m.id not in folded_ids]
+        updates += [RemoveMessage(id=m.id) for t in folded for m in t]
+
+    return {"messages": updates, "summary": summary, "prompt_tokens": 0}
+
+
+def prompt_tokens(response: AIMessage, prompt: List[BaseMessage]) -> int:
+    """Prompt tokens billed for one model call, estimated when the provider does not report them."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    return usage.get("input_tokens") or estimate_tokens(prompt)
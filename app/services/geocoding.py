@@ -0,0 +1,218 @@
+"""
+Cached geocoder shared by the Maps and AQI tools.
+
+Lookups are keyed on a normalized form of the address and served from a
+bounded in-memory LRU/TTL cache, optionally backed by a SQLite file that
+survives restarts. ZERO_RESULTS answers are cached too (for a shorter TTL)
+so repeated misspellings do not keep spending quota.
+"""
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Tuple
+
+import httpx
+
+from ..core.config import settings
+from . import http_client
+from .cache import MISSING, TTLCache
+
+
+MOCK_GEOCODE_RESULT = {"lat": 28.4526, "lng": 77.0863}  # Example coordinates
+
+_COORDINATES = re.compile(r"^\s*(-?\d{1,2}(?:\.\d+)?)\s*,\s*(-?\d{1,3}(?:\.\d+)?)\s*$")
+
+
+def normalize_address(address: str) -> str:
+    """Canonical cache key: case-folded, single-spaced, without trailing punctuation."""
+    return re.sub(r"\s+", " ", address).strip().strip(".,;").casefold()
+
+
+def parse_coordinates(address: str) -> Dict[str, float] | None:
+    """Returns the pair for a literal 'lat,lng' string, which never needs a lookup."""
+    match = _COORDINATES.match(address)
+    if not match:
+        return None
+    lat, lng = float(match.group(1)), float(match.group(2))
+    if -90 <= lat <= 90 and -180 <= lng <= 180:
+        return {"lat": lat, "lng": lng}
+    return None
+
+
+class SqliteGeocodeStore:
+    """
+    On-disk second tier for the geocode cache. Expired rows are deleted when
+    read, and all of them on open and at most every `purge_interval` seconds
+    of writes, so the file does not grow without bound.
+    """
+
+    def __init__(self, path: str, purge_interval: float = 3600.0):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                "key TEXT PRIMARY KEY, value TEXT, expires_at REAL NOT NULL)"
+            )
+        self.hits = 0
+        self.purge_interval = purge_interval
+        self.purge()
+
+    def lookup(self, key: str) -> Tuple[Any, float]:
+        """(value, seconds left to live), or (MISSING, 0) for absent and expired rows."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM geocode WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[1] <= now:
+                with self._conn:
+                    self._conn.execute("DELETE FROM geocode WHERE key = ? AND expires_at <= ?", (key, now))
+        if row is None or row[1] <= now:
+            return MISSING, 0.0
+        self.hits += 1
+        return json.loads(row[0]), row[1] - now
+
+    def get(self, key: str) -> Any:
+        return self.lookup(key)[0]
+
+    def set(self, key: str, value: Dict[str, float] | None, ttl: float):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO geocode (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + ttl),
+            )
+        if time.time() - self._purged_at >= self.purge_interval:
+            self.purge()
+
+    def purge(self) -> int:
+        """Deletes every expired row; returns how many."""
+        with self._lock, self._conn:
+            self._purged_at = time.time()
+            return self._conn.execute("DELETE FROM geocode WHERE expires_at <= ?", (self._purged_at,)).rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_memory_cache = TTLCache(maxsize=settings.GEOCODE_CACHE_MAX_ENTRIES, ttl=settings.GEOCODE_CACHE_TTL_SECONDS,
+                         name="geocode")
+_disk_store: SqliteGeocodeStore | None = None
+_disk_lock = threading.Lock()
+
+
+def open_geocode_store() -> SqliteGeocodeStore | None:
+    """The on-disk tier, opened on first use (or at startup); None when `GEOCODE_CACHE_DB_PATH` is unset."""
+    global _disk_store
+    if _disk_store is None and settings.GEOCODE_CACHE_DB_PATH:
+        with _disk_lock:
+            if _disk_store is None:
+                _disk_store = SqliteGeocodeStore(settings.GEOCODE_CACHE_DB_PATH)
+    return _disk_store
+
+
+def close_geocode_store():
+    """Closes the on-disk tier. Called on application shutdown."""
+    global _disk_store
+    with _disk_lock:
+        if _disk_store is not None:
+            _disk_store.close()
+            _disk_store = None
+
+
+def _cached(key: str) -> Any:
+    value = _memory_cache.get(key)
+    if value is MISSING and (disk := open_geocode_store()) is not None:
+        value, remaining = disk.lookup(key)
+        if value is not MISSING:
+            _memory_cache.set(key, value, min(remaining, _ttl_for(value)))  # never outlives the disk row
+    return value
+
+
+def _ttl_for(value: Dict[str, float] | None) -> float:
+    return settings.GEOCODE_CACHE_TTL_SECONDS if value is not None else settings.GEOCODE_NEGATIVE_TTL_SECONDS
+
+
+def _store(key: str, value: Dict[str, float] | None):
+    _memory_cache.set(key, value, _ttl_for(value))
+    if (disk := open_geocode_store()) is not None:
+        disk.set(key, value, _ttl_for(value))
+
+
+def _parse_response(data: Dict[str, Any]) -> Tuple[bool, Dict[str, float] | None]:
+    """Returns (cacheable, coordinates). Only OK and ZERO_RESULTS answers are cacheable."""
+    if data.get("status") == "OK" and data.get("results"):
+        location = data["results"][0]["geometry"]["location"]
+        return True, {"lat": location["lat"], "lng": location["lng"]}
+    return data.get("status") == "ZERO_RESULTS", None
+
+
+def geocode(address: str) -> Dict[str, float] | None:
+    """Geocodes a text address to latitude and longitude."""
+    if coords := parse_coordinates(address):
+        return coords
+
+    if settings.MAPS_MOCK_ENABLED:
+        print("DEBUG: Using Mock Geocode")
+        return MOCK_GEOCODE_RESULT
+
+    key = normalize_address(address)
+    if (cached := _cached(key)) is not MISSING:
+        return cached
+
+    params = {'address': address, 'key': settings.MAPS_API_KEY}
+
+    try:
+        response = http_client.get(settings.MAPS_BASE_URL + "geocode/json", params=params)
+        response.raise_for_status()
+        cacheable, coords = _parse_response(response.json())
+    except httpx.HTTPError as e:
+        print(f"Geocoding Error: {e}")
+        return None
+
+    if cacheable:
+        _store(key, coords)
+    return coords
+
+
+async def ageocode(address: str) -> Dict[str, float] | None:
+    """Async variant of `geocode`; shares its cache."""
+    if coords := parse_coordinates(address):
+        return coords
+
+    if settings.MAPS_MOCK_ENABLED:
+        print("DEBUG: Using Mock Geocode")
+        return MOCK_GEOCODE_RESULT
+
+    key = normalize_address(address)
+    if (cached := _cached(key)) is not MISSING:
+        return cached
+
+    params = {'address': address, 'key': settings.MAPS_API_KEY}
+
+    try:
+        response = await http_client.aget(settings.MAPS_BASE_URL + "geocode/json", params=params)
+        response.raise_for_status()
+        cacheable, coords = _parse_response(response.json())
+    except httpx.HTTPError as e:
+        print(f"Geocoding Error: {e}")
+        return None
+
+    if cacheable:
+        _store(key, coords)
+    return coords
+
+
+def geocode_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters for the geocode cache tiers."""
+    stats = _memory_cache.stats()
+    stats["disk_hits"] = _disk_store.hits if _disk_store is not None else 0
+    return stats
+
+
+def clear_geocode_cache():
+    """Drops the in-memory tier (the disk tier, if any, is left intact)."""
+    _memory_cache.clear()
@@ -0,0 +1,154 @@
+"""
+Route geometry stage: simplifies route geometry before it is sent to the
+client, with a tolerance derived from the requested zoom level or from a
+point budget, and optionally emits encoded levels of detail.
+
+Tool artifacts carry routes as Google's encoded polyline; this is where it
+is decoded (once, into a NumPy array) and written out in the requested
+`route_format`: a `path` of `{lat, lng}` objects, compact `coords` pairs
+(left as an array for the JSON encoder), or a re-encoded `polyline`.
+"""
+import math
+from typing import Any, Dict
+
+import numpy as np
+
+from ..core.config import settings
+from . import polyline
+
+
+EARTH_RADIUS_M = 6378137.0
+METERS_PER_PIXEL_AT_ZOOM_0 = 156543.03392  # Web Mercator, at the equator
+
+
+def zoom_tolerance_m(zoom: float, latitude: float, pixels: float | None = None) -> float:
+    """Ground distance covered by `pixels` screen pixels at `zoom` and `latitude`."""
+    pixels = settings.ROUTE_SIMPLIFY_PIXELS if pixels is None else pixels
+    return pixels * METERS_PER_PIXEL_AT_ZOOM_0 * math.cos(math.radians(latitude)) / (2 ** zoom)
+
+
+def _project(coords: np.ndarray) -> np.ndarray:
+    """Local equirectangular projection to metres, good enough for tolerances."""
+    lat0 = math.radians(float(coords[:, 0].mean()))
+    rad = np.radians(coords)
+    return np.column_stack((rad[:, 1] * EARTH_RADIUS_M * math.cos(lat0), rad[:, 0] * EARTH_RADIUS_M))
+
+
+def _importance(xy: np.ndarray, floor: float = 0.0) -> np.ndarray:
+    """
+    Douglas-Peucker run once, recording for every vertex the largest tolerance
+    at which it survives (endpoints are infinite). Simplifying at any tolerance
+    >= `floor` is then a threshold on this array, so zoom levels, LODs and point
+    budgets all share a single pass. Vertices below `floor` are left at 0.
+    """
+    n = len(xy)
+    importance = np.zeros(n)
+    importance[0] = importance[-1] = np.inf
+    stack = [(0, n - 1, np.inf)]
+
+    while stack:
+        start, end, parent = stack.pop()
+        if end - start < 2:
+            continue
+        a, b = xy[start], xy[end]
+        inner = xy[start + 1:end] - a
+        direction = b - a
+        length_sq = float(direction @ direction)
+        if length_sq:
+            t = np.clip((inner @ direction) / length_sq, 0.0, 1.0)
+            inner = inner - t[:, None] * direction
+        distances = np.einsum("ij,ij->i", inner, inner)
+        i = int(np.argmax(distances))
+        distance = math.sqrt(distances[i])
+        if distance > floor:
+            split = start + 1 + i
+            # Nested levels: a vertex never outlives the split that created its segment
+            importance[split] = min(distance, parent)
+            stack.append((start, split, importance[split]))
+            stack.append((split, end, importance[split]))
+
+    return importance
+
+
+def _top_k(importance: np.ndarray, k: int) -> np.ndarray:
+    """Mask of the `k` most important vertices, in path order."""
+    if len(importance) <= k:
+        return np.ones(len(importance), dtype=bool)
+    mask = np.zeros(len(importance), dtype=bool)
+    mask[np.argpartition(-importance, k - 1)[:k]] = True
+    return mask
+
+
+def simplify(coords: np.ndarray, tolerance_m: float) -> np.ndarray:
+    """Drops vertices that deviate less than `tolerance_m` metres from the simplified line."""
+    if len(coords) < 3 or tolerance_m <= 0:
+        return coords
+    return coords[_importance(_project(coords), tolerance_m) > tolerance_m]
+
+
+def simplify_to_budget(coords: np.ndarray, max_points: int) -> np.ndarray:
+    """Keeps the `max_points` vertices that matter most to the line's shape."""
+    if len(coords) <= max_points:
+        return coords
+    return coords[_top_k(_importance(_project(coords)), max_points)]
+
+
+def route_coords(route: Dict[str, Any]) -> np.ndarray | None:
+    """A route's vertices as `(N, 2)` `[lat, lng]`, from its `polyline` or a legacy `path` of dicts."""
+    if route.get("polyline"):
+        return polyline.decode_array(route["polyline"])
+    if route.get("path"):
+        return np.array([(p["lat"], p["lng"]) for p in route["path"]], dtype=np.float64)
+    return None
+
+
+def shape_route(route: Dict[str, Any], zoom: int | None = None, max_points: int | None = None,
+                route_format: str = "path", lods: bool = False) -> Dict[str, Any]:
+    """Applies the geometry stage to one `map_data.routes[]` entry."""
+    coords = route_coords(route)
+    if coords is None or not len(coords):
+        return route
+    max_points = max_points or settings.ROUTE_MAX_POINTS
+    latitude = float(coords[:, 0].mean())
+
+    # One importance pass serves the zoom tolerance, the point budget and every LOD
+    tolerances = {z: zoom_tolerance_m(z, latitude) for z in (settings.ROUTE_LOD_ZOOMS if lods else [])}
+    if zoom is not None:
+        tolerances[zoom] = zoom_tolerance_m(zoom, latitude)
+    importance = None
+    if len(coords) >= 3 and (tolerances or len(coords) > max_points):
+        importance = _importance(_project(coords), min(tolerances.values(), default=0.0))
+
+    mask = np.ones(len(coords), dtype=bool)
+    if importance is not None:
+        if zoom is not None:
+            mask &= importance > tolerances[zoom]
+        if mask.sum() > max_points:
+            mask &= _top_k(importance, max_points)
+
+    shaped = {k: v for k, v in route.items() if k not in ("path", "polyline")}
+    if route_format == "polyline":
+        unchanged = route.get("polyline") and mask.all()
+        shaped["polyline"] = route["polyline"] if unchanged else polyline.encode_array(coords[mask])
+    elif route_format == "coords":
+        shaped["coords"] = coords[mask]
+    else:
+        shaped["path"] = polyline.to_dicts(coords[mask])
+    if lods:
+        shaped["lods"] = [
+            {"zoom": z, "polyline": polyline.encode_array(coords[importance > tolerances[z]]
+                                                          if importance is not None else coords)}
+            for z in sorted(settings.ROUTE_LOD_ZOOMS)
+        ]
+    return shaped
+
+
+def shape_map_data(map_data: Dict[str, Any] | None, zoom: int | None = None, max_points: int | None = None,
+                   route_format: str = "path", lods: bool = False) -> Dict[str, Any] | None:
+    """Runs every route in a `map_data` payload through `shape_route`."""
+    if not map_data or not map_data.get("routes"):
+        return map_data
+    return {
+        **map_data,
+        "routes": [shape_route(r, zoom, max_points, route_format, lods) for r in map_data["routes"]],
+    }
@@ -1,9 +1,30 @@
-import json
-import requests
-from typing import Dict, Any, List
-from langchain_core.tools import tool
+import logging
+from typing import Dict, Any, List, Tuple
+import orjson
+from langchain_core.tools import StructuredTool
 
 from ..core.config import settings
+from . import http_client, metrics, polyline, resilience, traffic_tips
+from .cache import MISSING, SingleFlight, TTLCache
+from .geocoding import ageocode as _ageocode_address, geocode as _geocode_address
+from .geocoding import normalize_address, parse_coordinates
+
+logger = logging.getLogger(__name__)
+
+
+MOCK_PLACES_RESPONSE = {"results": [{"name": "Mock Place in Requested City", "rating": 4.5,
+                                     "geometry": {"location": {"lat": 28.4595, "lng": 77.0266}}}]}
+
+
+def _parse_maps_response(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalizes the status handling shared by every Maps web service."""
+    if data.get("status") == "OK":
+        return data
+    elif data.get("status") == "ZERO_RESULTS":
+        return {"results": []}
+    else:
+        print(f"Maps Error: {data.get('status')} - {data.get('error_message', '')}")
+        return {"error_message": f"Maps Error: {data.get('status')} - {data.get('error_message', '')}"}
 
 
 def _fetch_maps_data(url: str, params: Dict[str, Any]) -> Dict[str, Any]:
@@ -11,131 +32,396 @@ def _fetch_maps_data(url: str, params: Dict[str, Any]) -> Dict[str, Any]:
     if settings.MAPS_MOCK_ENABLED:
         # Mock Response for testing
         print("DEBUG: Using Mock Data")
-        return {"results": [{"name": "Mock Place in Requested City", "rating": 4.5,
-                             "geometry": {"location": {"lat": 28.4595, "lng": 77.0266}}}]}
+        return MOCK_PLACES_RESPONSE
 
     try:
         params['key'] = settings.MAPS_API_KEY
-        response = requests.get(url, params=params, timeout=10)
+        response = http_client.get(url, params=params)
         response.raise_for_status()
-        data = response.json()
-
-        if data.get("status") == "OK":
-            return data
-        elif data.get("status") == "ZERO_RESULTS":
-            return {"results": []}
-        else:
-            print(f"Maps Error: {data.get('status')} - {data.get('error_message', '')}")
-            return {"error_message": f"Maps Error: {data.get('status')} - {data.get('error_message', '')}"}
+        return _parse_maps_response(response.json())
     except Exception as e:
         print(str(e))
         return {"error_message": str(e)}
 
 
-def _geocode_address(address: str) -> Dict[str, float] | None:
-    """Geocodes a text address to latitude and longitude."""
-    base_url = "https://maps.googleapis.com/maps/api/geocode/json"
-
+async def _afetch_maps_data(url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Async variant of `_fetch_maps_data`."""
     if settings.MAPS_MOCK_ENABLED:
-        print("DEBUG: Using Mock Geocode")
-        return {"lat": 28.4526, "lng": 77.0863}  # Example coordinates
-
-    params = {'address': address, 'key': settings.MAPS_API_KEY}
+        print("DEBUG: Using Mock Data")
+        return MOCK_PLACES_RESPONSE
 
     try:
-        response = requests.get(base_url, params=params, timeout=5)
+        params['key'] = settings.MAPS_API_KEY
+        response = await http_client.aget(url, params=params)
         response.raise_for_status()
-        data = response.json()
+        return _parse_maps_response(response.json())
+    except Exception as e:
+        print(str(e))
+        return {"error_message": str(e)}
 
-        if data.get("status") == "OK" and data.get("results"):
-            location = data["results"][0]["geometry"]["location"]
-            return {"lat": location["lat"], "lng": location["lng"]}
-        return None
-    except requests.exceptions.RequestException as e:
-        print(f"Geocoding Error: {e}")
-        return None
 
+# --- Response cache for the Directions and Places endpoints ---
 
-def decode_polyline(polyline_str: str) -> List[Dict[str, float]]:
-    """Decodes a Google Maps encoded polyline string."""
-    # The original decode_polyline logic remains here
-    index, lat, lng = 0, 0, 0
-    coordinates = []
-    changes = {'latitude': 0, 'longitude': 0}
-
-    while index < len(polyline_str):
-        for unit in ['latitude', 'longitude']:
-            shift, result = 0, 0
-            while True:
-                byte = ord(polyline_str[index]) - 63
-                index += 1
-                result |= (byte & 0x1f) << shift
-                shift += 5
-                if byte < 0x20:
-                    break
-            if result & 1:
-                changes[unit] = ~(result >> 1)
-            else:
-                changes[unit] = (result >> 1)
+def _cache_ttls() -> Dict[str, int]:
+    return {
+        "directions/json": settings.MAPS_DIRECTIONS_CACHE_TTL_SECONDS,
+        "place/textsearch/json": settings.MAPS_PLACES_CACHE_TTL_SECONDS,
+        "distancematrix/json": settings.MAPS_DIRECTIONS_CACHE_TTL_SECONDS,
+    }
+
+
+_response_cache = TTLCache(
+    maxsize=settings.MAPS_CACHE_MAX_ENTRIES,
+    ttl=settings.MAPS_PLACES_CACHE_TTL_SECONDS,
+    max_bytes=settings.MAPS_CACHE_MAX_BYTES,
+    sizeof=lambda data: len(orjson.dumps(data)),
+    name="maps",
+    stale_ttl=settings.STALE_SERVE_SECONDS,
+)
+_maps_flights = SingleFlight()
+
+
+def _canonical_location(value: str) -> str:
+    """Rounds 'lat,lng' strings so nearby origins share an entry; normalizes free text."""
+    coords = parse_coordinates(str(value))
+    if coords is None:
+        return normalize_address(str(value))
+    decimals = settings.MAPS_CACHE_COORD_DECIMALS
+    return f"{round(coords['lat'], decimals)},{round(coords['lng'], decimals)}"
+
+
+def _cache_key(endpoint: str, params: Dict[str, Any]) -> tuple:
+    """Canonical (endpoint, params) key; the API key is never part of it."""
+    canonical = {}
+    for name, value in params.items():
+        if name == "key":
+            continue
+        if name in ("origin", "destination", "location"):
+            canonical[name] = _canonical_location(value)
+        elif name in ("waypoints", "origins", "destinations"):
+            canonical[name] = "|".join(_canonical_location(w) for w in str(value).split("|"))
+        elif name == "query":
+            canonical[name] = normalize_address(value)
+        else:
+            canonical[name] = str(value)
+    return endpoint, tuple(sorted(canonical.items()))
+
+
+def _should_cache(data: Dict[str, Any]) -> bool:
+    return not settings.MAPS_MOCK_ENABLED and "error_message" not in data
+
+
+def _store(key: tuple, endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Caches a good response; on an error, answers from a recently expired entry if there is one."""
+    if _should_cache(data):
+        _response_cache.set(key, data, _cache_ttls()[endpoint])
+    elif "error_message" in data and (stale := _response_cache.get_stale(key)) is not MISSING:
+        resilience.stale_served("maps")
+        return stale
+    return data
 
-        lat += changes['latitude']
-        lng += changes['longitude']
-        coordinates.append({"lat": lat / 100000.0, "lng": lng / 100000.0})
 
-    return coordinates
+def _fetch_cached(endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """`_fetch_maps_data` behind the response cache; identical in-flight requests share one call."""
+    key = _cache_key(endpoint, params)
+    if (cached := _response_cache.get(key)) is not MISSING:
+        return cached
 
-@tool
-def maps_api_search(search_term: str,
-                    latitude: float,
-                    longitude: float,
-                    search_type: str = "nearby",
-                    origin_override: str = None,
-                    waypoints: str = None) -> str:
+    def fetch():
+        return _store(key, endpoint, _fetch_maps_data(settings.MAPS_BASE_URL + endpoint, params))
+
+    return _maps_flights.do(key, fetch)
+
+
+async def _afetch_cached(endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Async variant of `_fetch_cached`."""
+    key = _cache_key(endpoint, params)
+    if (cached := _response_cache.get(key)) is not MISSING:
+        return cached
+
+    async def fetch():
+        return _store(key, endpoint, await _afetch_maps_data(settings.MAPS_BASE_URL + endpoint, params))
+
+    return await _maps_flights.ado(key, fetch)
+
+
+def maps_cache_stats() -> Dict[str, Any]:
+    """Hit-rate metrics for the Directions/Places response cache."""
+    stats = _response_cache.stats()
+    stats["coalesced"] = _maps_flights.coalesced
+    return stats
+
+
+def _matrix_params(origins: List[str], destinations: List[str]) -> Dict[str, Any]:
+    return {"origins": "|".join(origins), "destinations": "|".join(destinations), "mode": "driving"}
+
+
+def _parse_matrix(api_response: Dict[str, Any], origins: int, destinations: int) -> Dict[str, Any]:
+    """{"seconds": [[...]], "meters": [[...]]} per (origin, destination); None where there is no route."""
+    if "error_message" in api_response:
+        return api_response
+    rows = api_response.get("rows", [])
+    if len(rows) != origins or any(len(row.get("elements", [])) != destinations for row in rows):
+        return {"error_message": "Maps Error: incomplete distance matrix."}
+    seconds, meters = [], []
+    for row in rows:
+        ok = [element if element.get("status") == "OK" else None for element in row["elements"]]
+        seconds.append([(e.get("duration_in_traffic") or e["duration"])["value"] if e else None for e in ok])
+        meters.append([e["distance"]["value"] if e else None for e in ok])
+    return {"seconds": seconds, "meters": meters}
+
+
+def travel_time_matrix(origins: List[str], destinations: List[str]) -> Dict[str, Any]:
     """
-    Searches Google Maps for nearby places or calculates a driving route.
-    search_type: 'nearby' (finds places), 'route' (calculates directions).
+    Driving times from every origin to every destination in one Distance Matrix request
+    (at most 100 pairs). Origins are rounded like route origins, so nearby callers share it.
     """
-    # Placeholder for LLM import from agent_service to avoid circular dependency
-    from .agent_service import llm
+    api_response = _fetch_cached("distancematrix/json", _matrix_params(origins, destinations))
+    return _parse_matrix(api_response, len(origins), len(destinations))
+
+
+async def atravel_time_matrix(origins: List[str], destinations: List[str]) -> Dict[str, Any]:
+    """Async variant of `travel_time_matrix`."""
+    api_response = await _afetch_cached("distancematrix/json", _matrix_params(origins, destinations))
+    return _parse_matrix(api_response, len(origins), len(destinations))
+
+
+def fetch_directions(origin: str, destination: str, waypoints: str = None) -> Dict[str, Any]:
+    """A cached Directions response for a driving route (waypoints '|'-separated, visited in that order)."""
+    return _fetch_cached("directions/json", _route_params(origin, destination, waypoints))
+
+
+async def afetch_directions(origin: str, destination: str, waypoints: str = None) -> Dict[str, Any]:
+    """Async variant of `fetch_directions`."""
+    return await _afetch_cached("directions/json", _route_params(origin, destination, waypoints))
+
+
+def decode_polyline(polyline_str: str) -> List[Dict[str, float]]:
+    """Decodes a Google Maps encoded polyline string (list-of-dicts view)."""
+    with metrics.span("polyline", "decode"):
+        return polyline.to_dicts(polyline.decode_array(polyline_str))
+
+
+# --- Shared response builders (used by both the sync and async tool paths) ---
 
-    base_url = "https://maps.googleapis.com/maps/api/"
-    results = {
+def _empty_results() -> Dict[str, Any]:
+    return {
         "response_text": "I was unable to find results.",
         "map_data": {"points": [], "routes": []}
     }
 
+
+def _nearby_params(search_term: str, latitude: float, longitude: float) -> Dict[str, Any]:
+    return {
+        "query": search_term,
+        "location": f"{latitude},{longitude}",
+        "radius": 10000
+    }
+
+
+def _wants_eta(max_travel_minutes: float | None) -> bool:
+    return max_travel_minutes is not None or settings.NEARBY_ETA_RANKING
+
+
+def _clamp_top_k(top_k: int | None) -> int:
+    return max(1, min(top_k or 5, settings.NEARBY_MAX_TOP_K))
+
+
+def _place_coordinates(places: List[Dict[str, Any]]) -> List[str]:
+    return [f"{p['geometry']['location']['lat']},{p['geometry']['location']['lng']}" for p in places]
+
+
+def rank_by_eta(places: List[Dict[str, Any]], seconds: List[float | None], max_travel_minutes: float | None = None,
+                top_k: int = 5) -> List[Dict[str, Any]]:
+    """
+    Places reachable within `max_travel_minutes`, best first, each with its `eta_minutes`.
+    The score trades drive time against rating: one star is worth `NEARBY_MINUTES_PER_STAR`.
+    """
+    scored = []
+    for i, (place, travel) in enumerate(zip(places, seconds)):
+        if travel is None or (max_travel_minutes is not None and travel > max_travel_minutes * 60):
+            continue
+        rating = place.get("rating") or settings.NEARBY_UNRATED_STARS
+        scored.append((travel / 60 - settings.NEARBY_MINUTES_PER_STAR * rating, i,
+                       {**place, "eta_minutes": max(1, round(travel / 60))}))
+    scored.sort(key=lambda item: item[:2])
+    return [place for _, _, place in scored[:top_k]]
+
+
+def _build_nearby_results(results: Dict[str, Any], search_term: str, places: List[Dict[str, Any]],
+                          max_travel_minutes: float | None = None, top_k: int = 5):
+    """Fills `results` from Places text-search results (already ranked and cut to `top_k` if they carry ETAs)."""
+    if places:
+        points = []
+        if max_travel_minutes is None:
+            budget = ""
+        elif any(place.get("eta_minutes") is not None for place in places):
+            budget = f" within {max_travel_minutes:g} minutes by car"
+        else:  # ETA ranking failed: these are unfiltered, in relevance order
+            budget = f" (drive times couldn't be checked, so some may be more than {max_travel_minutes:g} minutes away)"
+        response_lines = [f"Here are the results for **'{search_term}'**{budget}:"]
+
+        for i, result in enumerate(places[:top_k]):
+            lat = result["geometry"]["location"]["lat"]
+            lng = result["geometry"]["location"]["lng"]
+            name = result.get("name", f"Result {i + 1}")
+            rating = result.get("rating", "N/A")
+            address = result.get("formatted_address", "")
+            eta = result.get("eta_minutes")
+
+            point = {"name": name, "latitude": lat, "longitude": lng}
+            if eta is not None:
+                point["eta_minutes"] = eta
+            points.append(point)
+
+            drive = f", {eta} min drive" if eta is not None else ""
+            response_lines.append(f"* **{name}** ({rating}⭐{drive})\n  _{address}_")
+
+        results["response_text"] = "\n".join(response_lines)
+        results["map_data"]["points"] = points
+    elif max_travel_minutes is not None:
+        results["response_text"] = (f"I couldn't find any places matching '{search_term}' "
+                                    f"within {max_travel_minutes:g} minutes by car.")
+    else:
+        results["response_text"] = f"I couldn't find any places matching '{search_term}'."
+
+
+def _ranked_places(places: List[Dict[str, Any]], matrix: Dict[str, Any], max_travel_minutes: float | None,
+                   top_k: int) -> List[Dict[str, Any]]:
+    """ETA-ranked places, or Google's relevance order if the travel times could not be fetched."""
+    if "error_message" in matrix:
+        logger.warning("ETA ranking skipped: %s", matrix["error_message"])
+        return places
+    return rank_by_eta(places, matrix["seconds"][0], max_travel_minutes, top_k)
+
+
+def _route_params(origin_address: str, search_term: str, waypoints: str = None) -> Dict[str, Any]:
+    params = {"origin": origin_address, "destination": search_term, "mode": "driving"}
+    if waypoints:
+        params["waypoints"] = waypoints
+    return params
+
+
+def _build_route_results(results: Dict[str, Any], route: Dict[str, Any], origin_name: str,
+                         origin_address: str, search_term: str, ai_advice: str):
+    """Fills `results` from the first route of a Directions response."""
+    leg = route["legs"][0]
+    distance = leg["distance"]["text"]
+    duration = leg["duration"]["text"]
+    destination = route["legs"][-1]["end_location"]
+
+    results["response_text"] = (
+        f"### Route from {origin_name} to {search_term}\n"
+        f"* 🚗 **Distance:** {distance}\n"
+        f"* ⏱️ **Time:** {duration}\n\n"
+        f"**Note:**\n{ai_advice}"
+    )
+    # Kept encoded: the geometry stage decodes it once, into the format the client asked for
+    results["map_data"]["routes"] = [{"polyline": route["overview_polyline"]["points"]}]
+
+    if origin_name != "Current Location":
+        results["map_data"]["points"].append({
+            "name": origin_name,
+            "latitude": float(origin_address.split(',')[0]),
+            "longitude": float(origin_address.split(',')[1]),
+            "color": "blue"
+        })
+
+    results["map_data"]["points"].append({
+        "name": search_term,
+        "latitude": destination["lat"],
+        "longitude": destination["lng"]
+    })
+
+
+def _maps_api_search(search_term: str,
+                     latitude: float,
+                     longitude: float,
+                     search_type: str = "nearby",
+                     origin_override: str = None,
+                     waypoints: str = None,
+                     max_travel_minutes: float = None,
+                     top_k: int = 5) -> Tuple[str, Dict[str, Any]]:
+    """
+    Searches Google Maps for nearby places or calculates a driving route.
+    search_type: 'nearby' (finds places), 'route' (calculates directions).
+    max_travel_minutes: for 'nearby', only places within this driving time, ranked by ETA and rating.
+    top_k: how many places to return for 'nearby'.
+    """
+    results = _empty_results()
+
     # 1. SEARCH LOGIC (Text Search)
     if search_type == "nearby" and search_term:
-        url = base_url + "place/textsearch/json"
-        params = {
-            "query": search_term,
-            "location": f"{latitude},{longitude}",
-            "radius": 10000
-        }
-        api_response = _fetch_maps_data(url, params)
+        top_k = _clamp_top_k(top_k)
+        api_response = _fetch_cached("place/textsearch/json",
+                                     _nearby_params(search_term, latitude, longitude))
 
         if "error_message" in api_response:
-            return json.dumps({"response_text": api_response['error_message'], "map_data": {}})
+            return api_response['error_message'], {}
 
-        if api_response.get("results"):
-            points = []
-            response_lines = [f"Here are the results for **'{search_term}'**:"]
+        places = api_response.get("results", [])
+        if places and _wants_eta(max_travel_minutes):
+            matrix = travel_time_matrix([f"{latitude},{longitude}"], _place_coordinates(places))
+            places = _ranked_places(places, matrix, max_travel_minutes, top_k)
+        _build_nearby_results(results, search_term, places, max_travel_minutes, top_k)
 
-            for i, result in enumerate(api_response["results"][:5]):
-                lat = result["geometry"]["location"]["lat"]
-                lng = result["geometry"]["location"]["lng"]
-                name = result.get("name", f"Result {i + 1}")
-                rating = result.get("rating", "N/A")
-                address = result.get("formatted_address", "")
+    # 2. ROUTE LOGIC
+    if search_type == "route" and search_term:
+        origin_address = f"{latitude},{longitude}"
+        origin_name = "Current Location"
 
-                points.append({"name": name, "latitude": lat, "longitude": lng})
+        if origin_override:
+            new_origin_coords = _geocode_address(origin_override)
+            if new_origin_coords:
+                origin_address = f"{new_origin_coords['lat']},{new_origin_coords['lng']}"
+                origin_name = origin_override
+            else:
+                results["response_text"] = f"Warning: Could not locate '{origin_override}'. Using GPS location."
+
+        # Brief AI advice, generated alongside the directions fetch (see traffic_tips)
+        tip = traffic_tips.start_tip(origin_name, search_term)
+        api_response = _fetch_cached("directions/json",
+                                     _route_params(origin_address, search_term, waypoints))
 
-                response_lines.append(f"* **{name}** ({rating}⭐)\n  _{address}_")
+        if "error_message" in api_response:
+            tip.cancel()
+            return api_response['error_message'], {}
 
-            results["response_text"] = "\n".join(response_lines)
-            results["map_data"]["points"] = points
+        if api_response.get("routes"):
+            _build_route_results(results, api_response["routes"][0], origin_name,
+                                 origin_address, search_term, tip.result())
         else:
-            results["response_text"] = f"I couldn't find any places matching '{search_term}'."
+            tip.cancel()
+            results["response_text"] = f"I couldn't find a route from {origin_name} to '{search_term}'."
+
+    return results["response_text"], results["map_data"]
+
+
+async def _amaps_api_search(search_term: str,
+                            latitude: float,
+                            longitude: float,
+                            search_type: str = "nearby",
+                            origin_override: str = None,
+                            waypoints: str = None,
+                            max_travel_minutes: float = None,
+                            top_k: int = 5) -> Tuple[str, Dict[str, Any]]:
+    """Async variant of `_maps_api_search`; shares its request and response builders."""
+    results = _empty_results()
+
+    # 1. SEARCH LOGIC (Text Search)
+    if search_type == "nearby" and search_term:
+        top_k = _clamp_top_k(top_k)
+        api_response = await _afetch_cached("place/textsearch/json",
+                                            _nearby_params(search_term, latitude, longitude))
+
+        if "error_message" in api_response:
+            return api_response['error_message'], {}
+
+        places = api_response.get("results", [])
+        if places and _wants_eta(max_travel_minutes):
+            matrix = await atravel_time_matrix([f"{latitude},{longitude}"], _place_coordinates(places))
+            places = _ranked_places(places, matrix, max_travel_minutes, top_k)
+        _build_nearby_results(results, search_term, places, max_travel_minutes, top_k)
 
     # 2. ROUTE LOGIC
     if search_type == "route" and search_term:
@@ -143,58 +429,36 @@ def maps_api_search(search_term: str,
         origin_name = "Current Location"
 
         if origin_override:
-            new_origin_coords = _geocode_address(origin_override)
+            new_origin_coords = await _ageocode_address(origin_override)
             if new_origin_coords:
                 origin_address = f"{new_origin_coords['lat']},{new_origin_coords['lng']}"
                 origin_name = origin_override
             else:
                 results["response_text"] = f"Warning: Could not locate '{origin_override}'. Using GPS location."
 
-        url = base_url + "directions/json"
-        params = {"origin": origin_address, "destination": search_term, "mode": "driving"}
-        if waypoints:
-            params["waypoints"] = waypoints
-        api_response = _fetch_maps_data(url, params)
+        tip = traffic_tips.astart_tip(origin_name, search_term)
+        api_response = await _afetch_cached("directions/json",
+                                            _route_params(origin_address, search_term, waypoints))
 
         if "error_message" in api_response:
-            return json.dumps({"response_text": api_response['error_message'], "map_data": {}})
+            tip.cancel()
+            return api_response['error_message'], {}
 
         if api_response.get("routes"):
-            route = api_response["routes"][0]
-            leg = route["legs"][0]
-            distance = leg["distance"]["text"]
-            duration = leg["duration"]["text"]
-            route_path = decode_polyline(route["overview_polyline"]["points"])
-
-            # Brief AI advice
-            try:
-                advice_prompt = f"Give 1 short traffic tip for driving from {origin_name} to {search_term}."
-                ai_advice = llm.invoke(advice_prompt).content
-            except Exception:
-                ai_advice = "* Drive safely!"
-
-            results["response_text"] = (
-                f"### Route from {origin_name} to {search_term}\n"
-                f"* 🚗 **Distance:** {distance}\n"
-                f"* ⏱️ **Time:** {duration}\n\n"
-                f"**Note:**\n{ai_advice}"
-            )
-            results["map_data"]["routes"] = [{"path": route_path}]
-
-            if origin_name != "Current Location":
-                results["map_data"]["points"].append({
-                    "name": origin_name,
-                    "latitude": float(origin_address.split(',')[0]),
-                    "longitude": float(origin_address.split(',')[1]),
-                    "color": "blue"
-                })
-
-            results["map_data"]["points"].append({
-                "name": search_term,
-                "latitude": route_path[-1]['lat'],
-                "longitude": route_path[-1]['lng']
-            })
+            _build_route_results(results, api_response["routes"][0], origin_name,
+                                 origin_address, search_term, await tip.result())
         else:
+            tip.cancel()
             results["response_text"] = f"I couldn't find a route from {origin_name} to '{search_term}'."
 
-    return json.dumps(results)
\ No newline at end of file
+    return results["response_text"], results["map_data"]
+
+
+maps_api_search = StructuredTool.from_function(
+    func=_maps_api_search,
+    coroutine=_amaps_api_search,
+    name="maps_api_search",
+    # The model reads only the text; points and route geometry travel as the
+    # ToolMessage artifact and never enter the prompt
+    response_format="content_and_artifact",
+)
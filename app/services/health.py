@@ -0,0 +1,221 @@
+"""
+Dependency health, tracked in the background so probes never do I/O.
+
+A `HealthChecker` keeps one `DependencyHealth` record per upstream (Maps, Air
+Quality, Gemini). Records are refreshed two ways:
+
+* passively, from real traffic: every outbound Google API call made through
+  `http_client` and every successful agent LLM call reports its outcome;
+* actively, by a background task that probes a dependency only when traffic
+  has not shown it healthy within `HEALTH_CHECK_INTERVAL_SECONDS`. A failing
+  dependency is re-probed with exponential backoff (capped at
+  `HEALTH_CHECK_MAX_BACKOFF_SECONDS`) so an outage is not hammered.
+
+`/livez`, `/readyz` and `/health` only read these records.
+"""
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from ..core.config import settings
+from . import metrics
+
+
+Probe = Callable[[], Awaitable[Tuple[bool, str]]]  # -> (healthy, error detail)
+
+_UPSTREAM_DEPENDENCY = {
+    "textsearch": "maps",
+    "directions": "maps",
+    "geocode": "maps",
+    "distancematrix": "maps",
+    "currentConditions:lookup": "air_quality",
+}
+
+
+@dataclass
+class DependencyHealth:
+    name: str
+    last_checked: float | None = None  # wall-clock timestamps
+    last_success: float | None = None
+    latency_ms: float | None = None
+    consecutive_failures: int = 0
+    last_error: str = ""
+    source: str = ""  # "probe" or "traffic"
+    next_probe: float = 0.0  # monotonic
+
+    def status(self, configured: bool | str) -> str:
+        if configured is not True:
+            return configured or "unconfigured"
+        if self.last_checked is None:
+            return "unknown"
+        if self.consecutive_failures == 0:
+            return "ok"
+        if self.last_success and time.time() - self.last_success < settings.HEALTH_STALE_AFTER_SECONDS:
+            return "degraded"
+        return "down"
+
+
+def _iso(timestamp: float | None) -> str | None:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat() if timestamp else None
+
+
+def _configured(name: str) -> bool | str:
+    """True if the dependency should be checked, otherwise the status to report instead."""
+    if name == "gemini":
+        return True if settings.GEMINI_API_KEY else "unconfigured"
+    return "mock" if settings.MAPS_MOCK_ENABLED else True
+
+
+def dependency_for(url: str) -> str | None:
+    """The dependency ("maps", "air_quality") an outbound Google API URL belongs to."""
+    return _UPSTREAM_DEPENDENCY.get(metrics.upstream_name(url))
+
+
+def healthy_status(status_code: int) -> bool:
+    """Reachable and usable: no server error, rate limit or rejected key."""
+    return status_code < 500 and status_code not in (401, 403, 429)
+
+
+# --- Active probes (cheap, fixed requests) ---
+
+async def _probe(method: str, url: str, **kwargs) -> Tuple[bool, str]:
+    from . import http_client  # lazily: http_client reports traffic to this module
+
+    response = await http_client.get_async_client().request(
+        method, url, timeout=settings.HEALTH_CHECK_TIMEOUT_SECONDS, **kwargs)
+    if not healthy_status(response.status_code):
+        return False, f"HTTP {response.status_code}"
+    return True, ""
+
+
+async def probe_maps() -> Tuple[bool, str]:
+    return await _probe("GET", settings.MAPS_BASE_URL + "geocode/json",
+                        params={"address": "India Gate, New Delhi", "key": settings.MAPS_API_KEY})
+
+
+async def probe_air_quality() -> Tuple[bool, str]:
+    return await _probe("POST", f"{settings.AIR_QUALITY_BASE_URL}currentConditions:lookup",
+                        params={"key": settings.MAPS_API_KEY},
+                        json={"location": {"latitude": 28.6129, "longitude": 77.2295}})
+
+
+async def probe_gemini() -> Tuple[bool, str]:
+    """Lists one model: authenticates the key without spending tokens."""
+    base_url = (settings.LLM_BASE_URL or "https://generativelanguage.googleapis.com").rstrip("/")
+    return await _probe("GET", f"{base_url}/v1beta/models", params={"pageSize": 1},
+                        headers={"x-goog-api-key": settings.GEMINI_API_KEY})
+
+
+DEFAULT_PROBES: Dict[str, Probe] = {"maps": probe_maps, "air_quality": probe_air_quality, "gemini": probe_gemini}
+
+
+class HealthChecker:
+    def __init__(self, probes: Dict[str, Probe]):
+        self.probes = probes
+        self.dependencies = {name: DependencyHealth(name) for name in probes}
+        self.started = False
+        self._task: asyncio.Task | None = None
+
+    def observe(self, name: str, ok: bool, latency: float | None = None, error: str = "",
+                source: str = "traffic"):
+        """Records one outcome for a dependency, from traffic or a probe."""
+        dependency = self.dependencies.get(name)
+        if dependency is None:
+            return
+        now = time.time()
+        dependency.last_checked = now
+        dependency.source = source
+        if latency is not None:
+            dependency.latency_ms = round(latency * 1000, 1)
+        if ok:
+            dependency.last_success = now
+            dependency.consecutive_failures = 0
+            dependency.last_error = ""
+            dependency.next_probe = time.monotonic() + settings.HEALTH_CHECK_INTERVAL_SECONDS
+        else:
+            dependency.consecutive_failures += 1
+            dependency.last_error = error
+            if source == "probe":
+                backoff = settings.HEALTH_CHECK_INTERVAL_SECONDS * 2 ** (dependency.consecutive_failures - 1)
+                delay = min(settings.HEALTH_CHECK_MAX_BACKOFF_SECONDS, backoff) * random.uniform(0.8, 1.0)
+                dependency.next_probe = time.monotonic() + delay
+
+    async def _run_probe(self, name: str):
+        start = time.perf_counter()
+        try:
+            with metrics.span("health", name):
+                ok, error = await asyncio.wait_for(self.probes[name](), settings.HEALTH_CHECK_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            ok, error = False, f"timed out after {settings.HEALTH_CHECK_TIMEOUT_SECONDS}s"
+        except Exception as e:
+            ok, error = False, repr(e)
+        self.observe(name, ok, time.perf_counter() - start, error, source="probe")
+
+    async def check_due(self):
+        """Probes every configured dependency whose next check is due."""
+        now = time.monotonic()
+        due = [name for name, dep in self.dependencies.items()
+               if _configured(name) is True and dep.next_probe <= now]
+        await asyncio.gather(*(self._run_probe(name) for name in due))
+
+    async def run(self):
+        while True:
+            await self.check_due()
+            upcoming = [dep.next_probe for name, dep in self.dependencies.items() if _configured(name) is True]
+            wait = min(upcoming, default=time.monotonic() + settings.HEALTH_CHECK_INTERVAL_SECONDS) - time.monotonic()
+            await asyncio.sleep(max(1.0, wait))
+
+    def start(self):
+        """Marks the app as started and launches the background checker (if enabled)."""
+        self.started = True
+        if settings.HEALTH_CHECK_ENABLED and self._task is None:
+            self._task = asyncio.ensure_future(self.run())
+
+    async def stop(self):
+        self.started = False
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.time()
+        dependencies = {}
+        for name, dep in self.dependencies.items():
+            dependencies[name] = {
+                "status": dep.status(_configured(name)),
+                "required": name in settings.HEALTH_REQUIRED_DEPENDENCIES,
+                "last_success": _iso(dep.last_success),
+                "last_success_age_seconds": round(now - dep.last_success, 1) if dep.last_success else None,
+                "latency_ms": dep.latency_ms,
+                "consecutive_failures": dep.consecutive_failures,
+                "last_error": dep.last_error or None,
+                "source": dep.source or None,
+            }
+        return {"ready": self.ready(dependencies), "started": self.started, "dependencies": dependencies}
+
+    def ready(self, dependencies: Dict[str, Dict[str, Any]] | None = None) -> bool:
+        """Started, and no required dependency is down or unconfigured."""
+        if dependencies is None:
+            dependencies = {name: {"status": dep.status(_configured(name)),
+                                   "required": name in settings.HEALTH_REQUIRED_DEPENDENCIES}
+                            for name, dep in self.dependencies.items()}
+        return self.started and not any(d["required"] and d["status"] in ("down", "unconfigured")
+                                         for d in dependencies.values())
+
+
+checker = HealthChecker(DEFAULT_PROBES)
+
+
+def observe_response(url: str, status_code: int | None, latency: float):
+    """Traffic hook for `http_client`: `status_code` is None for a transport error."""
+    name = dependency_for(url)
+    if name is not None:
+        ok = status_code is not None and healthy_status(status_code)
+        checker.observe(name, ok, latency, "" if ok else f"HTTP {status_code}" if status_code else "transport error")
@@ -0,0 +1,194 @@
+"""
+Shared outbound HTTP layer for the Google API tools.
+
+All Maps / Air Quality calls go through the pooled clients below so that
+connections (and their TLS sessions) are kept alive and reused across tool
+calls. Limits, timeouts and retry policy come from `Settings`. Every attempt
+is timed as an "http" span, counted per upstream and status, and reported to
+the dependency health tracker. Before each attempt the upstream's rate limiter,
+quota and circuit breaker (`resilience`) must admit the call; if they do not,
+`UpstreamUnavailable` is raised instead of sending it.
+"""
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Dict
+from urllib.parse import urlsplit
+
+import httpx
+
+from ..core.config import settings
+from . import health, metrics, resilience
+
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_client: httpx.Client | None = None
+_async_client: httpx.AsyncClient | None = None
+_client_lock = threading.Lock()
+
+# Per-host concurrency caps (httpx only limits the pool as a whole)
+_host_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+_async_host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(settings.HTTP_TIMEOUT_SECONDS, connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS)
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    )
+
+
+def get_client() -> httpx.Client:
+    """Returns the process-wide pooled sync client, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None or _client.is_closed:
+            _client = httpx.Client(timeout=_timeout(), limits=_limits())
+        return _client
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Returns the process-wide pooled async client, creating it on first use."""
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(timeout=_timeout(), limits=_limits())
+    return _async_client
+
+
+def _host_semaphore(url: str) -> threading.BoundedSemaphore:
+    host = urlsplit(url).netloc
+    with _client_lock:
+        if host not in _host_semaphores:
+            _host_semaphores[host] = threading.BoundedSemaphore(settings.HTTP_MAX_CONNECTIONS_PER_HOST)
+        return _host_semaphores[host]
+
+
+def _async_host_semaphore(url: str) -> asyncio.Semaphore:
+    host = urlsplit(url).netloc
+    if host not in _async_host_semaphores:
+        _async_host_semaphores[host] = asyncio.Semaphore(settings.HTTP_MAX_CONNECTIONS_PER_HOST)
+    return _async_host_semaphores[host]
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter for the given retry attempt (0-based)."""
+    ceiling = min(settings.HTTP_BACKOFF_MAX_SECONDS, settings.HTTP_BACKOFF_BASE_SECONDS * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+def _should_retry(response: httpx.Response | None, attempt: int) -> bool:
+    if attempt >= settings.HTTP_MAX_RETRIES:
+        return False
+    return response is None or response.status_code in RETRY_STATUS_CODES
+
+
+def _observe(url: str, upstream: str, status_code: int | None, start: float, dependency: str | None):
+    metrics.UPSTREAM_REQUESTS.inc(upstream=upstream, status=status_code or "transport_error")
+    health.observe_response(url, status_code, time.perf_counter() - start)
+    if dependency is not None:
+        resilience.upstreams[dependency].record(not resilience.is_failure(status_code))
+
+
+def _abandon(dependency: str | None):
+    """A call cancelled or failed locally before a response: no verdict, but the breaker's trial is freed."""
+    if dependency is not None:
+        resilience.upstreams[dependency].record(None)
+
+
+def request(method: str, url: str, **kwargs: Any) -> httpx.Response:
+    """
+    Sends a request through the pooled sync client.
+    Transport errors and retryable status codes are retried with jittered backoff;
+    the last response is returned (or the last error raised) once retries run out.
+    """
+    attempt = 0
+    upstream, dependency = metrics.upstream_name(url), health.dependency_for(url)
+    while True:
+        if dependency is not None:
+            resilience.acquire(dependency)
+        start = time.perf_counter()
+        try:
+            with _host_semaphore(url), metrics.span("http", upstream):
+                response = get_client().request(method, url, **kwargs)
+        except httpx.TransportError:
+            _observe(url, upstream, None, start, dependency)
+            if not _should_retry(None, attempt):
+                raise
+        except BaseException:
+            _abandon(dependency)
+            raise
+        else:
+            _observe(url, upstream, response.status_code, start, dependency)
+            if not _should_retry(response, attempt):
+                return response
+        time.sleep(backoff_delay(attempt))
+        attempt += 1
+
+
+async def arequest(method: str, url: str, **kwargs: Any) -> httpx.Response:
+    """Async variant of `request` using the pooled async client."""
+    attempt = 0
+    upstream, dependency = metrics.upstream_name(url), health.dependency_for(url)
+    while True:
+        if dependency is not None:
+            await resilience.aacquire(dependency)
+        start = time.perf_counter()
+        try:
+            async with _async_host_semaphore(url):
+                with metrics.span("http", upstream):
+                    response = await get_async_client().request(method, url, **kwargs)
+        except httpx.TransportError:
+            _observe(url, upstream, None, start, dependency)
+            if not _should_retry(None, attempt):
+                raise
+        except BaseException:
+            _abandon(dependency)
+            raise
+        else:
+            _observe(url, upstream, response.status_code, start, dependency)
+            if not _should_retry(response, attempt):
+                return response
+        await asyncio.sleep(backoff_delay(attempt))
+        attempt += 1
+
+
+def get(url: str, **kwargs: Any) -> httpx.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs: Any) -> httpx.Response:
+    return request("POST", url, **kwargs)
+
+
+async def aget(url: str, **kwargs: Any) -> httpx.Response:
+    return await arequest("GET", url, **kwargs)
+
+
+async def apost(url: str, **kwargs: Any) -> httpx.Response:
+    return await arequest("POST", url, **kwargs)
+
+
+def close_clients():
+    """Closes the pooled sync client."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+async def aclose_clients():
+    """Closes both pooled clients. Called on application shutdown."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+    _async_host_semaphores.clear()
+    close_clients()
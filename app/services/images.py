@@ -0,0 +1,132 @@
+"""
+Image ingestion stage for photo queries.
+
+Uploads are size-checked, sniffed, downscaled and re-encoded to at most
+`IMAGE_MAX_DIMENSION` pixels on the long side (when Pillow is installed) and
+hashed. Prepared images are cached by the hash of the original bytes so a
+repeated upload is not processed twice, and the place a photo was identified
+as is cached by the same hash so the model is not asked to identify it again.
+"""
+import base64
+import binascii
+import hashlib
+import io
+from dataclasses import dataclass
+from typing import Any, Dict
+
+import filetype
+
+from ..core.config import settings
+from .cache import MISSING, TTLCache
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # downscaling is skipped; images are passed through after validation
+    Image = None
+
+
+ACCEPTED_MIME_TYPES = {"image/jpeg", "image/png", "image/webp", "image/heic", "image/heif"}
+RESIZABLE_MIME_TYPES = {"image/jpeg", "image/png", "image/webp"}  # HEIC needs a Pillow plugin; sent as is
+
+
+class ImageValidationError(ValueError):
+    """Raised for uploads that are not a usable image; `status_code` is the HTTP status to answer with."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass(frozen=True)
+class PreparedImage:
+    data: bytes
+    mime_type: str
+    digest: str  # sha256 of the uploaded bytes
+
+    @property
+    def data_url(self) -> str:
+        return f"data:{self.mime_type};base64,{base64.b64encode(self.data).decode('ascii')}"
+
+
+_prepared_cache = TTLCache(maxsize=256, ttl=settings.IMAGE_PLACE_CACHE_TTL_SECONDS,
+                           max_bytes=settings.IMAGE_PREPARED_CACHE_MAX_BYTES, sizeof=lambda image: len(image.data),
+                           name="images")
+_place_cache = TTLCache(maxsize=settings.IMAGE_PLACE_CACHE_MAX_ENTRIES, ttl=settings.IMAGE_PLACE_CACHE_TTL_SECONDS,
+                        name="image_places")
+
+
+def _too_large() -> ImageValidationError:
+    return ImageValidationError(f"Image exceeds the {settings.IMAGE_MAX_BYTES // (1024 * 1024)} MB limit.", 413)
+
+
+def decode_base64(image_b64: str) -> bytes:
+    """Decodes a base64 image (optionally a data URL), rejecting oversized input before decoding it."""
+    if image_b64.startswith("data:"):
+        image_b64 = image_b64.partition(",")[2]
+    if len(image_b64) * 3 // 4 > settings.IMAGE_MAX_BYTES:
+        raise _too_large()
+    try:
+        return base64.b64decode(image_b64, validate=True)
+    except (binascii.Error, ValueError):
+        raise ImageValidationError("Image is not valid base64.")
+
+
+def _downscale(data: bytes) -> tuple[bytes, str] | None:
+    """Re-encodes to JPEG within the max dimension, or None if the original can be sent as is."""
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            if max(img.size) <= settings.IMAGE_MAX_DIMENSION:
+                return None
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((settings.IMAGE_MAX_DIMENSION, settings.IMAGE_MAX_DIMENSION))
+            out = io.BytesIO()
+            img.convert("RGB").save(out, format="JPEG", quality=settings.IMAGE_JPEG_QUALITY, optimize=True)
+            return out.getvalue(), "image/jpeg"
+    except (OSError, ValueError, Image.DecompressionBombError):
+        raise ImageValidationError("Image could not be decoded.")
+
+
+def prepare(data: bytes) -> PreparedImage:
+    """Validates, downscales and hashes raw image bytes."""
+    if len(data) > settings.IMAGE_MAX_BYTES:
+        raise _too_large()
+    digest = hashlib.sha256(data).hexdigest()
+    if (cached := _prepared_cache.get(digest)) is not MISSING:
+        return cached
+
+    mime_type = filetype.guess_mime(data)
+    if mime_type not in ACCEPTED_MIME_TYPES:
+        raise ImageValidationError("Unsupported image type; send a JPEG, PNG, WebP or HEIC photo.")
+    if Image is not None and mime_type in RESIZABLE_MIME_TYPES:
+        if downscaled := _downscale(data):
+            data, mime_type = downscaled
+
+    image = PreparedImage(data=data, mime_type=mime_type, digest=digest)
+    _prepared_cache.set(digest, image)
+    return image
+
+
+def prepare_base64(image_b64: str) -> PreparedImage:
+    return prepare(decode_base64(image_b64))
+
+
+def identified_place(digest: str) -> Dict[str, Any] | None:
+    """The place this photo was identified as on an earlier request, if any."""
+    place = _place_cache.get(digest)
+    return None if place is MISSING else place
+
+
+def remember_place(digest: str, map_data: Dict[str, Any] | None):
+    """
+    Caches the place a photo query resolved to. Only routes count: the photo is
+    used as the destination, which is always the last point of a route result.
+    """
+    if not map_data or not map_data.get("routes") or not map_data.get("points"):
+        return
+    place = map_data["points"][-1]
+    _place_cache.set(digest, {"name": place["name"], "latitude": place["latitude"], "longitude": place["longitude"]})
+
+
+def clear_image_caches():
+    _prepared_cache.clear()
+    _place_cache.clear()
@@ -0,0 +1,190 @@
+"""
+Fast path in front of the agent graph for simple, fully specified requests.
+
+Pattern classifiers map queries such as "AQI here", "air quality in Paris",
+"route to India Gate" or "coffee near me" onto one tool call. When the best
+match clears `FAST_PATH_MIN_CONFIDENCE` the tool runs directly and its own
+templated text becomes the answer, so the request costs one Maps round trip
+instead of two LLM calls. Anything ambiguous, conversational, about a time
+other than now, a personal place ("home", "my office") or a subject Places
+cannot search ("weather near me"), or that the tool cannot answer, falls back
+to the full agent.
+
+Extra classifiers (e.g. a small local model) can be added with
+`register_classifier`; each returns an `Intent` with its confidence, or None.
+"""
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+
+from langchain_core.messages import ToolMessage
+
+from ..core.config import settings
+from . import metrics
+from .aqi_services import get_aqi
+from .google_maps import maps_api_search
+
+
+@dataclass
+class Intent:
+    name: str
+    tool: str
+    args: Dict[str, Any]
+    confidence: float
+
+
+Classifier = Callable[[str, Dict[str, float]], Intent | None]
+
+TOOLS = {tool.name: tool for tool in (get_aqi, maps_api_search)}
+
+# Words that point at earlier turns or ask for judgement: leave those to the agent
+_CONTEXTUAL = re.compile(r"\b(it|there|that|this|those|them|again|instead|same|and|or|vs|versus|compare|"
+                         r"better|should|why|which|if|but)\b")
+# Subjects a Places text search cannot answer
+_NOT_PLACES = re.compile(r"\b(?:weather|forecast|temperature|rain|humidity|traffic|news|events?|happening)\b")
+# Times other than now: the tools report current conditions and live routes
+_NOT_NOW = re.compile(r"\b(?:tomorrow|tonight|yesterday|week|weekend|morning|afternoon|evening|later|next|last|"
+                      r"\d{1,2}(?::\d{2})? ?[ap]m)\b")
+# Places only the user (or an earlier turn) can resolve
+_PERSONAL = re.compile(r"^(?:(?:my|our) (?!(?:current )?location$).+|home|work|office|the office|school|college|"
+                       r"hotel|the hotel)$")
+_AQI = r"(?:aqi|air quality|air pollution|pollution)(?: index| level)?"
+_ASK = r"(?:(?:what(?:'s| is)|how(?:'s| is)|check|show(?: me)?|tell me|get)(?: the)? )?"
+_WHEN = r"(?: (?:now|today|right now))?"
+
+_AQI_HERE = re.compile(rf"^{_ASK}{_AQI}(?: (?:here|nearby|near me|around me|around here|outside|now|today|right now))*$")
+_AQI_IN = re.compile(rf"^{_ASK}{_AQI} (?:in|at|for|of|near) (?P<place>.+?){_WHEN}$")
+_ROUTE = re.compile(
+    r"^(?:(?:show me |give me |get |find )?(?:the )?(?:route|directions|way|drive)|navigate|take me|"
+    r"how (?:do|can) i (?:get|go|reach)|go)(?: me)? to (?P<dest>.+?)"
+    r"(?: from (?P<origin>.+?))?(?: via (?P<via>.+?))?$")
+_NEARBY = re.compile(
+    r"^(?:(?:find|show|search(?: for)?|any|are there(?: any)?|where are)(?: me)? )?(?:(?:a|an|some|the) )?"
+    r"(?P<what>.+?) (?:near me|nearby|near here|around me|around here|close by|closeby)$")
+_NEAREST = re.compile(r"^(?:(?:where(?:'s| is)|find|show me) )?(?:the |a )?(?:nearest|closest) (?P<what>.+?)$")
+
+_classifiers: List[Classifier] = []
+_stats: Counter = Counter()
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split()).strip(" ?!.")
+
+
+def is_contextual(query: str) -> bool:
+    """True if a normalized query refers to earlier turns or asks for a judgement call."""
+    return bool(_CONTEXTUAL.search(query))
+
+
+def register_classifier(classifier: Classifier):
+    """Adds a classifier; the most confident intent across all of them wins."""
+    _classifiers.append(classifier)
+
+
+def _unresolvable(*texts: str) -> bool:
+    """True if a captured place or subject is personal or names a time other than now."""
+    return any(_PERSONAL.match(text) or _NOT_NOW.search(text) for text in texts if text)
+
+
+def _penalize(intent: Intent, *texts: str) -> Intent:
+    if any(is_contextual(text) for text in texts if text):
+        intent.confidence *= 0.5
+    return intent
+
+
+def classify_aqi(query: str, location: Dict[str, float]) -> Intent | None:
+    if _AQI_HERE.match(query):
+        return Intent("aqi_here", "get_aqi", {"lat": location.get("lat"), "lng": location.get("lng")}, 0.95)
+    if match := _AQI_IN.match(query):
+        place = match["place"]
+        if place in ("here", "my area", "my location"):
+            return Intent("aqi_here", "get_aqi", {"lat": location.get("lat"), "lng": location.get("lng")}, 0.9)
+        if _unresolvable(place):
+            return None
+        return _penalize(Intent("aqi_place", "get_aqi", {"location_name": place}, 0.9), place)
+    return None
+
+
+def classify_route(query: str, location: Dict[str, float]) -> Intent | None:
+    if not (match := _ROUTE.match(query)) or _unresolvable(match["dest"], match["origin"], match["via"]):
+        return None
+    args = {"search_term": match["dest"], "latitude": location.get("lat"), "longitude": location.get("lng"),
+            "search_type": "route"}
+    if match["origin"]:
+        args["origin_override"] = match["origin"]
+    if match["via"]:
+        args["waypoints"] = match["via"]
+    return _penalize(Intent("route", "maps_api_search", args, 0.9), match["dest"], match["origin"], match["via"])
+
+
+def classify_nearby(query: str, location: Dict[str, float]) -> Intent | None:
+    match = _NEARBY.match(query) or _NEAREST.match(query)
+    if not match or re.search(_AQI, match["what"]) or _NOT_PLACES.search(match["what"]) or _NOT_NOW.search(query):
+        return None
+    args = {"search_term": match["what"], "latitude": location.get("lat"), "longitude": location.get("lng"),
+            "search_type": "nearby"}
+    return _penalize(Intent("nearby", "maps_api_search", args, 0.85), match["what"])
+
+
+for _classifier in (classify_aqi, classify_route, classify_nearby):
+    register_classifier(_classifier)
+
+
+def classify(query: str, location: Dict[str, float]) -> Intent | None:
+    """The most confident intent for a query, or None if no classifier matched."""
+    query = normalize_query(query)
+    intents = [intent for classifier in _classifiers if (intent := classifier(query, location))]
+    return max(intents, key=lambda intent: intent.confidence, default=None)
+
+
+def _confident_intent(query: str, location: Dict[str, float]) -> Intent | None:
+    if not settings.FAST_PATH_ENABLED or not location:
+        return None
+    intent = classify(query, location)
+    if intent is None or intent.confidence < settings.FAST_PATH_MIN_CONFIDENCE:
+        _stats["fallback"] += 1
+        return None
+    return intent
+
+
+def _answer(intent: Intent, message: ToolMessage) -> Dict[str, Any] | None:
+    """Turns the tool's templated output into a result, or None if the agent should take over."""
+    text = message.content if isinstance(message.content, str) else ""
+    map_data = message.artifact if isinstance(message.artifact, dict) else None
+    if message.status == "error" or not text:
+        answered = False
+    elif intent.tool == "maps_api_search":
+        answered = bool(map_data and (map_data.get("points") or map_data.get("routes")))
+    else:
+        answered = not text.startswith(("Could not find", "Error retrieving"))
+    _stats[intent.name if answered else "tool_miss"] += 1
+    if not answered:
+        return None
+    return {"response_text": text, "map_data": map_data, "intent": intent.name}
+
+
+def _tool_call(intent: Intent) -> Dict[str, Any]:
+    return {"name": intent.tool, "args": intent.args, "id": f"fast-path-{intent.name}", "type": "tool_call"}
+
+
+def route(query: str, location: Dict[str, float]) -> Dict[str, Any] | None:
+    """Answers a simple query with one tool call, or returns None to use the agent."""
+    if not (intent := _confident_intent(query, location)):
+        return None
+    with metrics.span("tool", intent.tool):
+        message = TOOLS[intent.tool].invoke(_tool_call(intent))
+    return _answer(intent, message)
+
+
+async def aroute(query: str, location: Dict[str, float]) -> Dict[str, Any] | None:
+    """Async variant of `route`."""
+    if not (intent := _confident_intent(query, location)):
+        return None
+    with metrics.span("tool", intent.tool):
+        message = await TOOLS[intent.tool].ainvoke(_tool_call(intent))
+    return _answer(intent, message)
+
+
+def fast_path_stats() -> Dict[str, int]:
+    return dict(_stats)
@@ -0,0 +1,271 @@
+"""
+Multi-stop itinerary planning.
+
+`plan_itinerary` takes every stop of a "plan my afternoon" request at once:
+
+1. one Distance Matrix request gives the driving time between every pair of
+   places (the user's location plus up to `ITINERARY_MAX_STOPS` stops);
+2. the visiting order is solved locally: nearest-neighbour construction, then
+   2-opt and or-opt moves until none improves the schedule. Opening hours,
+   when given, are respected by waiting for a stop to open and by penalizing
+   arrivals after it closes;
+3. one Directions request draws the whole route with the stops as waypoints.
+
+That replaces a Directions call (and an LLM round trip) per stop, with the
+LLM guessing the order, by two Maps calls and well under a millisecond of CPU.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Sequence, Tuple
+
+from langchain_core.tools import StructuredTool
+
+from ..core.config import settings
+from . import metrics
+from .google_maps import afetch_directions, atravel_time_matrix, fetch_directions
+from .google_maps import travel_time_matrix
+
+
+UNREACHABLE = 10 ** 7  # seconds; pairs without a route are only used when nothing else is left
+
+Window = Tuple[int, int] | None  # (opens, closes) in seconds since midnight
+
+
+# --- Local solver (node 0 is the starting point, nodes 1..n are the stops) ---
+
+@dataclass
+class Schedule:
+    order: List[int]
+    finish: float = 0.0  # seconds since midnight when the last leg ends
+    lateness: float = 0.0  # total seconds arrived after closing time
+    arrivals: List[float] = field(default_factory=list)
+
+    def cost(self) -> Tuple[float, float]:
+        return self.lateness, self.finish
+
+
+def parse_clock(text: str) -> int | None:
+    """"14:30" -> seconds since midnight (None if unparsable)."""
+    match = re.fullmatch(r"\s*(\d{1,2})(?::(\d{2}))?\s*", text or "")
+    if not match or int(match[1]) > 24 or int(match[2] or 0) > 59:
+        return None
+    return int(match[1]) * 3600 + int(match[2] or 0) * 60
+
+
+def parse_window(text: str) -> Window:
+    """"10:00-18:00" -> (36000, 64800); blank or unparsable means always open."""
+    opens, _, closes = (text or "").partition("-")
+    opens, closes = parse_clock(opens), parse_clock(closes)
+    return (opens, closes) if opens is not None and closes is not None else None
+
+
+def _leg(seconds: Sequence[Sequence[float | None]], a: int, b: int) -> float:
+    value = seconds[a][b]
+    return UNREACHABLE if value is None else value
+
+
+def schedule(order: List[int], seconds: Sequence[Sequence[float | None]], windows: Sequence[Window],
+             start: float = 0.0, visit: float = 0.0, return_to_start: bool = False) -> Schedule:
+    """Drives `order` from node 0: waits for stops that are not open yet and adds up lateness."""
+    plan = Schedule(order)
+    now, at = start, 0
+    for stop in order:
+        now += _leg(seconds, at, stop)
+        if (window := windows[stop]) is not None:
+            now = max(now, window[0])
+            plan.lateness += max(0.0, now - window[1])
+        plan.arrivals.append(now)
+        now += visit
+        at = stop
+    if return_to_start:
+        now += _leg(seconds, at, 0)
+    plan.finish = now
+    return plan
+
+
+def _arrival(when: float, window: Window) -> Tuple[bool, float]:
+    """(too late, time the visit can start) for reaching a stop at `when`."""
+    if window is None:
+        return False, when
+    return when > window[1], max(when, window[0])
+
+
+def nearest_neighbour(seconds: Sequence[Sequence[float | None]], windows: Sequence[Window],
+                      start: float = 0.0, visit: float = 0.0) -> List[int]:
+    """Greedy tour: always go next to the stop that can be reached (and is open) soonest."""
+    remaining = set(range(1, len(seconds)))
+    order, now, at = [], start, 0
+    while remaining:
+        arrivals = {stop: _arrival(now + _leg(seconds, at, stop), windows[stop]) for stop in remaining}
+        stop = min(remaining, key=lambda s: (arrivals[s], s))
+        now = arrivals[stop][1] + visit
+        order.append(stop)
+        remaining.remove(stop)
+        at = stop
+    return order
+
+
+def improve(order: List[int], evaluate) -> Schedule:
+    """
+    Local search from a starting tour: 2-opt (reverse a segment) and or-opt
+    (move one stop elsewhere) moves, taken while they lower the cost. Every
+    candidate is re-scheduled, so asymmetric times and time windows are handled.
+    """
+    best = evaluate(order)
+    improved = True
+    while improved:
+        improved = False
+        n = len(best.order)
+        for i in range(n - 1):
+            for j in range(i + 1, n):
+                current = best.order
+                candidates = [current[:i] + current[i:j + 1][::-1] + current[j + 1:]]
+                moved = current[:i] + current[i + 1:]
+                candidates.append(moved[:j] + [current[i]] + moved[j:])
+                moved = current[:j] + current[j + 1:]
+                candidates.append(moved[:i] + [current[j]] + moved[i:])
+                for candidate in map(evaluate, candidates):
+                    if candidate.cost() < best.cost():
+                        best, improved = candidate, True
+    return best
+
+
+def solve(seconds: Sequence[Sequence[float | None]], windows: Sequence[Window] | None = None,
+          start: float = 0.0, visit: float = 0.0, return_to_start: bool = False) -> Schedule:
+    """Best visiting order found for nodes 1..n of a travel-time matrix."""
+    windows = windows or [None] * len(seconds)
+
+    def evaluate(order: List[int]) -> Schedule:
+        return schedule(order, seconds, windows, start, visit, return_to_start)
+
+    with metrics.span("solver", "itinerary"):
+        return improve(nearest_neighbour(seconds, windows, start, visit), evaluate)
+
+
+# --- Tool ---
+
+def _clock(seconds: float) -> str:
+    minutes = int(seconds // 60)
+    return f"{minutes // 60 % 24:02d}:{minutes % 60:02d}"
+
+
+def _duration(seconds: float) -> str:
+    minutes = max(1, round(seconds / 60))
+    return f"{minutes // 60} h {minutes % 60} min" if minutes >= 60 else f"{minutes} min"
+
+
+def _validate(stops: List[str]) -> str | None:
+    if not stops:
+        return "Tell me which places you would like to visit."
+    if len(stops) > settings.ITINERARY_MAX_STOPS:
+        return f"I can plan up to {settings.ITINERARY_MAX_STOPS} stops at a time; please pick the ones that matter most."
+    return None
+
+
+def _windows(stops: List[str], time_windows: List[str] | None, start_time: str | None) -> List[Window]:
+    """Per node; opening hours only mean something once we know when the trip starts."""
+    if parse_clock(start_time or "") is None or not time_windows:
+        return [None] * (len(stops) + 1)
+    return [None] + [parse_window(time_windows[i] if i < len(time_windows) else "") for i in range(len(stops))]
+
+
+def _route(stops: List[str], origin: str, plan: Schedule, return_to_start: bool) -> Tuple[str, str, str | None]:
+    """(origin, destination, waypoints) of the Directions request for the solved order."""
+    ordered = [stops[node - 1] for node in plan.order]
+    destination = origin if return_to_start else ordered[-1]
+    waypoints = ordered if return_to_start else ordered[:-1]
+    return origin, destination, "|".join(waypoints) or None
+
+
+def _build_itinerary(stops: List[str], plan: Schedule, matrix: Dict[str, Any], windows: List[Window],
+                     timed: bool, return_to_start: bool, api_response: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """Numbered stops with drive times (and arrival times when a start time was given), plus the route."""
+    seconds = matrix["seconds"]
+    driving = sum(_leg(seconds, a, b) for a, b in zip([0] + plan.order, plan.order + ([0] if return_to_start else [])))
+    lines = [f"### Itinerary: {len(stops)} stops, about {_duration(driving)} of driving"]
+    points, at = [], 0
+    legs = api_response["routes"][0]["legs"] if api_response.get("routes") else []
+    for n, (node, arrival) in enumerate(zip(plan.order, plan.arrivals)):
+        line = f"{n + 1}. **{stops[node - 1]}** - {_duration(_leg(seconds, at, node))} drive"
+        if timed:
+            line += f", arrive {_clock(arrival)}"
+            if (window := windows[node]) is not None:
+                line += f" (open {_clock(window[0])}-{_clock(window[1])})"
+                if arrival > window[1]:
+                    line += " ⚠️ closed by then"
+        lines.append(line)
+        if n < len(legs):
+            location = legs[n]["end_location"]
+            points.append({"name": f"{n + 1}. {stops[node - 1]}", "latitude": location["lat"],
+                           "longitude": location["lng"]})
+        at = node
+    if return_to_start:
+        lines.append(f"Back at the start after {_duration(_leg(seconds, at, 0))}.")
+
+    map_data = {"points": points, "routes": []}
+    if legs:
+        map_data["routes"] = [{"polyline": api_response["routes"][0]["overview_polyline"]["points"]}]
+    else:
+        lines.append("(I couldn't draw the route on the map.)")
+    return "\n".join(lines), map_data
+
+
+def _plan_itinerary(stops: List[str],
+                    latitude: float,
+                    longitude: float,
+                    start_time: str = None,
+                    time_windows: List[str] = None,
+                    visit_minutes: int = 30,
+                    return_to_start: bool = False) -> Tuple[str, Dict[str, Any]]:
+    """
+    Plans the fastest order to visit several places and draws the route through them.
+    stops: place names or addresses to visit. start_time: 'HH:MM' the trip starts.
+    time_windows: opening hours per stop as 'HH:MM-HH:MM' ('' if unknown), same order as stops.
+    visit_minutes: time spent at each stop. return_to_start: end the trip back at the user's location.
+    """
+    if error := _validate(stops):
+        return error, {}
+    origin = f"{latitude},{longitude}"
+    places = [origin] + list(stops)
+    matrix = travel_time_matrix(places, places)
+    if "error_message" in matrix:
+        return matrix["error_message"], {}
+
+    start, windows = parse_clock(start_time or ""), _windows(stops, time_windows, start_time)
+    plan = solve(matrix["seconds"], windows, start or 0, visit_minutes * 60, return_to_start)
+    api_response = fetch_directions(*_route(stops, origin, plan, return_to_start))
+    if "error_message" in api_response:
+        return api_response["error_message"], {}
+    return _build_itinerary(stops, plan, matrix, windows, start is not None, return_to_start, api_response)
+
+
+async def _aplan_itinerary(stops: List[str],
+                           latitude: float,
+                           longitude: float,
+                           start_time: str = None,
+                           time_windows: List[str] = None,
+                           visit_minutes: int = 30,
+                           return_to_start: bool = False) -> Tuple[str, Dict[str, Any]]:
+    """Async variant of `_plan_itinerary`; shares its solver and response builder."""
+    if error := _validate(stops):
+        return error, {}
+    origin = f"{latitude},{longitude}"
+    places = [origin] + list(stops)
+    matrix = await atravel_time_matrix(places, places)
+    if "error_message" in matrix:
+        return matrix["error_message"], {}
+
+    start, windows = parse_clock(start_time or ""), _windows(stops, time_windows, start_time)
+    plan = solve(matrix["seconds"], windows, start or 0, visit_minutes * 60, return_to_start)
+    api_response = await afetch_directions(*_route(stops, origin, plan, return_to_start))
+    if "error_message" in api_response:
+        return api_response["error_message"], {}
+    return _build_itinerary(stops, plan, matrix, windows, start is not None, return_to_start, api_response)
+
+
+plan_itinerary = StructuredTool.from_function(
+    func=_plan_itinerary,
+    coroutine=_aplan_itinerary,
+    name="plan_itinerary",
+    response_format="content_and_artifact",
+)
@@ -0,0 +1,69 @@
+"""
+The Gemini chat models, built on first use instead of at import.
+
+Importing the Google GenAI SDK and constructing the client is the slowest part
+of loading the app, and scripts, tests and workers that never reach the LLM
+should not pay for it. The app's lifespan builds them before the app reports
+ready (see `app.main.create_app`), so the first request does not pay either.
+
+There is one client per model profile (`LLM_PROFILES`); `budget.profile_for`
+picks the profile for a call role.
+"""
+import threading
+from typing import Any, Dict
+
+from ..core.config import settings
+from . import budget
+
+
+_llm: Any = None  # set by `set_llm`: one model serving every profile (stubs in tests and benchmarks)
+_models: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def profile_settings(profile: str = "") -> Dict[str, Any]:
+    """Model settings of a profile: the `LLM_*` defaults with the profile's overrides."""
+    options = {"model": settings.LLM_MODEL, "temperature": settings.LLM_TEMPERATURE,
+               "thinking_level": settings.LLM_THINKING_LEVEL}
+    if profile:
+        options.update(settings.LLM_PROFILES.get(profile, {}))
+    return options
+
+
+def build_llm(profile: str = "") -> Any:
+    """A new chat model client for a profile ("" for the plain `LLM_*` settings)."""
+    from langchain_google_genai import ChatGoogleGenerativeAI  # heavy: pulls in the google-genai SDK
+
+    return ChatGoogleGenerativeAI(
+        google_api_key=settings.GEMINI_API_KEY,
+        base_url=settings.LLM_BASE_URL or None,
+        **profile_settings(profile)
+    )
+
+
+def get_llm(profile: str = "") -> Any:
+    """The process-wide chat model of a profile, created on first use."""
+    if _llm is not None:
+        return _llm
+    model = _models.get(profile)
+    if model is None:
+        with _lock:
+            if (model := _models.get(profile)) is None:
+                model = _models[profile] = build_llm(profile)
+    return model
+
+
+def llm_for(role: str) -> Any:
+    """The model an LLM call of `role` should use right now (its profile, or the budget fallback)."""
+    return get_llm(budget.profile_for(role))
+
+
+def profiles_in_use() -> set:
+    """Every profile a call can run on, for building them all at startup."""
+    return set(settings.LLM_ROLE_PROFILES.values()) | {settings.LLM_BUDGET_PROFILE}
+
+
+def set_llm(model: Any):
+    """Replaces every profile's model (benchmarks and tests use stubs); None rebuilds them on next use."""
+    global _llm
+    _llm = model
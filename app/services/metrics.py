@@ -0,0 +1,276 @@
+"""
+Latency and cost instrumentation.
+
+`span(stage, name)` times a block of work: a graph node, a tool, an LLM or
+outbound HTTP call, a cache lookup, polyline decoding or serialization. Each
+span is recorded in three places:
+
+* the `compassgenie_stage_duration_seconds{stage,name}` histogram, exported
+  in the Prometheus text format by `render()` (served on `/metrics`);
+* the breakdown of the current request (a context variable set by the HTTP
+  middleware), which becomes its `Server-Timing` header;
+* an OpenTelemetry span, when `OTEL_ENABLED` is set and `opentelemetry-api`
+  is installed (exporters are configured by the deployment).
+
+Token counts per LLM call are tracked by role with `record_llm_usage`, so
+latency and cost can be attributed to the same stages. Metrics are kept per
+process; with several uvicorn workers each one reports its own.
+"""
+import functools
+import inspect
+import logging
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar, Token
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + ([extra] if extra else [])
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name, self.documentation, self.labelnames = name, documentation, labelnames
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(v)}" for key, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+        self._values: Dict[LabelValues, List[float]] = {}  # per-bucket counts, then sum and count
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels) -> int:
+        series = self._values.get(self._key(labels))
+        return int(series[-1]) if series else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._values.items())
+        lines = []
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = _labels(self.labelnames, key, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{le} {_number(cumulative)}")
+            le = _labels(self.labelnames, key, 'le="+Inf"')
+            labels = _labels(self.labelnames, key)
+            lines.append(f"{self.name}_bucket{le} {_number(series[-1])}")
+            lines.append(f"{self.name}_sum{labels} {_number(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {_number(series[-1])}")
+        return lines
+
+
+class Gauge(_Metric):
+    """A gauge read from a callback at scrape time: `collect()` returns {label values: value}."""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...],
+                 collect: Callable[[], Dict[LabelValues, float]]):
+        super().__init__(name, documentation, labelnames)
+        self._collect = collect
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(v)}"
+                for key, v in sorted(self._collect().items())]
+
+
+_registry: List[_Metric] = []
+
+STAGE_SECONDS = Histogram("compassgenie_stage_duration_seconds",
+                          "Time spent per stage (node, tool, llm, http, cache, polyline, serialize).",
+                          ("stage", "name"))
+REQUESTS = Counter("compassgenie_requests_total", "HTTP requests served.", ("route", "method", "status"))
+REQUEST_SECONDS = Histogram("compassgenie_request_duration_seconds", "HTTP request latency.", ("route",))
+LLM_CALLS = Counter("compassgenie_llm_calls_total", "LLM calls by role.", ("role",))
+LLM_TOKENS = Counter("compassgenie_llm_tokens_total", "LLM tokens by role and direction.", ("role", "direction"))
+UPSTREAM_REQUESTS = Counter("compassgenie_upstream_requests_total", "Outbound Google API calls.",
+                            ("upstream", "status"))
+CACHE_LOOKUPS = Counter("compassgenie_cache_lookups_total", "Cache lookups by cache and result.", ("cache", "result"))
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    return "\n".join(line for metric in _registry for line in metric.render()) + "\n"
+
+
+# --- Per-request breakdown ---
+
+_breakdown: ContextVar[Dict[str, List[float]] | None] = ContextVar("request_timings", default=None)
+
+
+def begin_request() -> Token:
+    """Starts collecting a timing breakdown for the current request."""
+    return _breakdown.set({})
+
+
+def current_timings() -> Dict[str, List[float]]:
+    return _breakdown.get() or {}
+
+
+def end_request(token: Token) -> Dict[str, List[float]]:
+    """Stops collecting and returns {"stage.name": [seconds, count]} plus token totals."""
+    timings = _breakdown.get() or {}
+    _breakdown.reset(token)
+    return timings
+
+
+def server_timing(timings: Dict[str, List[float]], total: float, limit: int = 12) -> str:
+    """A `Server-Timing` header value: the slowest stages, the total, and LLM token counts."""
+    stages = sorted(((k, v) for k, v in timings.items() if not k.startswith("tokens.")),
+                    key=lambda item: item[1][0], reverse=True)[:limit]
+    entries = [f'{key};dur={seconds * 1000:.1f};desc="x{int(count)}"' for key, (seconds, count) in stages]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    if "tokens.in" in timings:
+        entries.append(f'llm_tokens;desc="in={int(timings["tokens.in"][0])} out={int(timings["tokens.out"][0])}"')
+    return ", ".join(entries)
+
+
+def _add(key: str, amount: float):
+    if (timings := _breakdown.get()) is not None:
+        entry = timings.setdefault(key, [0.0, 0])
+        entry[0] += amount
+        entry[1] += 1
+
+
+# --- Spans ---
+
+_tracer: Any = None
+_tracer_loaded = False
+
+
+def _get_tracer():
+    global _tracer, _tracer_loaded
+    if not _tracer_loaded:
+        _tracer_loaded = True
+        if settings.OTEL_ENABLED:
+            try:
+                from opentelemetry import trace
+                _tracer = trace.get_tracer("compassgenie")
+            except ImportError:
+                logger.warning("OTEL_ENABLED is set but opentelemetry-api is not installed; spans are not exported.")
+    return _tracer
+
+
+def record(stage: str, name: str, seconds: float):
+    """Records an already measured duration, as `span` does."""
+    STAGE_SECONDS.observe(seconds, stage=stage, name=name)
+    _add(f"{stage}.{name}", seconds)
+
+
+@contextmanager
+def span(stage: str, name: str):
+    """Times the enclosed block as `stage`/`name` (works in sync and async code)."""
+    tracer = _get_tracer()
+    with tracer.start_as_current_span(f"{stage} {name}", attributes={"stage": stage}) if tracer else nullcontext():
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record(stage, name, time.perf_counter() - start)
+
+
+def timed(stage: str, name: str | None = None):
+    """Decorator form of `span` for sync and async functions."""
+    def decorator(fn):
+        label = name or fn.__name__
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(stage, label):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage, label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_llm_usage(role: str, message: Any) -> Tuple[int, int]:
+    """Counts one LLM call and its input/output tokens (from `usage_metadata`, when the model reports it)."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    tokens_in, tokens_out = usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    LLM_CALLS.inc(role=role)
+    LLM_TOKENS.inc(tokens_in, role=role, direction="in")
+    LLM_TOKENS.inc(tokens_out, role=role, direction="out")
+    _add("tokens.in", tokens_in)
+    _add("tokens.out", tokens_out)
+    return tokens_in, tokens_out
+
+
+def upstream_name(url: str) -> str:
+    """Low-cardinality label for a Google API URL, e.g. "textsearch" or "currentConditions:lookup"."""
+    path = url.split("?", 1)[0].rstrip("/")
+    segments = [s for s in path.split("/") if s and s != "json"]
+    return segments[-1] if segments else "unknown"
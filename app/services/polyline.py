@@ -0,0 +1,88 @@
+"""
+Vectorized codec for Google's encoded polyline format.
+
+Coordinates are handled as compact NumPy `(N, 2)` float arrays of
+`[lat, lng]`; `to_dicts` gives the `{"lat", "lng"}` list view the map
+payloads historically used.
+"""
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+
+def _decode_values(encoded: bytes) -> np.ndarray:
+    """Decodes the raw signed integers of one or more concatenated polylines."""
+    data = np.frombuffer(encoded, dtype=np.uint8).astype(np.int64) - 63
+    if data.size == 0:
+        return np.empty(0, dtype=np.int64)
+    if data.min() < 0 or data.max() > 0x3f:
+        raise ValueError("Polyline contains characters outside the encoding alphabet.")
+
+    # Every value is a run of 5-bit chunks; a chunk without the 0x20 flag ends the run
+    ends = data < 0x20
+    if not ends[-1]:
+        raise ValueError("Polyline ends in the middle of a value.")
+    starts = np.flatnonzero(np.concatenate(([True], ends[:-1])))
+    group = np.cumsum(np.concatenate(([0], ends[:-1])))
+    shifts = 5 * (np.arange(data.size) - starts[group])
+    values = np.add.reduceat((data & 0x1f) << shifts, starts)
+
+    return np.where(values & 1, ~(values >> 1), values >> 1)
+
+
+def decode_array(polyline_str: str, precision: int = 5) -> np.ndarray:
+    """Decodes a polyline into an `(N, 2)` array of `[lat, lng]`."""
+    deltas = _decode_values(polyline_str.encode("ascii"))
+    if deltas.size % 2:
+        raise ValueError("Polyline has an odd number of coordinates.")
+    return np.cumsum(deltas.reshape(-1, 2), axis=0) / 10 ** precision
+
+
+def decode_many(polylines: Iterable[str], precision: int = 5) -> List[np.ndarray]:
+    """
+    Decodes several polylines (route alternatives, per-step polylines) in one
+    vectorized pass over their concatenation.
+    """
+    polylines = list(polylines)
+    encoded = [p.encode("ascii") for p in polylines]
+    deltas = _decode_values(b"".join(encoded))
+
+    # Split the flat value stream back into one chunk per polyline
+    counts = [int(np.count_nonzero(np.frombuffer(e, dtype=np.uint8) < 95)) for e in encoded]
+    if any(c % 2 for c in counts):
+        raise ValueError("Polyline has an odd number of coordinates.")
+    pairs = deltas.reshape(-1, 2)
+    bounds = np.cumsum([0] + [c // 2 for c in counts])
+
+    # One cumulative sum for the whole batch, re-based at every polyline start
+    totals = np.cumsum(pairs, axis=0)
+    scale = 10 ** precision
+    decoded = []
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        offset = totals[start - 1] if start else 0
+        decoded.append((totals[start:stop] - offset) / scale)
+    return decoded
+
+
+def encode_array(coords: np.ndarray, precision: int = 5) -> str:
+    """Encodes an `(N, 2)` array of `[lat, lng]` as a polyline string."""
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    if coords.size == 0:
+        return ""
+    ints = np.round(coords * 10 ** precision).astype(np.int64)
+    deltas = np.diff(ints, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+
+    # Split every value into 5-bit chunks (at most 7 for 32-bit deltas)
+    shifts = 5 * np.arange(7)
+    shifted = values[:, None] >> shifts
+    chunks = shifted & 0x1f
+    lengths = np.maximum(1, np.count_nonzero(shifted, axis=1))
+    columns = np.arange(7)
+    chunks = chunks | np.where(columns < (lengths - 1)[:, None], 0x20, 0)
+    return (chunks[columns < lengths[:, None]] + 63).astype(np.uint8).tobytes().decode("ascii")
+
+
+def to_dicts(coords: np.ndarray) -> List[Dict[str, float]]:
+    """List-of-dicts compatibility view (`[{"lat": ..., "lng": ...}, ...]`)."""
+    return [{"lat": lat, "lng": lng} for lat, lng in coords.tolist()]
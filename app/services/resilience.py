@@ -0,0 +1,341 @@
+"""
+Client-side protection for the Google upstreams (Maps, Air Quality, Gemini).
+
+Every outbound call first passes `Upstream.acquire`:
+
+* a daily quota budget (`UPSTREAM_DAILY_QUOTAS`, per process, reset at UTC
+  midnight) fails fast once spent;
+* a token bucket per upstream (`UPSTREAM_RATE_LIMITS` / `UPSTREAM_BURSTS`)
+  smooths bursts, and a smaller bucket per session (`SESSION_RATE_LIMIT`)
+  keeps one chatty session from starving the rest. Callers wait for a token
+  up to `RATE_LIMIT_MAX_WAIT_SECONDS`, then get `RateLimited`;
+* a circuit breaker opens after `CIRCUIT_FAILURE_THRESHOLD` consecutive
+  failures (server errors, 429s, transport errors) and rejects calls for
+  `CIRCUIT_RESET_SECONDS`, then lets a single trial call through. Calls that
+  end without a verdict on the upstream (cancelled, locally timed out, refused
+  client-side) count neither way but still release the trial.
+
+Rejections raise `UpstreamUnavailable` subclasses. They derive from
+`httpx.HTTPError`, so the tools' existing error handling applies, and the Maps
+and AQI caches answer from recently expired entries instead when they can.
+HTTP calls are guarded in `http_client`; LLM calls use `guard` / `aguard`.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar, Token
+from datetime import datetime, timezone
+from typing import Dict
+
+import httpx
+
+from ..core.config import settings
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamUnavailable(httpx.HTTPError):
+    """An upstream call was refused client-side; `retry_after` is a hint in seconds."""
+    reason = "unavailable"
+
+    def __init__(self, upstream: str, message: str, retry_after: float = 1.0):
+        super().__init__(f"{upstream}: {message}")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class RateLimited(UpstreamUnavailable):
+    reason = "rate_limited"
+
+
+class QuotaExceeded(UpstreamUnavailable):
+    reason = "quota_exceeded"
+
+
+class CircuitOpen(UpstreamUnavailable):
+    reason = "circuit_open"
+
+
+_session: ContextVar[str | None] = ContextVar("upstream_session", default=None)
+
+
+def bind_session(session_id: str | None) -> Token:
+    """Attributes the upstream calls made in the current context to `session_id`."""
+    return _session.set(session_id)
+
+
+class TokenBucket:
+    """Thread-safe token bucket; `reserve` hands out tokens in order, going into debt for short waits."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate, self.burst = rate, burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + max(0.0, now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, max_wait: float) -> float | None:
+        """Takes a token; returns how long to wait before using it, or None if that exceeds `max_wait`."""
+        with self._lock:
+            self._refill()
+            wait = max(0.0, (1 - self.tokens) / self.rate)
+            if wait > max_wait:
+                return None
+            self.tokens -= 1
+            return wait
+
+    def refund(self):
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + 1)
+
+    def available(self) -> float:
+        with self._lock:
+            self._refill()
+            return self.tokens
+
+
+class DailyQuota:
+    """Calls allowed per UTC day; a limit of 0 means unlimited."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self.day = datetime.now(timezone.utc).date()
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self._lock:
+            today = datetime.now(timezone.utc).date()
+            if today != self.day:
+                self.day, self.used = today, 0
+            if self.limit and self.used >= self.limit:
+                return False
+            self.used += 1
+            return True
+
+    def refund(self):
+        with self._lock:
+            self.used = max(0, self.used - 1)
+
+
+class CircuitBreaker:
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+    def __init__(self, failure_threshold: int, reset_seconds: float, name: str = ""):
+        self.name = name
+        self.failure_threshold, self.reset_seconds = failure_threshold, reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.reset_seconds - time.monotonic())
+
+    def allow(self) -> bool:
+        """True if a call may go out; in half-open state only one trial call at a time."""
+        with self._lock:
+            if self.state == self.OPEN and self.retry_after() == 0:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.OPEN:
+                return False
+            if self.state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state, self.failures, self._trial_in_flight = self.CLOSED, 0, False
+
+    def release(self):
+        """Ends a call that says nothing about the upstream's health, freeing the half-open trial."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning("Circuit for %s opened after %d consecutive failures.", self.name or "upstream",
+                                   self.failures)
+                self.state, self.opened_at = self.OPEN, time.monotonic()
+
+
+class Upstream:
+    """Quota, rate limits and circuit breaker for one upstream API."""
+
+    def __init__(self, name: str):
+        self.name = name
+        rate = settings.UPSTREAM_RATE_LIMITS.get(name, 0)
+        self.bucket = TokenBucket(rate, settings.UPSTREAM_BURSTS.get(name, max(1, rate))) if rate else None
+        self.quota = DailyQuota(settings.UPSTREAM_DAILY_QUOTAS.get(name, 0))
+        self.breaker = CircuitBreaker(settings.CIRCUIT_FAILURE_THRESHOLD, settings.CIRCUIT_RESET_SECONDS, name)
+        self._sessions: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _session_bucket(self, session_id: str | None) -> TokenBucket | None:
+        if not session_id or not settings.SESSION_RATE_LIMIT:
+            return None
+        with self._lock:
+            bucket = self._sessions.get(session_id)
+            if bucket is None:
+                bucket = self._sessions[session_id] = TokenBucket(settings.SESSION_RATE_LIMIT, settings.SESSION_BURST)
+                if len(self._sessions) > settings.SESSION_BUCKETS_MAX:
+                    self._sessions.popitem(last=False)
+            self._sessions.move_to_end(session_id)
+            return bucket
+
+    def _reject(self, error: UpstreamUnavailable):
+        REJECTIONS.inc(upstream=self.name, reason=error.reason)
+        raise error
+
+    def acquire(self) -> float:
+        """Admits one call and returns how long to wait before making it, or raises `UpstreamUnavailable`."""
+        if self.breaker.state == CircuitBreaker.OPEN and self.breaker.retry_after() > 0:
+            self._reject(CircuitOpen(self.name, "temporarily unavailable after repeated failures",
+                                     self.breaker.retry_after()))
+        if not self.quota.take():
+            self._reject(QuotaExceeded(self.name, "daily request budget spent", _seconds_to_utc_midnight()))
+
+        max_wait = settings.RATE_LIMIT_MAX_WAIT_SECONDS
+        taken = []
+        wait = 0.0
+        for bucket in (self._session_bucket(_session.get()), self.bucket):
+            if bucket is None:
+                continue
+            if (needed := bucket.reserve(max_wait)) is None:
+                for earlier in taken:
+                    earlier.refund()
+                self.quota.refund()
+                self._reject(RateLimited(self.name, "too many requests, slow down", 1.0 / bucket.rate))
+            taken.append(bucket)
+            wait = max(wait, needed)
+
+        if not self.breaker.allow():
+            for bucket in taken:
+                bucket.refund()
+            self.quota.refund()
+            self._reject(CircuitOpen(self.name, "temporarily unavailable after repeated failures",
+                                     max(self.breaker.retry_after(), 1.0)))
+        if wait:
+            THROTTLED_SECONDS.inc(wait, upstream=self.name)
+        return wait
+
+    def record(self, ok: bool | None):
+        """Records a call's outcome; None for calls that end without a verdict on the upstream."""
+        if ok is None:
+            self.breaker.release()
+        elif ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+
+def _seconds_to_utc_midnight() -> float:
+    now = datetime.now(timezone.utc)
+    return 86400 - (now.hour * 3600 + now.minute * 60 + now.second)
+
+
+_STATE_VALUES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+
+upstreams: Dict[str, Upstream] = {name: Upstream(name) for name in ("maps", "air_quality", "gemini")}
+
+REJECTIONS = metrics.Counter("compassgenie_upstream_rejections_total",
+                             "Calls refused client-side, by upstream and reason.", ("upstream", "reason"))
+THROTTLED_SECONDS = metrics.Counter("compassgenie_upstream_throttled_seconds_total",
+                                    "Time calls waited for a rate-limit token.", ("upstream",))
+STALE_SERVED = metrics.Counter("compassgenie_stale_responses_total",
+                               "Expired cache entries served because the upstream failed.", ("cache",))
+metrics.Gauge("compassgenie_circuit_state", "Circuit breaker state: 0 closed, 1 half-open, 2 open.", ("upstream",),
+              lambda: {(name, ): _STATE_VALUES[u.breaker.state] for name, u in upstreams.items()})
+metrics.Gauge("compassgenie_upstream_quota_used", "Calls made today against the daily budget.", ("upstream",),
+              lambda: {(name, ): u.quota.used for name, u in upstreams.items()})
+metrics.Gauge("compassgenie_upstream_quota_limit", "Daily call budget (0 = unlimited).", ("upstream",),
+              lambda: {(name, ): u.quota.limit for name, u in upstreams.items()})
+metrics.Gauge("compassgenie_rate_limit_tokens", "Tokens left in each upstream bucket.", ("upstream",),
+              lambda: {(name, ): u.bucket.available() for name, u in upstreams.items() if u.bucket})
+
+
+def stale_served(cache: str):
+    STALE_SERVED.inc(cache=cache)
+
+
+def is_failure(status_code: int | None) -> bool:
+    """Outcomes that count against the circuit breaker: transport errors, 429 and 5xx."""
+    return status_code is None or status_code == 429 or status_code >= 500
+
+
+def _exception_outcome(error: BaseException) -> bool | None:
+    """
+    What a call that raised says about the upstream: None for cancellations,
+    local timeouts and client-side refusals, otherwise whether the status code
+    (if the error carries one) is a success. Other errors count as failures.
+    """
+    if isinstance(error, (asyncio.CancelledError, GeneratorExit, TimeoutError, UpstreamUnavailable)):
+        return None
+    status = getattr(error, "code", None) or getattr(error, "status_code", None)
+    return isinstance(status, int) and not is_failure(status)
+
+
+def acquire(name: str):
+    """Blocking admission for one call to `name`."""
+    if wait := upstreams[name].acquire():
+        time.sleep(wait)
+
+
+async def aacquire(name: str):
+    if wait := upstreams[name].acquire():
+        try:
+            await asyncio.sleep(wait)
+        except BaseException:
+            upstreams[name].record(None)
+            raise
+
+
+@contextmanager
+def guard(name: str):
+    """Admits, then records the outcome of, a call made inside the block (e.g. an LLM call)."""
+    acquire(name)
+    outcome = None
+    try:
+        yield
+        outcome = True
+    except BaseException as e:
+        outcome = _exception_outcome(e)
+        raise
+    finally:
+        upstreams[name].record(outcome)
+
+
+@asynccontextmanager
+async def aguard(name: str):
+    await aacquire(name)
+    outcome = None
+    try:
+        yield
+        outcome = True
+    except BaseException as e:
+        outcome = _exception_outcome(e)
+        raise
+    finally:
+        upstreams[name].record(outcome)
+
+
+def reset():
+    """Fresh limiters and breakers (tests, or after changing the settings)."""
+    for name in list(upstreams):
+        upstreams[name] = Upstream(name)
@@ -0,0 +1,175 @@
+"""
+Response cache for repeated natural-language queries.
+
+Answers are keyed on the normalized query, the intent kind (which sets the
+TTL: AQI and routes go stale faster than places) and a quantized location
+cell. An optional similarity layer embeds queries and reuses an answer from
+the same cell and intent whose query is close enough, so "coffee shops near
+me" can be served by "coffee shop nearby". Route and AQI answers are only
+reused when the extracted destination / place also match exactly: "terminal
+1" and "terminal 3" look alike to an embedder but need different answers.
+General questions have nothing to anchor on ("weather in Parma" is close to
+"weather in Paris"), so they are only served on an exact match. Index entries
+leave with their cache entry, so the index never outgrows the cache. The
+default embedder hashes character trigrams; a local embedding model can be
+plugged in with `set_embedder`.
+
+Photo queries and queries that refer to earlier turns are never cached.
+Queries that match no intent are cached only when they open a new session,
+since their answer may otherwise depend on the conversation so far.
+"""
+import math
+import re
+import threading
+import zlib
+from collections import Counter, deque
+from typing import Any, Dict, List, Protocol, Tuple
+
+import numpy as np
+
+from ..core.config import settings
+from .cache import MISSING, TTLCache
+from .intent_router import classify, is_contextual, normalize_query
+
+
+INTENT_KINDS = {"aqi_here": "aqi", "aqi_place": "aqi", "route": "route", "nearby": "nearby"}
+# Kinds served from similar queries, and the intent arguments that must still match exactly
+ANCHOR_ARGS = {"nearby": (), "aqi": ("location_name",), "route": ("search_term", "origin_override", "waypoints")}
+_PLACE_WORDS = re.compile(r"\b(?:nearby|near here|around me|around here|close by|closeby)\b")
+
+
+class Embedder(Protocol):
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Returns one L2-normalized row per text."""
+
+
+class HashingEmbedder:
+    """Bag of hashed character trigrams: cheap, dependency-free, robust to typos and word order."""
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            padded = f"  {text} "
+            for i in range(len(padded) - 2):
+                vectors[row, zlib.crc32(padded[i:i + 3].encode()) % self.dim] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def _unindex(key: Tuple):
+    """Drops the similarity entry of a cache key that was evicted, expired or replaced."""
+    with _lock:
+        if (bucket := _index.get(key[:2])) is None:
+            return
+        for entry in bucket:
+            if entry[1] == key:
+                bucket.remove(entry)
+                break
+        if not bucket:
+            del _index[key[:2]]
+
+
+_cache = TTLCache(maxsize=settings.RESPONSE_CACHE_MAX_ENTRIES, ttl=max(settings.RESPONSE_CACHE_TTLS.values()),
+                  name="responses", on_remove=_unindex)
+_lock = threading.Lock()
+_index: Dict[Tuple, deque] = {}  # (intent kind, cell) -> recent (vector, exact key, anchor)
+_embedder: Embedder | None = HashingEmbedder() if settings.RESPONSE_CACHE_SEMANTIC else None
+_stats: Counter = Counter()
+
+
+def set_embedder(embedder: Embedder | None):
+    """Enables the similarity layer with `embedder`, or disables it with None."""
+    global _embedder
+    with _lock:
+        _embedder = embedder
+        _index.clear()
+
+
+def canonical_query(query: str) -> str:
+    """Normalized query with "nearby"-style phrasing and simple plurals folded together."""
+    query = _PLACE_WORDS.sub("near me", normalize_query(query))
+    return " ".join(w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w for w in query.split())
+
+
+def _cell(location: Dict[str, float]) -> Tuple[int, int] | None:
+    if not location or location.get("lat") is None or location.get("lng") is None:
+        return None
+    size = settings.RESPONSE_CACHE_CELL_DEGREES
+    return math.floor(location["lat"] / size), math.floor(location["lng"] / size)
+
+
+def _key(query: str, location: Dict[str, float], new_session: bool) -> Tuple[Tuple | None, Tuple]:
+    """
+    ((intent kind, cell, canonical query), anchor), with a None key if the query
+    must not be cached. The anchor holds the `ANCHOR_ARGS` of the intent.
+    """
+    if not settings.RESPONSE_CACHE_ENABLED or is_contextual(normalize_query(query)):
+        return None, ()
+    intent = classify(query, location or {})
+    kind = INTENT_KINDS.get(intent.name, "general") if intent else "general"
+    if kind == "general" and not new_session:
+        return None, ()
+    anchor = tuple(canonical_query(str(intent.args.get(arg) or "")) for arg in ANCHOR_ARGS.get(kind, ()))
+    return (kind, _cell(location), canonical_query(query)), anchor
+
+
+def lookup(query: str, location: Dict[str, float], new_session: bool = False) -> Dict[str, Any] | None:
+    """A cached answer for this query near this location, or None."""
+    key, anchor = _key(query, location, new_session)
+    if key is None:
+        _stats["skipped"] += 1
+        return None
+    if (value := _cache.get(key)) is not MISSING:
+        _stats["hits"] += 1
+        return {**value, "cached": True}
+
+    with _lock:
+        embedder = _embedder
+        bucket = [entry for entry in _index.get(key[:2], ()) if entry[2] == anchor]
+    if embedder is not None and bucket:
+        vector = embedder.embed([key[2]])[0]
+        vectors = np.stack([v for v, _, _ in bucket])
+        scores = vectors @ vector
+        best = int(np.argmax(scores))
+        if scores[best] >= settings.RESPONSE_CACHE_SIMILARITY:
+            if (value := _cache.get(bucket[best][1])) is not MISSING:
+                _stats["semantic_hits"] += 1
+                return {**value, "cached": True}
+
+    _stats["misses"] += 1
+    return None
+
+
+def store(query: str, location: Dict[str, float], result: Dict[str, Any], new_session: bool = False):
+    """Caches a successful answer under the TTL of its intent kind."""
+    key, anchor = _key(query, location, new_session)
+    if key is None or not result.get("response_text"):
+        return
+    _cache.set(key, {"response_text": result["response_text"], "map_data": result.get("map_data")},
+               ttl=settings.RESPONSE_CACHE_TTLS.get(key[0], settings.RESPONSE_CACHE_TTLS["general"]))
+    with _lock:
+        if _embedder is not None and key[0] in ANCHOR_ARGS:
+            bucket = _index.setdefault(key[:2], deque(maxlen=settings.RESPONSE_CACHE_SIMILAR_PER_CELL))
+            bucket.append((_embedder.embed([key[2]])[0], key, anchor))
+
+
+def response_cache_stats() -> Dict[str, Any]:
+    lookups = _stats["hits"] + _stats["semantic_hits"] + _stats["misses"]
+    return {
+        **_cache.stats(),
+        "hits": _stats["hits"],
+        "semantic_hits": _stats["semantic_hits"],
+        "misses": _stats["misses"],
+        "skipped": _stats["skipped"],
+        "hit_rate": (_stats["hits"] + _stats["semantic_hits"]) / lookups if lookups else 0.0,
+    }
+
+
+def clear_response_cache():
+    _cache.clear()
+    with _lock:
+        _index.clear()
+    _stats.clear()
@@ -0,0 +1,130 @@
+"""
+Tool node for the agent graph: runs the independent tool calls of one AI
+message concurrently (bounded per turn) with a timeout per tool, so a
+multi-city comparison costs max(latency) rather than sum(latency).
+
+Map payloads returned as tool artifacts are lifted into the `map_data` state
+field and dropped from the messages, so geometry is neither replayed to the
+model nor stored in every checkpoint.
+"""
+import asyncio
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List
+
+from langchain_core.messages import AIMessage, ToolCall, ToolMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langchain_core.tools import BaseTool
+
+from ..core.config import settings
+from . import metrics
+
+
+def _error_message(call: ToolCall, error: str) -> ToolMessage:
+    return ToolMessage(content=f"Error: {error}\n Please fix your mistakes.",
+                       tool_call_id=call["id"], name=call["name"], status="error")
+
+
+def _tool_timeout(name: str) -> float:
+    return settings.TOOL_TIMEOUTS.get(name, settings.TOOL_TIMEOUT_SECONDS)
+
+
+def _pending_calls(state: Dict[str, Any]) -> List[ToolCall]:
+    message = state["messages"][-1]
+    return message.tool_calls if isinstance(message, AIMessage) else []
+
+
+def _is_map_data(artifact: Any) -> bool:
+    return isinstance(artifact, dict) and bool(artifact.get("points") or artifact.get("routes"))
+
+
+def _lift_artifacts(messages: List[ToolMessage]) -> Dict[str, Any]:
+    """State update for one tool step: messages without map artifacts, plus the latest map payload."""
+    update: Dict[str, Any] = {"messages": []}
+    for message in messages:
+        if _is_map_data(message.artifact):
+            update["map_data"] = message.artifact
+        if message.artifact is not None:
+            # Copied: the original is still referenced by the tool's end event
+            message = message.model_copy(update={"artifact": None})
+        update["messages"].append(message)
+    return update
+
+
+class ToolExecutor:
+    """Executes the tool calls of the latest AI message, sync or async."""
+
+    def __init__(self, tools: List[BaseTool]):
+        self.tools_by_name = {t.name: t for t in tools}
+
+    def _resolve(self, call: ToolCall) -> BaseTool | None:
+        return self.tools_by_name.get(call["name"])
+
+    def _run_one(self, call: ToolCall, config: RunnableConfig) -> ToolMessage:
+        tool = self._resolve(call)
+        if tool is None:
+            return _error_message(call, f"{call['name']} is not a valid tool.")
+        try:
+            with metrics.span("tool", call["name"]):
+                return tool.invoke({**call, "type": "tool_call"}, config)
+        except Exception as e:
+            return _error_message(call, repr(e))
+
+    async def _arun_one(self, call: ToolCall, config: RunnableConfig, limit: asyncio.Semaphore) -> ToolMessage:
+        tool = self._resolve(call)
+        if tool is None:
+            return _error_message(call, f"{call['name']} is not a valid tool.")
+        async with limit:
+            try:
+                with metrics.span("tool", call["name"]):
+                    return await asyncio.wait_for(tool.ainvoke({**call, "type": "tool_call"}, config),
+                                                  timeout=_tool_timeout(call["name"]))
+            except asyncio.TimeoutError:
+                return _error_message(call, f"{call['name']} timed out after {_tool_timeout(call['name'])}s.")
+            except Exception as e:
+                return _error_message(call, repr(e))
+
+    def invoke(self, state: Dict[str, Any], config: RunnableConfig) -> Dict[str, Any]:
+        calls = _pending_calls(state)
+        if not calls:
+            return _lift_artifacts([])
+
+        # Even a single call runs on the pool so its timeout applies. Threads cannot
+        # be cancelled: a timed-out call is abandoned, not interrupted
+        pool = ThreadPoolExecutor(max_workers=min(settings.TOOL_MAX_CONCURRENCY, len(calls)))
+        try:
+            started = time.monotonic()
+            futures = [pool.submit(contextvars.copy_context().run, self._run_one, call, config) for call in calls]
+            messages = []
+            for call, future in zip(calls, futures):
+                try:
+                    # Each deadline counts from the common start, so the turn waits for the slowest tool only
+                    left = started + _tool_timeout(call["name"]) - time.monotonic()
+                    messages.append(future.result(timeout=max(0.0, left)))
+                except FutureTimeoutError:
+                    messages.append(_error_message(
+                        call, f"{call['name']} timed out after {_tool_timeout(call['name'])}s."))
+            return _lift_artifacts(messages)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    async def ainvoke(self, state: Dict[str, Any], config: RunnableConfig) -> Dict[str, Any]:
+        limit = asyncio.Semaphore(settings.TOOL_MAX_CONCURRENCY)
+        messages = await asyncio.gather(*(self._arun_one(call, config, limit) for call in _pending_calls(state)))
+        return _lift_artifacts(list(messages))
+
+
+def make_tool_node(tools: List[BaseTool]) -> RunnableLambda:
+    """Graph node wrapping `ToolExecutor` for both `invoke` and `ainvoke` runs."""
+    executor = ToolExecutor(tools)
+
+    @metrics.timed("node", "tools")
+    def tools_node(state: Dict[str, Any], config: RunnableConfig):
+        return executor.invoke(state, config)
+
+    @metrics.timed("node", "tools")
+    async def atools_node(state: Dict[str, Any], config: RunnableConfig):
+        return await executor.ainvoke(state, config)
+
+    return RunnableLambda(tools_node, afunc=atools_node, name="tools")
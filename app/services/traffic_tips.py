@@ -0,0 +1,171 @@
+"""
+Optional traffic-tip enrichment for route results.
+
+The tip used to be a blocking LLM call inside the route tool. It is now an
+enrichment stage controlled by `TRAFFIC_TIP_MODE`:
+
+* ``concurrent`` - generated alongside the Directions fetch; the route waits at
+  most `TRAFFIC_TIP_TIMEOUT_SECONDS` for it after Maps answers.
+* ``deferred``   - never waited for; a cached tip is used if present, otherwise
+  one is generated in the background for the next request on that pair.
+* ``off``        - no LLM call at all.
+
+Tips are cached per normalized origin/destination pair. The tip is an optional
+enrichment: a request that is over its budget (`budget`) only gets a cached
+tip, and never waits past the time it has left.
+"""
+import asyncio
+import contextvars
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Set, Tuple
+
+from ..core.config import settings
+from . import budget, llm, metrics, resilience
+from .cache import MISSING, SingleFlight, TTLCache
+from .geocoding import normalize_address
+
+
+DEFAULT_TIP = "* Drive safely!"
+
+_tip_cache = TTLCache(maxsize=settings.TRAFFIC_TIP_CACHE_MAX_ENTRIES, ttl=settings.TRAFFIC_TIP_CACHE_TTL_SECONDS,
+                      name="traffic_tips")
+_tip_flights = SingleFlight(cancel_abandoned=True)
+_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="traffic-tip")
+_background: Set[asyncio.Task] = set()
+
+
+def _key(origin_name: str, destination: str) -> Tuple[str, str]:
+    return normalize_address(origin_name), normalize_address(destination)
+
+
+def _prompt(origin_name: str, destination: str) -> str:
+    return f"Give 1 short traffic tip for driving from {origin_name} to {destination}."
+
+
+def _generate(origin_name: str, destination: str) -> str:
+    key = _key(origin_name, destination)
+
+    def call():
+        try:
+            with resilience.guard("gemini"), metrics.span("llm", "traffic_tip"):
+                response = llm.llm_for("traffic_tip").invoke(_prompt(origin_name, destination))
+        except Exception:
+            return DEFAULT_TIP
+        budget.spend(metrics.record_llm_usage("traffic_tip", response)[0])
+        tip = response.content
+        _tip_cache.set(key, tip)
+        return tip
+
+    return _tip_flights.do(key, call)
+
+
+async def _agenerate(origin_name: str, destination: str) -> str:
+    key = _key(origin_name, destination)
+
+    async def call():
+        try:
+            async with resilience.aguard("gemini"):
+                with metrics.span("llm", "traffic_tip"):
+                    response = await llm.llm_for("traffic_tip").ainvoke(_prompt(origin_name, destination))
+        except Exception:
+            return DEFAULT_TIP
+        budget.spend(metrics.record_llm_usage("traffic_tip", response)[0])
+        tip = response.content
+        _tip_cache.set(key, tip)
+        return tip
+
+    return await _tip_flights.ado(key, call)
+
+
+def _submit(origin_name: str, destination: str) -> Future:
+    """Generates a tip on the pool, in a copy of the caller's context (session binding, request budget)."""
+    return _pool.submit(contextvars.copy_context().run, _generate, origin_name, destination)
+
+
+def _wait_budget(started_at: float) -> float:
+    """How much longer a route may wait for its tip: the tip timeout, capped by the request's remaining budget."""
+    remaining = settings.TRAFFIC_TIP_TIMEOUT_SECONDS - (time.monotonic() - started_at)
+    request = budget.current()
+    if request is not None and (left := request.remaining()) is not None:
+        remaining = min(remaining, left)
+    return max(0.0, remaining)
+
+
+class PendingTip:
+    """Handle for a tip started alongside a Directions request (sync path)."""
+
+    def __init__(self, origin_name: str, destination: str):
+        self.origin_name, self.destination = origin_name, destination
+        self.cached = _tip_cache.get(_key(origin_name, destination))
+        self.started_at = time.monotonic()
+        self.future: Future | None = None
+        self.skipped = self.cached is MISSING and settings.TRAFFIC_TIP_MODE != "off" and \
+            budget.skip_enrichment("traffic_tip")
+        if self.cached is MISSING and settings.TRAFFIC_TIP_MODE == "concurrent" and not self.skipped:
+            self.future = _submit(origin_name, destination)
+
+    def result(self) -> str:
+        """The tip, waiting no longer than the remaining budget."""
+        if self.cached is not MISSING:
+            return self.cached
+        if self.future is not None:
+            try:
+                return self.future.result(timeout=_wait_budget(self.started_at))
+            except FutureTimeoutError:
+                return DEFAULT_TIP  # keeps running and lands in the cache
+        if settings.TRAFFIC_TIP_MODE == "deferred" and not self.skipped:
+            _submit(self.origin_name, self.destination)
+        return DEFAULT_TIP
+
+    def cancel(self):
+        """Drops a tip that has not started; threads cannot be interrupted, so a running one only detaches."""
+        if self.future is not None:
+            self.future.cancel()
+
+
+class APendingTip:
+    """Async counterpart of `PendingTip`."""
+
+    def __init__(self, origin_name: str, destination: str):
+        self.origin_name, self.destination = origin_name, destination
+        self.cached = _tip_cache.get(_key(origin_name, destination))
+        self.started_at = time.monotonic()
+        self.task: asyncio.Task | None = None
+        self.skipped = self.cached is MISSING and settings.TRAFFIC_TIP_MODE != "off" and \
+            budget.skip_enrichment("traffic_tip")
+        if self.cached is MISSING and settings.TRAFFIC_TIP_MODE == "concurrent" and not self.skipped:
+            self.task = _spawn(_agenerate(origin_name, destination))
+
+    async def result(self) -> str:
+        if self.cached is not MISSING:
+            return self.cached
+        if self.task is not None:
+            try:
+                return await asyncio.wait_for(asyncio.shield(self.task), timeout=_wait_budget(self.started_at))
+            except asyncio.TimeoutError:
+                return DEFAULT_TIP
+        if settings.TRAFFIC_TIP_MODE == "deferred" and not self.skipped:
+            _spawn(_agenerate(self.origin_name, self.destination))
+        return DEFAULT_TIP
+
+    def cancel(self):
+        """Cancels the tip, including its LLM call unless another route is waiting on the same pair."""
+        if self.task is not None:
+            self.task.cancel()
+
+
+def _spawn(coro) -> asyncio.Task:
+    """Starts a background task and keeps a reference until it finishes."""
+    task = asyncio.ensure_future(coro)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+    return task
+
+
+def start_tip(origin_name: str, destination: str) -> PendingTip:
+    return PendingTip(origin_name, destination)
+
+
+def astart_tip(origin_name: str, destination: str) -> APendingTip:
+    return APendingTip(origin_name, destination)
@@ -0,0 +1,47 @@
+"""
+Startup warm-up, run by the app's lifespan before it reports ready.
+
+Geocoding a seed list of popular addresses opens (and TLS-handshakes) the
+pooled Maps connections and fills the geocode cache with the places most
+requests start from; one round of dependency probes fills the health records
+so `/readyz` reflects real upstream state instead of "unknown". Everything is
+bounded by `WARMUP_TIMEOUT_SECONDS` and failures are only reported: a slow or
+failing upstream must not keep the app from starting.
+"""
+import asyncio
+import time
+from typing import Any, Dict
+
+from ..core.config import settings
+from . import health
+from .geocoding import ageocode
+
+
+async def _geocode_seeds() -> int:
+    """Geocodes the seed addresses concurrently; returns how many resolved."""
+    if settings.MAPS_MOCK_ENABLED or not settings.WARMUP_GEOCODE_SEEDS:
+        return 0
+    results = await asyncio.gather(*(ageocode(address) for address in settings.WARMUP_GEOCODE_SEEDS),
+                                   return_exceptions=True)
+    return sum(1 for result in results if isinstance(result, dict))
+
+
+async def _warm_up() -> Dict[str, Any]:
+    geocoded = await _geocode_seeds()
+    await health.checker.check_due()  # Maps is skipped if the seeds just showed it healthy
+    return {"geocoded": geocoded}
+
+
+async def warm_up() -> Dict[str, Any]:
+    """Primes connections, the geocode cache and health records; never raises."""
+    start = time.perf_counter()
+    try:
+        report = await asyncio.wait_for(_warm_up(), settings.WARMUP_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        report = {"error": f"timed out after {settings.WARMUP_TIMEOUT_SECONDS}s"}
+    except Exception as e:
+        report = {"error": repr(e)}
+    report["seconds"] = round(time.perf_counter() - start, 3)
+    if "error" in report:
+        print(f"Warm-up incomplete: {report['error']}")
+    return report
@@ -0,0 +1,70 @@
+"""
+Compares the blocking /chat path (sync graph invoked inside the event loop)
+against the async path, with a local Maps stub and a stub LLM.
+
+    python -m benchmarks.bench_async_chat --requests 200 --llm-latency 0.3 --maps-latency 0.1
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from app.core.config import settings  # noqa: E402
+from app.services import agent_service, http_client, llm  # noqa: E402
+from benchmarks.stubs import StubChatModel, start_maps_stub, unthrottle_upstreams  # noqa: E402
+
+LOCATION = {"lat": 28.5272, "lng": 77.2159}
+
+
+def _install_stubs(llm_latency: float, maps_latency: float):
+    server = start_maps_stub(maps_latency)
+    settings.MAPS_BASE_URL = server.base_url
+    settings.MAPS_MOCK_ENABLED = False
+    settings.MAPS_API_KEY = "benchmark"
+    settings.FAST_PATH_ENABLED = False  # measure the full agent loop
+    settings.RESPONSE_CACHE_ENABLED = False
+    unthrottle_upstreams()  # measure the app, not the client-side limiter
+    stub = StubChatModel(latency=llm_latency)
+    llm.set_llm(stub)
+    agent_service.llm_with_tools = stub
+    return server
+
+
+async def _run_sync_path(n: int) -> float:
+    """What the old endpoint did: a blocking invoke inside an async handler."""
+    async def handler():
+        return agent_service.invoke_agent_service("cafes nearby", LOCATION)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(handler() for _ in range(n)))
+    return time.perf_counter() - start
+
+
+async def _run_async_path(n: int) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(agent_service.ainvoke_agent_service("cafes nearby", LOCATION) for _ in range(n)))
+    return time.perf_counter() - start
+
+
+async def main(args):
+    server = _install_stubs(args.llm_latency, args.maps_latency)
+    try:
+        for name, runner, n in (("sync", _run_sync_path, args.sync_requests),
+                                ("async", _run_async_path, args.requests)):
+            agent_service.app_graph = agent_service.setup_agent_graph()  # fresh history per mode
+            elapsed = await runner(n)
+            print(f"{name:>5}: {n:4d} requests in {elapsed:7.2f}s  ->  {n / elapsed:8.1f} req/s")
+    finally:
+        await http_client.aclose_clients()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="in-flight chats for the async path")
+    parser.add_argument("--sync-requests", type=int, default=10, help="chats for the (serialized) sync path")
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--maps-latency", type=float, default=0.1)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,59 @@
+"""
+Per-request latency of simple queries through the intent fast path versus the
+full agent loop, with a local Maps stub and a stub LLM. The Maps response cache
+is cleared before every request so each one pays the Maps round trip.
+
+    python -m benchmarks.bench_fast_path --requests 20 --llm-latency 0.8 --maps-latency 0.15
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from app.core.config import settings  # noqa: E402
+from app.services import agent_service, google_maps, http_client, llm  # noqa: E402
+from benchmarks.stubs import StubChatModel, start_maps_stub  # noqa: E402
+
+LOCATION = {"lat": 28.5272, "lng": 77.2159}
+QUERIES = ["coffee near me", "find a pharmacy nearby", "nearest atm"]
+
+
+async def _latencies(n: int) -> list:
+    latencies = []
+    for i in range(n):
+        google_maps._response_cache.clear()
+        start = time.perf_counter()
+        await agent_service.ainvoke_agent_service(QUERIES[i % len(QUERIES)], LOCATION)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def main(args):
+    server = start_maps_stub(args.maps_latency)
+    settings.MAPS_BASE_URL = server.base_url
+    settings.MAPS_MOCK_ENABLED = False
+    settings.MAPS_API_KEY = "benchmark"
+    settings.RESPONSE_CACHE_ENABLED = False  # every request pays its own path
+    stub = StubChatModel(latency=args.llm_latency)
+    llm.set_llm(stub)
+    agent_service.llm_with_tools = stub
+    try:
+        for name, enabled in (("agent", False), ("fast path", True)):
+            settings.FAST_PATH_ENABLED = enabled
+            latencies = await _latencies(args.requests)
+            print(f"{name:>9}: p50 {statistics.median(latencies) * 1000:7.1f} ms   "
+                  f"max {max(latencies) * 1000:7.1f} ms   over {len(latencies)} requests")
+    finally:
+        await http_client.aclose_clients()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.8)
+    parser.add_argument("--maps-latency", type=float, default=0.15)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,63 @@
+"""
+Benchmark: one AI message with several independent tool calls, executed by
+the graph's tool node with stub tools that sleep for a configurable delay.
+Compares a concurrency limit of 1 (sequential) with the configured limit.
+
+    python -m benchmarks.bench_parallel_tools --calls 4 --delay 0.5
+"""
+import argparse
+import asyncio
+import time
+
+from langchain_core.messages import AIMessage
+from langchain_core.tools import StructuredTool
+
+from app.core.config import settings
+from app.services.tool_executor import ToolExecutor
+
+
+def stub_tool(delay: float) -> StructuredTool:
+    def get_aqi(location_name: str) -> str:
+        time.sleep(delay)
+        return f"AQI for {location_name}: 42"
+
+    async def aget_aqi(location_name: str) -> str:
+        await asyncio.sleep(delay)
+        return f"AQI for {location_name}: 42"
+
+    return StructuredTool.from_function(func=get_aqi, coroutine=aget_aqi, name="get_aqi",
+                                        description="Stub AQI lookup.")
+
+
+def turn(calls: int) -> dict:
+    return {"messages": [AIMessage(content="", tool_calls=[
+        {"name": "get_aqi", "args": {"location_name": f"City {i}"}, "id": f"call-{i}"} for i in range(calls)])]}
+
+
+def measure(executor: ToolExecutor, state: dict, limit: int) -> tuple:
+    settings.TOOL_MAX_CONCURRENCY = limit
+    start = time.perf_counter()
+    executor.invoke(state, {})
+    sync_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    asyncio.run(executor.ainvoke(state, {}))
+    return sync_elapsed, time.perf_counter() - start
+
+
+def main(args):
+    executor = ToolExecutor([stub_tool(args.delay)])
+    state = turn(args.calls)
+    configured = settings.TOOL_MAX_CONCURRENCY
+
+    print(f"{args.calls} tool calls x {args.delay:.2f}s each")
+    for label, limit in (("sequential (limit=1)", 1), (f"parallel (limit={configured})", configured)):
+        sync_elapsed, async_elapsed = measure(executor, state, limit)
+        print(f"{label:<24} sync {sync_elapsed:6.2f}s   async {async_elapsed:6.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=4)
+    parser.add_argument("--delay", type=float, default=0.5)
+    main(parser.parse_args())
@@ -0,0 +1,78 @@
+"""
+Micro-benchmark: the original pure-Python polyline decoder against the
+vectorized codec in app.services.polyline.
+
+    python -m benchmarks.bench_polyline --points 5000 --batch 20
+"""
+import argparse
+import timeit
+
+import numpy as np
+
+from app.services import polyline
+
+
+def legacy_decode_polyline(polyline_str):
+    """The character-by-character decoder maps_api_search used originally."""
+    index, lat, lng = 0, 0, 0
+    coordinates = []
+    changes = {'latitude': 0, 'longitude': 0}
+
+    while index < len(polyline_str):
+        for unit in ['latitude', 'longitude']:
+            shift, result = 0, 0
+            while True:
+                byte = ord(polyline_str[index]) - 63
+                index += 1
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            if result & 1:
+                changes[unit] = ~(result >> 1)
+            else:
+                changes[unit] = (result >> 1)
+
+        lat += changes['latitude']
+        lng += changes['longitude']
+        coordinates.append({"lat": lat / 100000.0, "lng": lng / 100000.0})
+
+    return coordinates
+
+
+def synthetic_route(points: int, seed: int = 0) -> str:
+    """A random-walk route of roughly road-like step sizes, encoded."""
+    rng = np.random.default_rng(seed)
+    coords = np.cumsum(rng.uniform(-0.002, 0.002, (points, 2)), axis=0) + [28.5, 77.2]
+    return polyline.encode_array(coords)
+
+
+def _report(name, fn, number):
+    seconds = min(timeit.repeat(fn, number=number, repeat=5)) / number
+    print(f"{name:<28} {seconds * 1e3:9.3f} ms")
+    return seconds
+
+
+def main(args):
+    encoded = synthetic_route(args.points)
+    batch = [synthetic_route(args.points // args.batch, seed) for seed in range(args.batch)]
+    assert legacy_decode_polyline(encoded) == polyline.to_dicts(polyline.decode_array(encoded))
+
+    print(f"single polyline, {args.points} points ({len(encoded)} chars)")
+    legacy = _report("legacy (list of dicts)", lambda: legacy_decode_polyline(encoded), args.number)
+    _report("decode_array + to_dicts", lambda: polyline.to_dicts(polyline.decode_array(encoded)), args.number)
+    fast = _report("decode_array", lambda: polyline.decode_array(encoded), args.number)
+    print(f"speed-up (array): {legacy / fast:.1f}x")
+
+    print(f"\n{args.batch} polylines of {args.points // args.batch} points")
+    legacy = _report("legacy, one by one", lambda: [legacy_decode_polyline(p) for p in batch], args.number)
+    fast = _report("decode_many", lambda: polyline.decode_many(batch), args.number)
+    print(f"speed-up (batch): {legacy / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=20)
+    parser.add_argument("--number", type=int, default=20)
+    main(parser.parse_args())
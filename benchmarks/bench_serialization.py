@@ -0,0 +1,85 @@
+"""
+Micro-benchmark: CPU spent turning a route tool result into the /chat response
+body, for the original path against the current one.
+
+* original: the tool decodes the polyline into `{lat, lng}` dicts and returns
+  its result as a JSON string, the agent parses it back, the endpoint builds
+  `MapData(**...)` with untyped `List[Dict[str, Any]]` fields and pydantic
+  encodes the response;
+* current: the tool keeps the encoded polyline, the geometry stage decodes it
+  once into an array and writes the requested `route_format`, and the dict is
+  encoded by orjson (`coords` straight from the array).
+
+Simplification costs the same on both paths, so by default every vertex is
+kept (`--max-points` applies a budget). `coords` did not exist originally; it
+is compared against the original `path`.
+
+    python -m benchmarks.bench_serialization --points 5000
+    python -m benchmarks.bench_serialization --points 5000 --max-points 1000
+"""
+import argparse
+import json
+import timeit
+from typing import Any, Dict, List
+
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+from app.services import geometry
+from benchmarks.bench_polyline import legacy_decode_polyline, synthetic_route
+
+
+class LegacyMapData(BaseModel):
+    points: List[Dict[str, Any]] | None = None
+    routes: List[Dict[str, Any]] | None = None
+
+
+class LegacyChatResponse(BaseModel):
+    response_text: str
+    map_data: LegacyMapData | None = None
+    session_id: str | None = None
+
+
+POINTS = [{"name": "India Gate", "latitude": 28.6129, "longitude": 77.2295}]
+TEXT = "### Route from Current Location to India Gate\n* 🚗 **Distance:** 14.2 km"
+
+
+def original(encoded: str, route_format: str, max_points: int) -> bytes:
+    tool_output = json.dumps({"response_text": TEXT,
+                              "map_data": {"points": POINTS, "routes": [{"path": legacy_decode_polyline(encoded)}]}})
+    map_data = json.loads(tool_output)["map_data"]
+    shaped = geometry.shape_map_data(map_data, max_points=max_points, route_format=route_format)
+    response = LegacyChatResponse(response_text=TEXT, map_data=LegacyMapData(**shaped), session_id="s")
+    return response.model_dump_json().encode()
+
+
+def current(encoded: str, route_format: str, max_points: int) -> bytes:
+    map_data = {"points": POINTS, "routes": [{"polyline": encoded}]}
+    shaped = geometry.shape_map_data(map_data, max_points=max_points, route_format=route_format)
+    return ORJSONResponse({"response_text": TEXT, "map_data": shaped, "session_id": "s"}).body
+
+
+def _time(fn, number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number
+
+
+def main(args):
+    encoded = synthetic_route(args.points)
+    max_points = args.max_points or args.points
+    print(f"route of {args.points} points, {max_points} kept per route")
+    print(f"{'format':<9} {'original':>10} {'current':>10} {'saved':>10} {'speed-up':>9} {'bytes':>9}")
+    for route_format in ("path", "coords", "polyline"):
+        baseline = "path" if route_format == "coords" else route_format
+        before = _time(lambda: original(encoded, baseline, max_points), args.number)
+        after = _time(lambda: current(encoded, route_format, max_points), args.number)
+        size = len(current(encoded, route_format, max_points))
+        print(f"{route_format:<9} {before * 1e3:8.2f}ms {after * 1e3:8.2f}ms {(before - after) * 1e3:8.2f}ms "
+              f"{before / after:8.1f}x {size:9d}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=5000)
+    parser.add_argument("--max-points", type=int, default=0, help="vertex budget per route; 0 keeps all")
+    parser.add_argument("--number", type=int, default=20)
+    main(parser.parse_args())
@@ -0,0 +1,85 @@
+"""
+Startup benchmark: how long a fresh process takes to import the app, to finish
+its lifespan startup (LLM client, graph, pools, optional warm-up) and to serve
+its first and second /chat requests, against the local Google stand-ins.
+
+Every repeat is a new interpreter, so nothing is shared between runs. Startup
+is measured with warm-up on and off; the gap between the first and the second
+request is what a cold process still makes its first user pay.
+
+    python -m benchmarks.bench_startup --repeats 5
+    python -m benchmarks.bench_startup --json startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.stub_server import make_config, start_stub_server
+
+ROOT = Path(__file__).resolve().parent.parent
+STAGES = ("import", "startup", "first_request", "second_request")
+LOCATION = {"lat": 28.5272, "lng": 77.2159}
+# Different destinations so the second request is not served from the Maps or tip caches
+QUERIES = {"first_request": "directions to India Gate", "second_request": "directions to Qutub Minar"}
+
+
+def _child():
+    """Runs in the measured process: prints one JSON line of stage timings (seconds)."""
+    start = time.perf_counter()
+    from app.main import app
+    from fastapi.testclient import TestClient
+
+    timings = {"import": time.perf_counter() - start}
+    start = time.perf_counter()
+    with TestClient(app) as client:
+        timings["startup"] = time.perf_counter() - start
+        for stage, query in QUERIES.items():
+            start = time.perf_counter()
+            client.post("/chat", json={"query": query, "location": LOCATION}).raise_for_status()
+            timings[stage] = time.perf_counter() - start
+    print(json.dumps(timings))
+
+
+def _run(env: dict) -> dict:
+    result = subprocess.run([sys.executable, "-m", "benchmarks.bench_startup", "--child"], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(args) -> dict:
+    server = start_stub_server(make_config(args.latency, spread=args.spread))
+    base_env = {**os.environ, **server.env(), "FAST_PATH_ENABLED": "false", "RESPONSE_CACHE_ENABLED": "false",
+                "HEALTH_CHECK_ENABLED": "false"}
+    report = {}
+    try:
+        for mode, warmup in (("warm-up", "true"), ("no warm-up", "false")):
+            runs = [_run({**base_env, "WARMUP_ENABLED": warmup}) for _ in range(args.repeats)]
+            report[mode] = {stage: statistics.median(run[stage] for run in runs) for stage in STAGES}
+    finally:
+        server.shutdown()
+
+    print(f"{'':>10}  " + "  ".join(f"{stage:>14}" for stage in STAGES) + f"   (median ms over {args.repeats} runs)")
+    for mode, medians in report.items():
+        print(f"{mode:>10}  " + "  ".join(f"{medians[stage] * 1000:14.1f}" for stage in STAGES))
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=3, help="fresh processes per mode")
+    parser.add_argument("--latency", default="", help="median seconds per upstream, e.g. llm=0.8,geocode=0.1")
+    parser.add_argument("--spread", type=float, default=0.0, help="log-normal sigma; 0 keeps runs comparable")
+    parser.add_argument("--json", default="", help="write the medians here")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child()
+    else:
+        main(args)
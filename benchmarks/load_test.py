@@ -0,0 +1,338 @@
+"""
+End-to-end load test: runs the real app under uvicorn against the local Google
+stand-ins (`benchmarks.stub_server`) and replays a scripted workload
+(`benchmarks.workload`) with a fixed number of concurrent virtual users.
+
+For every worker count it reports throughput, p50/p95/p99 latency, the error
+rate, upstream calls per turn and peak resident memory. Everything runs on
+localhost, so it works offline and in CI; `--max-p95-ms`, `--max-error-rate`
+and `--baseline` turn it into a regression gate (non-zero exit on a breach).
+
+    python -m benchmarks.load_test --workers 1,2,4 --sessions 200 --concurrency 32
+    python -m benchmarks.load_test --json bench.json                     # record a baseline
+    python -m benchmarks.load_test --baseline bench.json --tolerance 0.25  # fail on a >25% p95 regression
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+import numpy as np
+
+from benchmarks.stub_server import UPSTREAMS, make_config, start_stub_server
+from benchmarks.workload import Session, describe, generate
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@dataclass
+class Sample:
+    kind: str
+    latency: float
+    ok: bool
+    first_byte: float | None = None
+
+
+# --- Memory ---
+
+def _children(pid: int) -> List[int]:
+    children = []
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            fields = stat.read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(stat.parent.name))
+    return children
+
+
+def _rss(pid: int) -> int:
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def process_tree_rss(pid: int) -> Dict[int, int]:
+    """RSS in bytes of a process and all its descendants (Linux /proc, or psutil elsewhere)."""
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        root = psutil.Process(pid)
+        return {p.pid: p.memory_info().rss for p in [root, *root.children(recursive=True)]}
+    if not Path("/proc").exists():
+        return {}
+    tree, pending = {}, [pid]
+    while pending:
+        current = pending.pop()
+        tree[current] = _rss(current)
+        pending.extend(_children(current))
+    return tree
+
+
+class MemorySampler(threading.Thread):
+    """Tracks the peak total and peak single-process RSS of a process tree."""
+
+    def __init__(self, pid: int, interval: float = 0.25):
+        super().__init__(daemon=True)
+        self.pid, self.interval = pid, interval
+        self.peak_total = self.peak_process = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            tree = process_tree_rss(self.pid)
+            if tree:
+                self.peak_total = max(self.peak_total, sum(tree.values()))
+                self.peak_process = max(self.peak_process, max(tree.values()))
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+# --- App under test ---
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_app(workers: int, env: Dict[str, str], log_path: Path) -> tuple:
+    """Starts uvicorn with `workers` processes; returns (process, base_url, log file)."""
+    port = _free_port()
+    log = open(log_path, "w")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT, env={**os.environ, **env, "PYTHONUNBUFFERED": "1"}, stdout=log, stderr=subprocess.STDOUT)
+    return process, f"http://127.0.0.1:{port}", log
+
+
+def wait_until_up(process: subprocess.Popen, base_url: str, log_path: Path, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            if httpx.get(f"{base_url}/openapi.json", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    tail = "".join(log_path.read_text().splitlines(keepends=True)[-20:])
+    raise RuntimeError(f"App did not start at {base_url}:\n{tail}")
+
+
+def stop_app(process: subprocess.Popen, log):
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+    log.close()
+
+
+# --- Virtual users ---
+
+async def _chat(client: httpx.AsyncClient, turn, session_id: str | None, stream: bool) -> tuple:
+    """One turn; returns (ok, time to first byte or None, session id)."""
+    body = {"query": turn.query, "location": turn.location, "session_id": session_id}
+    if not stream:
+        response = await client.post("/chat", json=body)
+        ok = response.status_code == 200
+        return ok, None, response.json().get("session_id") if ok else session_id
+
+    start, first_byte, ok = time.perf_counter(), None, False
+    async with client.stream("POST", "/chat/stream", json=body) as response:
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            first_byte = first_byte or time.perf_counter() - start
+            event = json.loads(line)
+            if event.get("type") == "done":
+                ok, session_id = True, event.get("session_id", session_id)
+            elif event.get("type") == "error":
+                break
+    return ok and response.status_code == 200, first_byte, session_id
+
+
+async def _user(client: httpx.AsyncClient, queue: asyncio.Queue, samples: List[Sample], stream: bool):
+    while True:
+        try:
+            session: Session = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        session_id = None
+        for turn in session.turns:
+            start = time.perf_counter()
+            try:
+                ok, first_byte, session_id = await _chat(client, turn, session_id, stream)
+            except (httpx.HTTPError, ValueError):
+                ok, first_byte = False, None
+            samples.append(Sample(session.kind, time.perf_counter() - start, ok, first_byte))
+
+
+async def replay(base_url: str, workload: List[Session], concurrency: int, stream: bool) -> tuple:
+    """Replays `workload` with `concurrency` users; returns (samples, wall-clock seconds)."""
+    queue: asyncio.Queue = asyncio.Queue()
+    for session in workload:
+        queue.put_nowait(session)
+    samples: List[Sample] = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(_user(client, queue, samples, stream) for _ in range(concurrency)))
+        return samples, time.perf_counter() - start
+
+
+# --- Reporting ---
+
+def _ms(values, q: float) -> float:
+    return round(float(np.percentile(values, q)) * 1000, 1) if len(values) else 0.0
+
+
+def summarize(workers: int, samples: List[Sample], elapsed: float, peak_total: int, peak_process: int,
+              upstream_calls: Dict[str, int]) -> Dict:
+    latencies = [s.latency for s in samples]
+    first_bytes = [s.first_byte for s in samples if s.first_byte is not None]
+    by_kind = defaultdict(list)
+    for sample in samples:
+        by_kind[sample.kind].append(sample.latency)
+    errors = sum(not s.ok for s in samples)
+    return {
+        "workers": workers,
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": _ms(latencies, 50),
+        "p95_ms": _ms(latencies, 95),
+        "p99_ms": _ms(latencies, 99),
+        "first_byte_p50_ms": _ms(first_bytes, 50) if first_bytes else None,
+        "peak_rss_mb": round(peak_total / 2 ** 20, 1),
+        "peak_worker_rss_mb": round(peak_process / 2 ** 20, 1),
+        "upstream_calls_per_turn": {k: round(v / len(samples), 2) for k, v in upstream_calls.items()} if samples else {},
+        "p95_ms_by_kind": {kind: _ms(values, 95) for kind, values in sorted(by_kind.items())},
+    }
+
+
+def print_table(results: List[Dict]):
+    streamed = any(r["first_byte_p50_ms"] is not None for r in results)
+    header = f"{'workers':>7} {'reqs':>6} {'err%':>6} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} " \
+             f"{'RSS MB':>8} {'/worker':>8} {'LLM/turn':>9}" + (f" {'TTFB p50':>9}" if streamed else "")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['workers']:>7} {r['requests']:>6} {r['error_rate'] * 100:>6.2f} {r['rps']:>8.2f} "
+              f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['peak_rss_mb']:>8.1f} "
+              f"{r['peak_worker_rss_mb']:>8.1f} {r['upstream_calls_per_turn'].get('llm', 0):>9.2f}"
+              + (f" {r['first_byte_p50_ms'] or 0:>9.1f}" if streamed else ""))
+
+
+def check(results: List[Dict], args) -> List[str]:
+    """Threshold and baseline violations, as human-readable lines."""
+    failures = []
+    baseline = {}
+    if args.baseline:
+        baseline = {r["workers"]: r for r in json.loads(Path(args.baseline).read_text())["results"]}
+    for r in results:
+        if args.max_p95_ms is not None and r["p95_ms"] > args.max_p95_ms:
+            failures.append(f"{r['workers']} worker(s): p95 {r['p95_ms']} ms > {args.max_p95_ms} ms")
+        if args.max_error_rate is not None and r["error_rate"] > args.max_error_rate:
+            failures.append(f"{r['workers']} worker(s): error rate {r['error_rate']} > {args.max_error_rate}")
+        if (base := baseline.get(r["workers"])) and r["p95_ms"] > base["p95_ms"] * (1 + args.tolerance):
+            failures.append(f"{r['workers']} worker(s): p95 {r['p95_ms']} ms regressed from {base['p95_ms']} ms")
+    return failures
+
+
+def run(args) -> List[Dict]:
+    config = make_config(args.latency, args.errors, args.spread, args.seed)
+    stub = start_stub_server(config)
+    env = stub.env()
+    if args.no_cache:
+        env["RESPONSE_CACHE_ENABLED"] = "false"
+    if args.no_fast_path:
+        env["FAST_PATH_ENABLED"] = "false"
+    workload = generate(args.sessions, args.seed)
+    warmup = generate(args.warmup, args.seed + 1) if args.warmup else []
+    print(f"Workload: {describe(workload)}; {args.concurrency} concurrent users, "
+          f"{'/chat/stream' if args.stream else '/chat'}")
+
+    results = []
+    try:
+        for workers in args.workers:
+            with tempfile.TemporaryDirectory() as tmp:
+                log_path = Path(tmp) / "app.log"
+                process, base_url, log = start_app(workers, env, log_path)
+                try:
+                    wait_until_up(process, base_url, log_path)
+                    asyncio.run(replay(base_url, warmup, min(args.concurrency, workers * 2), args.stream))
+                    before = dict(config.calls)
+                    sampler = MemorySampler(process.pid)
+                    sampler.start()
+                    samples, elapsed = asyncio.run(replay(base_url, workload, args.concurrency, args.stream))
+                    sampler.stop()
+                    calls = {k: config.calls[k] - before[k] for k in UPSTREAMS}
+                    results.append(summarize(workers, samples, elapsed, sampler.peak_total,
+                                             sampler.peak_process, calls))
+                finally:
+                    stop_app(process, log)
+            print(f"  {workers} worker(s): done")
+    finally:
+        stub.shutdown()
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=lambda s: [int(w) for w in s.split(",")], default=[1, 2])
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=10, help="sessions replayed (and not measured) first")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stream", action="store_true", help="use /chat/stream and report time to first byte")
+    parser.add_argument("--latency", default="", help="median seconds per upstream, e.g. llm=0.8,places=0.15")
+    parser.add_argument("--errors", default="", help="error rate per upstream, e.g. llm=0.02")
+    parser.add_argument("--spread", type=float, default=None, help="log-normal sigma for every upstream")
+    parser.add_argument("--no-cache", action="store_true", help="disable the response cache in the app")
+    parser.add_argument("--no-fast-path", action="store_true", help="send every query through the agent")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--max-p95-ms", type=float, default=None)
+    parser.add_argument("--max-error-rate", type=float, default=None)
+    parser.add_argument("--baseline", help="results file from an earlier --json run to compare p95 against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 growth over the baseline")
+    args = parser.parse_args()
+
+    results = run(args)
+    print_table(results)
+    if args.json:
+        Path(args.json).write_text(json.dumps({"args": vars(args), "results": results}, indent=2))
+    failures = check(results, args)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,474 @@
+"""
+One local HTTP server standing in for every Google API the backend calls, so
+the whole app (not just the agent loop) can be load-tested offline:
+
+* Maps `place/textsearch/json`, `directions/json`, `distancematrix/json` and
+  `geocode/json`
+* Air Quality `currentConditions:lookup`
+* Gemini `generateContent` / `streamGenerateContent`, with tool calling, and
+  `models` (used by the health checker)
+
+Responses are deterministic per request (places and coordinates are derived
+from a hash of the query), while latency and failures are drawn per request
+from a `Profile` for each upstream: a log-normal delay around a median and an
+error rate. Point the app at it with the variables from `server.env()`:
+
+    python -m benchmarks.stub_server --port 8900 --latency llm=0.8,places=0.15 --errors llm=0.02
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from app.services.polyline import encode_array
+
+CITY_CENTER = (28.6139, 77.2090)
+UPSTREAMS = ("places", "directions", "matrix", "geocode", "aqi", "llm")
+
+
+@dataclass
+class Profile:
+    """Latency and failure model of one upstream."""
+    median: float = 0.1  # seconds
+    spread: float = 0.35  # sigma of the log-normal; 0 gives a fixed delay
+    error_rate: float = 0.0
+    error_status: int = 503
+
+    def delay(self, rng: random.Random) -> float:
+        return self.median * math.exp(rng.gauss(0.0, self.spread)) if self.spread else self.median
+
+
+DEFAULT_PROFILES = {
+    "places": Profile(0.15),
+    "directions": Profile(0.2),
+    "matrix": Profile(0.25),
+    "geocode": Profile(0.08),
+    "aqi": Profile(0.1),
+    "llm": Profile(0.8, spread=0.5),
+}
+
+
+@dataclass
+class StubConfig:
+    profiles: Dict[str, Profile] = field(
+        default_factory=lambda: {name: Profile(**vars(p)) for name, p in DEFAULT_PROFILES.items()})
+    seed: int | None = None
+
+    def __post_init__(self):
+        self._rng = random.Random(self.seed)
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = dict.fromkeys(UPSTREAMS, 0)
+        self.errors: Dict[str, int] = dict.fromkeys(UPSTREAMS, 0)
+
+    def draw(self, upstream: str) -> Tuple[float, bool]:
+        """(delay in seconds, whether to fail) for one call to `upstream`."""
+        profile = self.profiles[upstream]
+        with self._lock:
+            self.calls[upstream] += 1
+            failed = self._rng.random() < profile.error_rate
+            self.errors[upstream] += failed
+            return profile.delay(self._rng), failed
+
+
+def parse_overrides(spec: str) -> Dict[str, float]:
+    """Parses "llm=0.8,places=0.2" into {"llm": 0.8, "places": 0.2}."""
+    overrides = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        if name not in UPSTREAMS:
+            raise ValueError(f"Unknown upstream '{name}'; expected one of {', '.join(UPSTREAMS)}.")
+        overrides[name] = float(value)
+    return overrides
+
+
+def make_config(latency: str = "", errors: str = "", spread: float | None = None,
+                seed: int | None = None) -> StubConfig:
+    """A `StubConfig` from the command-line style override strings."""
+    config = StubConfig(seed=seed)
+    for name, median in parse_overrides(latency).items():
+        config.profiles[name].median = median
+    for name, rate in parse_overrides(errors).items():
+        config.profiles[name].error_rate = rate
+    if spread is not None:
+        for profile in config.profiles.values():
+            profile.spread = spread
+    return config
+
+
+# --- Deterministic fake geography ---
+
+def _hash_unit(text: str, salt: str = "") -> float:
+    """Stable pseudo-random number in [0, 1) for a string."""
+    return zlib.crc32(f"{salt}:{text}".lower().encode()) / 2 ** 32
+
+
+def _parse_latlng(text: str) -> Tuple[float, float] | None:
+    match = re.fullmatch(r"\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*", text or "")
+    return (float(match[1]), float(match[2])) if match else None
+
+
+def _place(name: str, near: Tuple[float, float] = CITY_CENTER, radius: float = 0.08) -> Tuple[float, float]:
+    """Coordinates for a named place: "lat,lng" strings as-is, anything else hashed around `near`."""
+    if coords := _parse_latlng(name):
+        return coords
+    return (near[0] + (2 * _hash_unit(name, "lat") - 1) * radius,
+            near[1] + (2 * _hash_unit(name, "lng") - 1) * radius)
+
+
+def _km(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    lat1, lng1, lat2, lng2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 12742 * math.asin(math.sqrt(h))
+
+
+def _path(a: Tuple[float, float], b: Tuple[float, float]) -> np.ndarray:
+    """A wiggly road-like path with a vertex density similar to real overview polylines."""
+    n = int(min(max(_km(a, b) * 8, 20), 400))
+    t = np.linspace(0.0, 1.0, n)
+    wiggle = 0.002 * np.sin(t * math.pi * 7) * np.sin(t * math.pi)
+    return np.column_stack((a[0] + (b[0] - a[0]) * t + wiggle, a[1] + (b[1] - a[1]) * t - wiggle))
+
+
+def places_response(query: str, location: str) -> Dict[str, Any]:
+    if "nowhere" in query.lower():
+        return {"status": "ZERO_RESULTS", "results": []}
+    near = _parse_latlng(location) or CITY_CENTER
+    results = []
+    for i in range(8):
+        lat, lng = _place(f"{query} {i}", near, radius=0.03)
+        results.append({
+            "name": f"{query.title()} {chr(65 + i)}",
+            "rating": round(3.5 + 1.5 * _hash_unit(f"{query} {i}", "rating"), 1),
+            "formatted_address": f"{10 + i} Stub Marg, New Delhi",
+            "geometry": {"location": {"lat": lat, "lng": lng}},
+        })
+    return {"status": "OK", "results": results}
+
+
+def geocode_response(address: str) -> Dict[str, Any]:
+    if "nowhere" in address.lower():
+        return {"status": "ZERO_RESULTS", "results": []}
+    lat, lng = _place(address)
+    return {"status": "OK", "results": [{"formatted_address": address.title(),
+                                         "geometry": {"location": {"lat": lat, "lng": lng}}}]}
+
+
+def directions_response(origin: str, destination: str, waypoints: str = "") -> Dict[str, Any]:
+    if "nowhere" in destination.lower():
+        return {"status": "ZERO_RESULTS", "routes": []}
+    start = _place(origin)
+    stops = [_place(w, start) for w in waypoints.split("|") if w] + [_place(destination, start)]
+    legs, paths, previous = [], [], start
+    for stop in stops:
+        km = _km(previous, stop) * 1.3
+        minutes = max(1, round(km / 25 * 60))
+        legs.append({"distance": {"text": f"{km:.1f} km", "value": int(km * 1000)},
+                     "duration": {"text": f"{minutes} mins", "value": minutes * 60},
+                     "start_location": {"lat": previous[0], "lng": previous[1]},
+                     "end_location": {"lat": stop[0], "lng": stop[1]}})
+        paths.append(_path(previous, stop))
+        previous = stop
+    overview = encode_array(np.concatenate(paths))
+    return {"status": "OK", "routes": [{"summary": "Stub Expressway", "legs": legs,
+                                        "overview_polyline": {"points": overview}}]}
+
+
+def distance_matrix_response(origins: str, destinations: str) -> Dict[str, Any]:
+    """Driving estimates between every origin and destination, consistent with `directions_response`."""
+    starts = [o for o in origins.split("|") if o]
+    start = _place(starts[0]) if starts else CITY_CENTER
+    rows = []
+    for origin in starts:
+        a = _place(origin, start)
+        elements = []
+        for destination in filter(None, destinations.split("|")):
+            if "nowhere" in destination.lower():
+                elements.append({"status": "ZERO_RESULTS"})
+                continue
+            km = _km(a, _place(destination, start)) * 1.3
+            minutes = max(1, round(km / 25 * 60))
+            elements.append({"status": "OK", "distance": {"text": f"{km:.1f} km", "value": int(km * 1000)},
+                             "duration": {"text": f"{minutes} mins", "value": minutes * 60}})
+        rows.append({"elements": elements})
+    return {"status": "OK", "origin_addresses": starts, "destination_addresses": destinations.split("|"),
+            "rows": rows}
+
+
+def aqi_response(lat: float, lng: float) -> Dict[str, Any]:
+    value = 40 + int(360 * _hash_unit(f"{lat:.2f},{lng:.2f}", "aqi"))
+    category = ("Good" if value <= 50 else "Satisfactory" if value <= 100 else "Moderate" if value <= 200
+                else "Poor" if value <= 300 else "Very Poor")
+    return {
+        "dateTime": time.strftime("%Y-%m-%dT%H:00:00Z", time.gmtime()),
+        "regionCode": "in",
+        "indexes": [{"code": "uaqi", "displayName": "Universal AQI", "aqi": max(0, 100 - value // 4),
+                     "category": "Moderate air quality"},
+                    {"code": "ind_cpcb", "displayName": "AQI (IN)", "aqi": value, "category": category}],
+        "dominantPollutant": "pm25",
+        "healthRecommendations": {"generalPopulation": "Reduce prolonged outdoor exertion.",
+                                  "lungDiseasePopulation": "Keep rescue medication at hand."},
+    }
+
+
+# --- Gemini stand-in ---
+
+_LOCATION = re.compile(r"Lat: (-?\d+(?:\.\d+)?), Lng: (-?\d+(?:\.\d+)?)")
+_WORDS = re.compile(r"^(?:(?:show me|find|search for|any|where is|what is|how is|check)\s+)?(?:the\s+|a\s+|some\s+)?")
+
+
+def _text(content: Dict[str, Any]) -> str:
+    return " ".join(part["text"] for part in content.get("parts", []) if "text" in part)
+
+
+def _last_route(contents: List[Dict[str, Any]]) -> str | None:
+    for content in reversed(contents):
+        for part in content.get("parts", []):
+            call = part.get("functionCall")
+            if call and call.get("args", {}).get("search_type") == "route":
+                return call["args"].get("search_term")
+    return None
+
+
+def _function_call(body: Dict[str, Any]) -> Dict[str, Any] | None:
+    """The tool call a real model would plausibly make for the latest user turn, or None to answer in text."""
+    tools = {d["name"] for t in body.get("tools", []) for d in t.get("functionDeclarations", [])}
+    contents = body.get("contents", [])
+    if not tools or not contents:
+        return None
+    last = contents[-1]
+    if any("functionResponse" in part for part in last.get("parts", [])):
+        return None  # tool results are in: answer in text
+    query = _text(last).lower().strip(" ?!.")
+    match = _LOCATION.search(_text(body.get("systemInstruction", {})))
+    lat, lng = (float(match[1]), float(match[2])) if match else CITY_CENTER
+    if any(p.get("inlineData") for p in last.get("parts", [])):
+        return {"name": "maps_api_search", "args": {"search_term": "India Gate", "latitude": lat, "longitude": lng,
+                                                    "search_type": "route"}}
+
+    if re.search(r"\b(aqi|air|pollution|smog)\b", query) and "get_aqi" in tools:
+        place = re.search(r"\b(?:in|at|for)\s+([a-z ]+)$", query)
+        args = {"location_name": place[1]} if place else {"lat": lat, "lng": lng}
+        return {"name": "get_aqi", "args": args}
+    if re.search(r"\b(weather|rain|temperature|umbrella|hot|cold)\b", query) and "google_search_for_weather" in tools:
+        return {"name": "google_search_for_weather", "args": {"query": query, "location": f"{lat},{lng}"}}
+    if (visit := re.search(r"\bvisit\s+(.+)$", query)) and "plan_itinerary" in tools:
+        stops = [stop.strip() for stop in re.split(r",\s*|\s+and\s+", visit[1]) if stop.strip()]
+        return {"name": "plan_itinerary", "args": {"stops": stops, "latitude": lat, "longitude": lng}}
+    if (via := re.search(r"\bvia\s+(.+?)(?:\s+instead)?$", query)) and (dest := _last_route(contents)):
+        return {"name": "maps_api_search", "args": {"search_term": dest, "latitude": lat, "longitude": lng,
+                                                    "search_type": "route", "waypoints": via[1]}}
+    if route := re.search(r"\b(?:route|directions|drive|take me|get|go|navigate)\b.*?\bto\s+(.+?)"
+                          r"(?:\s+from\s+(.+?))?$", query):
+        args = {"search_term": route[1], "latitude": lat, "longitude": lng, "search_type": "route"}
+        if route[2]:
+            args["origin_override"] = route[2]
+        return {"name": "maps_api_search", "args": args}
+    if budget := re.search(r"(.+?)\s+within\s+(?:a\s+)?(\d+)[- ]min(?:ute)?s?", query):
+        return {"name": "maps_api_search", "args": {"search_term": _WORDS.sub("", budget[1]), "latitude": lat,
+                                                    "longitude": lng, "search_type": "nearby",
+                                                    "max_travel_minutes": int(budget[2])}}
+    if nearby := re.search(r"(.+?)\s+(?:near me|nearby|around here|around me|close by|open late)", query):
+        return {"name": "maps_api_search", "args": {"search_term": _WORDS.sub("", nearby[1]), "latitude": lat,
+                                                    "longitude": lng, "search_type": "nearby"}}
+    return None
+
+
+_TOOL_ANSWERS = {
+    "maps_api_search": ("I've put the results on the map. The first option is usually the best balance of "
+                        "distance and rating; leave a little extra time at peak hours."),
+    "get_aqi": ("The air is not great right now. Sensitive groups should limit long outdoor activity and "
+                "consider a mask if they have to be out for a while."),
+    "plan_itinerary": ("Here's the order that keeps the driving shortest; the route is on the map. "
+                       "Give yourself a bit longer at the first stop if you are starting at lunch time."),
+    "google_search_for_weather": ("Expect a warm afternoon with a chance of light showers in the evening, "
+                                  "so carry an umbrella if you are heading out late."),
+}
+
+
+def _answer(body: Dict[str, Any]) -> str:
+    contents = body.get("contents", [])
+    parts = contents[-1].get("parts", []) if contents else []
+    if tool := next((p["functionResponse"]["name"] for p in parts if "functionResponse" in p), None):
+        return _TOOL_ANSWERS.get(tool, "Here is what I found.")
+    if not body.get("tools"):
+        return ("* Expect moderate traffic on the main arterial roads.\n"
+                "* Carry water and keep a mask handy if the air is hazy.")
+    return ("Happy to help! I can find places around you, plan a route, or check the air quality. "
+            "Just tell me where you want to go.")
+
+
+def gemini_response(body: Dict[str, Any], raw_size: int) -> Dict[str, Any]:
+    call = _function_call(body)
+    part = {"functionCall": call} if call else {"text": _answer(body)}
+    output = len(json.dumps(part)) // 4
+    prompt = raw_size // 4
+    return {
+        "candidates": [{"content": {"role": "model", "parts": [part]}, "finishReason": "STOP", "index": 0}],
+        "usageMetadata": {"promptTokenCount": prompt, "candidatesTokenCount": output,
+                          "totalTokenCount": prompt + output},
+        "modelVersion": "stub",
+    }
+
+
+def _stream_chunks(response: Dict[str, Any], words_per_chunk: int = 6) -> List[Dict[str, Any]]:
+    """Splits a text answer into several SSE chunks, as the real streaming endpoint does."""
+    part = response["candidates"][0]["content"]["parts"][0]
+    if "text" not in part:
+        return [response]
+    words = part["text"].split(" ")
+    chunks = []
+    for i in range(0, len(words), words_per_chunk):
+        text = " ".join(words[i:i + words_per_chunk]) + (" " if i + words_per_chunk < len(words) else "")
+        chunk = {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}]}
+        chunks.append(chunk)
+    chunks[-1]["candidates"][0]["finishReason"] = "STOP"
+    chunks[-1]["usageMetadata"] = response["usageMetadata"]
+    return chunks
+
+
+# --- HTTP plumbing ---
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config: StubConfig
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, body: Dict[str, Any], status: int = 200):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _fail(self, upstream: str):
+        status = self.config.profiles[upstream].error_status
+        if upstream == "llm":
+            body = {"error": {"code": status, "message": "The model is overloaded.", "status": "UNAVAILABLE"}}
+        else:
+            body = {"status": "UNKNOWN_ERROR", "error_message": "Stub upstream error."}
+        self._send_json(body, status)
+
+    def _serve(self, upstream: str) -> bool:
+        """Waits out the drawn latency; False (after sending an error) if this call should fail."""
+        delay, failed = self.config.draw(upstream)
+        time.sleep(delay)
+        if failed:
+            self._fail(upstream)
+        return not failed
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path.endswith("place/textsearch/json"):
+            if self._serve("places"):
+                self._send_json(places_response(params.get("query", ""), params.get("location", "")))
+        elif url.path.endswith("directions/json"):
+            if self._serve("directions"):
+                self._send_json(directions_response(params.get("origin", ""), params.get("destination", ""),
+                                                    params.get("waypoints", "")))
+        elif url.path.endswith("distancematrix/json"):
+            if self._serve("matrix"):
+                self._send_json(distance_matrix_response(params.get("origins", ""), params.get("destinations", "")))
+        elif url.path.endswith("geocode/json"):
+            if self._serve("geocode"):
+                self._send_json(geocode_response(params.get("address", "")))
+        elif url.path.endswith("/models"):  # health probe: no latency or errors drawn
+            self._send_json({"models": [{"name": "models/stub"}]})
+        else:
+            self._send_json({"status": "NOT_FOUND", "error_message": f"No stub for {url.path}"}, 404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.loads(raw or b"{}")
+        if url.path.endswith("currentConditions:lookup"):
+            if self._serve("aqi"):
+                location = body.get("location", {})
+                self._send_json(aqi_response(location.get("latitude", 0.0), location.get("longitude", 0.0)))
+        elif url.path.endswith(":generateContent"):
+            if self._serve("llm"):
+                self._send_json(gemini_response(body, len(raw)))
+        elif url.path.endswith(":streamGenerateContent"):
+            self._stream(body, len(raw))
+        else:
+            self._send_json({"error": {"code": 404, "message": f"No stub for {url.path}"}}, 404)
+
+    def _stream(self, body: Dict[str, Any], raw_size: int):
+        """Server-sent events; the first chunk arrives after most of the drawn latency."""
+        delay, failed = self.config.draw("llm")
+        time.sleep(delay * 0.7)
+        if failed:
+            return self._fail("llm")
+        chunks = _stream_chunks(gemini_response(body, raw_size))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(delay * 0.3 / len(chunks))
+            data = f"data: {json.dumps(chunk)}\r\n\r\n".encode()
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def env(self) -> Dict[str, str]:
+        """Environment that points the app (and its settings) at this server."""
+        return {
+            "GEMINI_API_KEY": "benchmark",
+            "MAPS_API_KEY": "benchmark",
+            "MAPS_BASE_URL": f"{self.base_url}/maps/api/",
+            "AIR_QUALITY_BASE_URL": f"{self.base_url}/v1/",
+            "LLM_BASE_URL": self.base_url,
+            # The stand-ins have no quota to protect: measure the app, not the client-side limiter
+            "UPSTREAM_RATE_LIMITS": "{}",
+            "SESSION_RATE_LIMIT": "0",
+        }
+
+
+def start_stub_server(config: StubConfig | None = None, port: int = 0) -> StubServer:
+    """Starts the stand-in server in a background thread."""
+    handler = type("StubHandler", (_StubHandler,), {"config": config or StubConfig()})
+    server = StubServer(("127.0.0.1", port), handler)
+    server.config = handler.config
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", default="", help="median seconds per upstream, e.g. llm=0.8,places=0.15")
+    parser.add_argument("--errors", default="", help="error rate per upstream, e.g. llm=0.02")
+    parser.add_argument("--spread", type=float, default=None, help="log-normal sigma for every upstream")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    server = start_stub_server(make_config(args.latency, args.errors, args.spread, args.seed), args.port)
+    print("Stub server running. Start the app with:")
+    print("  " + " ".join(f"{k}={v}" for k, v in server.env().items()) + " uvicorn app.main:app")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
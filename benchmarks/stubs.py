@@ -0,0 +1,96 @@
+"""
+Local stand-ins for the Google Maps web services and the Gemini chat model,
+used by the benchmark scripts so they run offline with controlled latency.
+"""
+import asyncio
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from app.core.config import settings
+from app.services import resilience
+
+
+PLACES_RESPONSE = {
+    "status": "OK",
+    "results": [{"name": "Stub Cafe", "rating": 4.4, "formatted_address": "1 Stub Road",
+                 "geometry": {"location": {"lat": 28.5301, "lng": 77.2190}}}],
+}
+
+
+class _MapsHandler(BaseHTTPRequestHandler):
+    latency = 0.1
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        path = urlparse(self.path).path
+        body = PLACES_RESPONSE if path.endswith("place/textsearch/json") else {"status": "ZERO_RESULTS"}
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def unthrottle_upstreams():
+    """Turns off the client-side rate limits: the stand-ins have no quota to protect."""
+    settings.UPSTREAM_RATE_LIMITS = {}
+    settings.SESSION_RATE_LIMIT = 0
+    resilience.reset()
+
+
+def start_maps_stub(latency: float = 0.1) -> ThreadingHTTPServer:
+    """Starts the Maps stub on a free local port; `server.base_url` points at it."""
+    handler = type("MapsHandler", (_MapsHandler,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    server.base_url = f"http://127.0.0.1:{server.server_port}/"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Deterministic tool-calling chat model: asks for a nearby search on the first
+    pass and answers in plain text once a tool result is in the history.
+    """
+    latency: float = 0.3
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub-chat"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _reply(self, messages) -> AIMessage:
+        last = messages[-1]
+        if isinstance(last, HumanMessage):
+            return AIMessage(content="", tool_calls=[{
+                "name": "maps_api_search",
+                "args": {"search_term": "cafe", "latitude": 28.5272, "longitude": 77.2159,
+                         "search_type": "nearby"},
+                "id": str(uuid.uuid4()),
+            }])
+        if isinstance(last, ToolMessage):
+            return AIMessage(content="Here are a few cafes near you.")
+        return AIMessage(content="* Drive safely!")
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
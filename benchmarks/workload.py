@@ -0,0 +1,97 @@
+"""
+Scripted, reproducible chat workloads for the load test.
+
+A workload is a list of sessions; each session is a short conversation (one
+to three turns) drawn from a weighted mix of the traffic CompassGenie sees:
+simple lookups the fast path answers, chatty requests that need the agent,
+multi-turn route edits, multi-stop itineraries, AQI and weather questions. Users are scattered around
+a few city centres, and place names come from small vocabularies, so popular
+queries repeat the way real traffic does and the caches get realistic hit
+rates.
+
+    python -m benchmarks.workload --sessions 20 --seed 7
+"""
+import argparse
+import random
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+CITIES = {
+    "delhi": (28.6139, 77.2090),
+    "mumbai": (19.0760, 72.8777),
+    "bengaluru": (12.9716, 77.5946),
+}
+PLACES = ["coffee", "pharmacy", "atm", "petrol pump", "biryani", "bookstore", "gym", "hospital", "pizza",
+          "ev charging station", "park", "bakery"]
+LANDMARKS = ["India Gate", "Connaught Place", "Hauz Khas Village", "Lodhi Garden", "Qutub Minar",
+             "IGI Airport", "Select Citywalk", "Lotus Temple", "Chandni Chowk", "Cyber Hub"]
+AQI_CITIES = ["Delhi", "Mumbai", "Kolkata", "Lucknow", "Pune"]
+
+# name -> (weight, turn templates); each template is formatted with a fresh draw of the slots below
+MIX: Dict[str, Tuple[float, List[str]]] = {
+    "nearby_simple": (0.25, ["{place} near me"]),
+    "nearby_chatty": (0.15, ["any good {place} around here that are open late?"]),
+    "route": (0.15, ["route to {landmark}"]),
+    "route_edit": (0.10, ["route to {landmark}", "how long will that take in traffic?", "go via {other} instead"]),
+    "aqi_here": (0.10, ["aqi here"]),
+    "aqi_city": (0.08, ["air quality in {city}"]),
+    "weather": (0.07, ["will it rain this evening?"]),
+    "chitchat": (0.05, ["hi! what can you do?", "thanks, that's all"]),
+    "nearby_followup": (0.05, ["{place} nearby", "which of those is the closest?"]),
+    "nearby_budget": (0.04, ["{place} within a 15 minute drive"]),
+    "itinerary": (0.04, ["plan my afternoon: visit {landmark}, {other} and {third}"]),
+}
+
+
+@dataclass
+class Turn:
+    query: str
+    location: Dict[str, float]
+
+
+@dataclass
+class Session:
+    kind: str
+    turns: List[Turn]
+
+
+def _location(rng: random.Random, spread: float = 0.02) -> Dict[str, float]:
+    """A user position within a couple of kilometres of one of the city centres."""
+    lat, lng = CITIES[rng.choice(list(CITIES))]
+    return {"lat": round(lat + rng.uniform(-spread, spread), 6), "lng": round(lng + rng.uniform(-spread, spread), 6)}
+
+
+def _session(kind: str, templates: List[str], rng: random.Random) -> Session:
+    landmark, other, third = rng.sample(LANDMARKS, 3)
+    slots = {"place": rng.choice(PLACES), "landmark": landmark, "other": other, "third": third,
+             "city": rng.choice(AQI_CITIES)}
+    location = _location(rng)
+    return Session(kind, [Turn(template.format(**slots), location) for template in templates])
+
+
+def generate(sessions: int, seed: int = 0, mix: Dict[str, Tuple[float, List[str]]] = MIX) -> List[Session]:
+    """`sessions` conversations drawn from `mix`; the same seed always gives the same workload."""
+    rng = random.Random(seed)
+    kinds = list(mix)
+    weights = [mix[kind][0] for kind in kinds]
+    return [_session(kind, mix[kind][1], rng) for kind in rng.choices(kinds, weights, k=sessions)]
+
+
+def describe(workload: List[Session]) -> str:
+    counts = Counter(session.kind for session in workload)
+    turns = sum(len(session.turns) for session in workload)
+    mix = ", ".join(f"{kind} {count}" for kind, count in counts.most_common())
+    return f"{len(workload)} sessions / {turns} turns ({mix})"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    workload = generate(args.sessions, args.seed)
+    print(describe(workload))
+    for session in workload:
+        for turn in session.turns:
+            print(f"  [{session.kind}] {turn.query}  @ {turn.location['lat']:.4f},{turn.location['lng']:.4f}")
@@ -1,12 +1,14 @@
 // --- CONFIGURATION ---
-const BACKEND_URL = "http://localhost:8000/chat";
+const STREAM_URL = "http://localhost:8000/chat/stream";
 
 // --- GLOBAL STATE ---
 let map;
 let userLocation = null;
 let markers = [];
 let routes = [];
+let routeLods = []; // Per-route levels of detail: [{ polyline, lods: [{zoom, path}] }]
 let selectedImageBase64 = null; // Stores the image to send
+let sessionId = null; // Conversation thread assigned by the backend on the first reply
 
 // --- 1. IMAGE HANDLING ---
 /**
@@ -80,6 +82,37 @@ function getUserLocation(isRetry = false) {
 }
 
 // --- 3. GOOGLE MAPS CORE ---
+/**
+ * Decodes a Google encoded polyline into [{lat, lng}] (the server sends routes encoded).
+ */
+function decodePolyline(encoded) {
+    const points = [];
+    let index = 0, lat = 0, lng = 0;
+
+    while (index < encoded.length) {
+        for (const axis of ['lat', 'lng']) {
+            let shift = 0, result = 0, byte;
+            do {
+                byte = encoded.charCodeAt(index++) - 63;
+                result |= (byte & 0x1f) << shift;
+                shift += 5;
+            } while (byte >= 0x20);
+            const delta = (result & 1) ? ~(result >> 1) : (result >> 1);
+            if (axis === 'lat') lat += delta; else lng += delta;
+        }
+        points.push({ lat: lat / 1e5, lng: lng / 1e5 });
+    }
+    return points;
+}
+
+/**
+ * Picks the coarsest level of detail that still looks exact at the current zoom.
+ */
+function pathForZoom(entry, zoom) {
+    const lod = entry.lods.find(l => l.zoom >= zoom);
+    return lod ? lod.path : entry.path;
+}
+
 window.initMap = function() {
     const mapContainer = document.getElementById('map');
     const loadingEl = document.getElementById('map-loading');
@@ -91,6 +124,11 @@ window.initMap = function() {
         styles: [{ featureType: "poi", elementType: "labels", stylers: [{ visibility: "off" }] }]
     });
 
+    map.addListener('zoom_changed', () => {
+        const zoom = map.getZoom();
+        routes.forEach((polyline, i) => polyline.setPath(pathForZoom(routeLods[i], zoom)));
+    });
+
     getUserLocation();
 };
 
@@ -99,6 +137,7 @@ function clearMap() {
     markers = [];
     routes.forEach(r => r.setMap(null));
     routes = [];
+    routeLods = [];
 }
 
 function addMarker(location, title, color = 'red') {
@@ -131,9 +170,15 @@ function updateMap(mapData) {
     // 2. Render Polylines (Routes)
     if (mapData.routes && mapData.routes.length > 0) {
         mapData.routes.forEach(route => {
-            if (route.path && route.path.length > 0) {
+            // Routes arrive encoded (route_format: "polyline"); older payloads carry `path` directly
+            const path = route.polyline ? decodePolyline(route.polyline) : route.path;
+            if (path && path.length > 0) {
+                const entry = {
+                    path: path,
+                    lods: (route.lods || []).map(l => ({ zoom: l.zoom, path: decodePolyline(l.polyline) }))
+                };
                 const polyline = new google.maps.Polyline({
-                    path: route.path, // This matches the list of {lat, lng} from your Python decoder
+                    path: path,
                     geodesic: true,
                     strokeColor: "#4F46E5", // Modern Indigo color
                     strokeOpacity: 0.8,
@@ -143,9 +188,10 @@ function updateMap(mapData) {
 
                 // Add to global state so clearMap() can remove it later
                 routes.push(polyline);
+                routeLods.push(entry);
 
                 // Extend bounds so the map zooms to show the whole route
-                route.path.forEach(point => bounds.extend(point));
+                path.forEach(point => bounds.extend(point));
                 hasContent = true;
             }
         });
@@ -197,32 +243,51 @@ window.handleChat = async function() {
     clearImage();
 
     try {
-        const response = await fetch(BACKEND_URL, {
+        const response = await fetch(STREAM_URL, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
                 query: query,
                 location: userLocation,
-                image: imageToSend // This is the key field for multimodal
+                image: imageToSend, // This is the key field for multimodal
+                session_id: sessionId,
+                route_format: "polyline",
+                route_lods: true
             })
         });
 
         if (!response.ok) throw new Error("Engine Error");
 
-        const data = await response.json();
-
-        // 3. UI: Append AI Response
+        // 3. UI: Stream the AI Response (newline-delimited JSON events)
         const aiMsgDiv = document.createElement('div');
         aiMsgDiv.className = 'flex justify-start mb-4';
-        const formattedHtml = typeof marked !== 'undefined' ? marked.parse(data.response_text) : data.response_text;
-
         aiMsgDiv.innerHTML = `
-            <div class="bg-gray-100 p-4 max-w-[90%] rounded-2xl shadow-inner text-sm text-gray-800 leading-relaxed">
-                ${formattedHtml}
-            </div>`;
-        chatBox.appendChild(aiMsgDiv);
+            <div class="bg-gray-100 p-4 max-w-[90%] rounded-2xl shadow-inner text-sm text-gray-800 leading-relaxed"></div>`;
+        const bubble = aiMsgDiv.firstElementChild;
+        let streamedText = "";
+
+        const render = (text) => {
+            if (!aiMsgDiv.isConnected) chatBox.appendChild(aiMsgDiv);
+            bubble.innerHTML = typeof marked !== 'undefined' ? marked.parse(text) : text;
+            chatBox.scrollTop = chatBox.scrollHeight;
+        };
 
-        if (data.map_data) updateMap(data.map_data);
+        await readEvents(response, (event) => {
+            if (event.type === 'tool_start') {
+                loadingIndicator.querySelector('span').textContent = `Genie is using ${event.tool}...`;
+            } else if (event.type === 'map_data') {
+                updateMap(event.map_data); // Draw the map before the text finishes
+            } else if (event.type === 'token') {
+                streamedText += event.text;
+                render(streamedText);
+            } else if (event.type === 'done') {
+                sessionId = event.session_id || sessionId;
+                render(event.response_text || streamedText);
+                if (event.map_data) updateMap(event.map_data);
+            } else if (event.type === 'error') {
+                throw new Error(event.detail);
+            }
+        });
 
     } catch (error) {
         console.error("Chat Error:", error);
@@ -232,10 +297,34 @@ window.handleChat = async function() {
     } finally {
         sendButton.disabled = false;
         loadingIndicator.classList.add('hidden');
+        loadingIndicator.querySelector('span').textContent = "Genie is analyzing map & image...";
         chatBox.scrollTop = chatBox.scrollHeight;
     }
 };
 
+/**
+ * Reads a newline-delimited JSON response body, calling onEvent for each event as it arrives.
+ */
+async function readEvents(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let newline;
+        while ((newline = buffer.indexOf('\n')) >= 0) {
+            const line = buffer.slice(0, newline).trim();
+            buffer = buffer.slice(newline + 1);
+            if (line) onEvent(JSON.parse(line));
+        }
+    }
+    if (buffer.trim()) onEvent(JSON.parse(buffer));
+}
+
 function showMessage(msg, type) {
     const errDiv = document.getElementById('error-message');
     errDiv.textContent = msg;
@@ -0,0 +1,18 @@
+import pytest
+
+from app.services import budget, resilience
+from app.services.response_cache import clear_response_cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_response_cache():
+    """Answers cached by one test must not short-circuit the graph in the next."""
+    clear_response_cache()
+
+
+@pytest.fixture(autouse=True)
+def fresh_upstream_limits():
+    """Failures scripted by one test must not leave a circuit open for the next."""
+    resilience.reset()
+    resilience.bind_session(None)
+    budget.clear()
@@ -0,0 +1,34 @@
+import json
+
+from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
+
+
+class ScriptedChatModel(FakeMessagesListChatModel):
+    """
+    Replays a fixed list of AI messages (tool calls included) and streams text
+    word by word, standing in for the Gemini client in graph tests.
+    """
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        message = self._generate(messages).generations[0].message
+        if message.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+                for i, call in enumerate(message.tool_calls)
+            ]))
+            return
+        for word in message.content.split(" "):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+
+
+def tool_call(name: str, call_id: str = "call-1", **args) -> AIMessage:
+    return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": call_id}])
+
+
+def scripted(*responses: AIMessage) -> ScriptedChatModel:
+    return ScriptedChatModel(responses=list(responses))
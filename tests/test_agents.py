@@ -1,5 +1,10 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+from app.services import agent_service, google_maps
 from app.services.agent_service import app_graph
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import AIMessage, HumanMessage
+from tests.fakes import scripted, tool_call
 
 
 def test_agent_graph_structure():
@@ -31,4 +36,49 @@ def test_initial_state_validation():
 
     assert "messages" in initial_state
     assert "user_location" in initial_state
-    assert isinstance(initial_state["messages"][0], HumanMessage)
\ No newline at end of file
+    assert isinstance(initial_state["messages"][0], HumanMessage)
+
+def test_stream_emits_tool_start_map_data_tokens_and_done(monkeypatch):
+    """The streaming service surfaces map data before the final answer's tokens."""
+    monkeypatch.setattr(agent_service, "llm_with_tools", scripted(
+        tool_call("maps_api_search", search_term="cafe", latitude=1.0, longitude=2.0),
+        AIMessage(content="Found a cafe nearby."),
+    ))
+    monkeypatch.setattr(agent_service, "app_graph", agent_service.setup_agent_graph())
+    monkeypatch.setattr(google_maps, "_afetch_cached", AsyncMock(return_value={
+        "results": [{"name": "Cafe", "geometry": {"location": {"lat": 1.0, "lng": 2.0}}}]}))
+
+    async def collect():
+        return [e async for e in agent_service.astream_agent_service("cafes", {"lat": 1.0, "lng": 2.0})]
+
+    events = asyncio.run(collect())
+    kinds = [e["type"] for e in events]
+
+    assert kinds[0] == "tool_start"
+    assert kinds.index("map_data") < kinds.index("token")
+    assert "".join(e["text"] for e in events if e["type"] == "token").strip() == "Found a cafe nearby."
+    assert events[-1]["type"] == "done"
+    assert events[-1]["map_data"]["points"][0]["name"] == "Cafe"
+
+
+def test_route_geometry_reaches_the_result_but_not_the_model(monkeypatch):
+    model = scripted(
+        tool_call("maps_api_search", search_term="cafe", latitude=1.0, longitude=2.0),
+        AIMessage(content="Found a cafe nearby."),
+        AIMessage(content="You're welcome."),
+    )
+    monkeypatch.setattr(agent_service, "llm_with_tools", model)
+    monkeypatch.setattr(agent_service, "app_graph", agent_service.setup_agent_graph())
+    monkeypatch.setattr(google_maps, "_afetch_cached", AsyncMock(return_value={
+        "results": [{"name": "Cafe", "geometry": {"location": {"lat": 1.0, "lng": 2.0}}}]}))
+
+    result = asyncio.run(agent_service.ainvoke_agent_service("cafes", {"lat": 1.0, "lng": 2.0}, session_id="geo"))
+    tool_message = agent_service.app_graph.get_state(
+        {"configurable": {"thread_id": "geo"}}).values["messages"][2]
+
+    assert result["map_data"]["points"][0]["name"] == "Cafe"
+    assert "latitude" not in tool_message.content and tool_message.artifact is None
+
+    # A follow-up turn without a map tool does not repeat the previous map
+    followup = asyncio.run(agent_service.ainvoke_agent_service("thanks", {"lat": 1.0, "lng": 2.0}, session_id="geo"))
+    assert followup["map_data"] is None
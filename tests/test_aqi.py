@@ -0,0 +1,60 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.services import aqi_services
+
+READING = {
+    "indexes": [{"code": "ind_cpcb", "aqi": 180, "category": "Moderate"}],
+    "dominantPollutant": "pm25",
+    "healthRecommendations": {"generalPopulation": "Limit outdoor activity."},
+}
+
+
+@pytest.fixture(autouse=True)
+def fresh_aqi_cache():
+    aqi_services._aqi_cache.clear()
+    yield
+    aqi_services._aqi_cache.clear()
+
+
+@patch('app.services.aqi_services.http_client.post')
+def test_nearby_requests_share_one_reading(mock_post):
+    mock_post.return_value.json.return_value = READING
+
+    first = aqi_services.get_aqi.invoke({"lat": 28.6139, "lng": 77.2090})
+    second = aqi_services.get_aqi.invoke({"lat": 28.6141, "lng": 77.2093})
+
+    assert first == second
+    assert "**AQI:** 180 (Moderate)" in first
+    assert "WARNING" in first
+    mock_post.assert_called_once()
+
+
+@patch('app.services.aqi_services.http_client.post')
+def test_error_payloads_are_not_cached(mock_post):
+    mock_post.return_value.json.return_value = {"error": {"code": 429}}
+
+    assert aqi_services.get_aqi.invoke({"lat": 1.0, "lng": 1.0}).startswith("Error retrieving data")
+    aqi_services.get_aqi.invoke({"lat": 1.0, "lng": 1.0})
+    assert mock_post.call_count == 2
+
+
+@patch('app.services.aqi_services.http_client.apost', new_callable=AsyncMock)
+def test_concurrent_misses_for_one_cell_are_coalesced(mock_apost):
+    async def slow_reading(*args, **kwargs):
+        await asyncio.sleep(0.05)
+        response = MagicMock()
+        response.json.return_value = READING
+        return response
+
+    mock_apost.side_effect = slow_reading
+
+    async def burst():
+        return await asyncio.gather(*(aqi_services.get_aqi.ainvoke({"lat": 28.6139, "lng": 77.2090})
+                                      for _ in range(10)))
+
+    results = asyncio.run(burst())
+
+    assert len(set(results)) == 1
+    assert mock_apost.await_count == 1
@@ -0,0 +1,76 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from app.core.config import settings
+from app.services import agent_service, budget, google_maps, llm as llm_client, traffic_tips
+from tests.fakes import scripted, tool_call
+
+HERE = {"lat": 1.0, "lng": 2.0}
+CAFES = {"results": [{"name": "Cafe", "geometry": {"location": {"lat": 1.0, "lng": 2.0}}}]}
+
+
+@pytest.fixture
+def profiles(monkeypatch):
+    """Separate scripted models for the fast and rich profiles, behind a fresh graph."""
+    def install(fast, rich):
+        monkeypatch.setattr(llm_client, "_models", {"fast": fast, "rich": rich})
+        monkeypatch.setattr(agent_service, "app_graph", agent_service.setup_agent_graph())
+        monkeypatch.setattr(google_maps, "_afetch_cached", AsyncMock(return_value=CAFES))
+        monkeypatch.setattr(settings, "FAST_PATH_ENABLED", False)
+
+    return install
+
+
+def _ask():
+    return asyncio.run(agent_service.ainvoke_agent_service("somewhere for coffee?", HERE))
+
+
+def test_routing_runs_on_the_fast_profile_and_synthesis_on_the_rich_one(profiles):
+    fast = scripted(tool_call("maps_api_search", search_term="cafe", latitude=1.0, longitude=2.0))
+    profiles(fast, rich=scripted(AIMessage(content="Cafe is two minutes away.")))
+    before = budget.PROFILE_CALLS.value(role="synthesis", profile="rich")
+
+    result = _ask()
+
+    assert result["response_text"] == "Cafe is two minutes away."
+    assert budget.PROFILE_CALLS.value(role="synthesis", profile="rich") == before + 1
+
+
+def test_over_the_token_budget_synthesis_is_downgraded(profiles, monkeypatch):
+    monkeypatch.setattr(settings, "REQUEST_TOKEN_BUDGET", 1)
+    profiles(fast=scripted(tool_call("maps_api_search", search_term="cafe", latitude=1.0, longitude=2.0),
+                           AIMessage(content="Quick answer.")),
+             rich=scripted(AIMessage(content="Considered answer.")))
+    before = budget.EXCEEDED.value(budget="tokens", action="downgrade")
+
+    result = _ask()
+
+    assert result["response_text"] == "Quick answer."
+    assert budget.EXCEEDED.value(budget="tokens", action="downgrade") == before + 1
+    assert budget.USED.count(budget="tokens") >= 1
+
+
+def test_over_the_latency_budget_the_traffic_tip_is_skipped(monkeypatch):
+    tip_model = MagicMock()
+    monkeypatch.setattr(llm_client, "_llm", tip_model)
+    monkeypatch.setattr(settings, "TRAFFIC_TIP_MODE", "concurrent")
+    monkeypatch.setattr(settings, "REQUEST_LATENCY_BUDGET_SECONDS", 0.01)
+    traffic_tips._tip_cache.clear()
+    budget.start()
+    time.sleep(0.02)
+
+    assert traffic_tips.start_tip("Home", "Airport").result() == traffic_tips.DEFAULT_TIP
+    tip_model.invoke.assert_not_called()
+    assert budget.EXCEEDED.value(budget="latency", action="skip_traffic_tip") >= 1
+
+
+def test_profiles_override_the_default_model_settings(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_PROFILES", {"fast": {"thinking_level": "low", "model": "gemini-flash-lite"}})
+
+    assert llm_client.profile_settings("fast") == {"model": "gemini-flash-lite", "temperature": settings.LLM_TEMPERATURE,
+                                                   "thinking_level": "low"}
+    assert llm_client.profile_settings("")["thinking_level"] == settings.LLM_THINKING_LEVEL
@@ -0,0 +1,45 @@
+from unittest.mock import AsyncMock
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import endpoints
+from app.domain.agent_state import ChatResponse
+from app.main import app
+from app.services import polyline
+
+ROUTE = np.column_stack((np.linspace(28.50, 28.62, 300), 77.20 + 0.01 * np.sin(np.linspace(0, 12, 300))))
+RESULT = {
+    "response_text": "### Route from Current Location to India Gate",
+    "map_data": {"points": [{"name": "India Gate", "latitude": 28.62, "longitude": 77.21}],
+                 "routes": [{"polyline": polyline.encode_array(ROUTE)}]},
+    "session_id": "s-1",
+}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(endpoints, "ainvoke_agent_service", AsyncMock(return_value=RESULT))
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("route_format", ["path", "coords", "polyline"])
+def test_chat_payload_matches_the_typed_models(client, route_format):
+    response = client.post("/chat", json={"query": "route to India Gate", "location": {"lat": 28.5, "lng": 77.2},
+                                          "route_format": route_format, "route_lods": True})
+
+    assert response.status_code == 200
+    body = ChatResponse.model_validate(response.json())
+    route = body.map_data.routes[0]
+    assert getattr(route, route_format) and route.lods
+    assert body.map_data.points[0].name == "India Gate" and body.session_id == "s-1"
+
+
+def test_coords_are_compact_lat_lng_pairs(client):
+    response = client.post("/chat", json={"query": "route to India Gate", "location": {"lat": 28.5, "lng": 77.2},
+                                          "route_format": "coords"})
+
+    coords = response.json()["map_data"]["routes"][0]["coords"]
+    assert coords[0] == [28.5, 77.2] and len(coords) <= len(ROUTE)
+    assert b'"lat"' not in response.content
@@ -0,0 +1,99 @@
+import asyncio
+from unittest.mock import patch
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.services import agent_service
+from app.services.checkpoints import BoundedMemorySaver, open_checkpointer
+from tests.fakes import scripted
+
+
+def _graph(monkeypatch, saver, *responses):
+    monkeypatch.setattr(agent_service, "llm_with_tools", scripted(*responses))
+    monkeypatch.setattr(agent_service, "app_graph", agent_service.setup_agent_graph(saver))
+
+
+def _history(saver, session_id):
+    return agent_service.app_graph.get_state({"configurable": {"thread_id": session_id}}).values["messages"]
+
+
+def test_sessions_are_isolated(monkeypatch):
+    saver = BoundedMemorySaver(max_threads=10, ttl_seconds=3600, max_bytes=10**7)
+    _graph(monkeypatch, saver, AIMessage(content="one"), AIMessage(content="two"), AIMessage(content="three"))
+
+    first = agent_service.invoke_agent_service("hi", {"lat": 1.0, "lng": 2.0})
+    agent_service.invoke_agent_service("again", {"lat": 1.0, "lng": 2.0}, session_id=first["session_id"])
+    other = agent_service.invoke_agent_service("hello", {"lat": 1.0, "lng": 2.0})
+
+    assert first["session_id"] != other["session_id"]
+    assert len(_history(saver, first["session_id"])) == 4
+    assert len(_history(saver, other["session_id"])) == 2
+
+
+def test_old_checkpoints_are_pruned_but_state_survives(monkeypatch):
+    saver = BoundedMemorySaver(max_threads=10, ttl_seconds=3600, max_bytes=10**7, keep_per_thread=2)
+    _graph(monkeypatch, saver, *[AIMessage(content=f"reply {i}") for i in range(5)])
+
+    for i in range(5):
+        agent_service.invoke_agent_service(f"turn {i}", {"lat": 1.0, "lng": 2.0}, session_id="s1")
+
+    assert len(saver.storage["s1"][""]) == 2
+    assert len(_history(saver, "s1")) == 10
+    # Only blobs of the retained checkpoints are kept
+    assert all(key[0] == "s1" for key in saver.blobs)
+    assert saver.total_bytes == saver.stats()["bytes"] > 0
+
+
+def test_least_recently_used_session_is_evicted(monkeypatch):
+    saver = BoundedMemorySaver(max_threads=2, ttl_seconds=3600, max_bytes=10**7)
+    _graph(monkeypatch, saver, *[AIMessage(content="ok")] * 4)
+
+    for session_id in ("a", "b"):
+        agent_service.invoke_agent_service("hi", {"lat": 1.0, "lng": 2.0}, session_id=session_id)
+    _history(saver, "a")  # reading a session refreshes it
+    agent_service.invoke_agent_service("hi", {"lat": 1.0, "lng": 2.0}, session_id="c")
+
+    assert set(saver.storage) == {"a", "c"}
+    assert not any(key[0] == "b" for key in saver.blobs)
+    assert saver.evictions == 1
+
+
+def test_idle_sessions_expire_and_byte_cap_holds(monkeypatch):
+    saver = BoundedMemorySaver(max_threads=100, ttl_seconds=60, max_bytes=10**7)
+    _graph(monkeypatch, saver, *[AIMessage(content="ok")] * 2)
+
+    with patch("app.services.checkpoints.time.monotonic", return_value=1000.0):
+        agent_service.invoke_agent_service("hi", {"lat": 1.0, "lng": 2.0}, session_id="old")
+    with patch("app.services.checkpoints.time.monotonic", return_value=1100.0):
+        agent_service.invoke_agent_service("hi", {"lat": 1.0, "lng": 2.0}, session_id="new")
+    assert set(saver.storage) == {"new"}
+
+    one_session = saver.total_bytes
+    saver.max_bytes = one_session * 3 // 2  # room for one session, not two
+    _graph(monkeypatch, saver, *[AIMessage(content="ok")] * 3)
+    for session_id in ("x", "y", "z"):
+        agent_service.invoke_agent_service("hi", {"lat": 1.0, "lng": 2.0}, session_id=session_id)
+
+    assert list(saver.storage) == ["z"]
+    assert saver.total_bytes <= saver.max_bytes
+
+
+def test_delete_thread_releases_everything():
+    saver = BoundedMemorySaver(max_threads=10, ttl_seconds=3600, max_bytes=10**7)
+    graph = agent_service.setup_agent_graph(saver)
+    with patch.object(agent_service, "llm_with_tools", scripted(AIMessage(content="ok"))):
+        graph.invoke({"messages": [HumanMessage(content="hi")], "user_location": {}},
+                     {"configurable": {"thread_id": "t"}})
+
+    saver.delete_thread("t")
+
+    assert not saver.storage and not saver.blobs and not saver.writes
+    assert saver.total_bytes == 0
+
+
+def test_open_checkpointer_defaults_to_bounded_memory():
+    async def opened():
+        async with open_checkpointer() as saver:
+            return saver
+
+    assert isinstance(asyncio.run(opened()), BoundedMemorySaver)
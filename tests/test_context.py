@@ -0,0 +1,84 @@
+import json
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from app.services import agent_service
+from app.services.checkpoints import BoundedMemorySaver
+from app.services.context import IMAGE_PLACEHOLDER, STUB_PREFIX, compact_history, estimate_tokens
+from tests.fakes import scripted, tool_call
+
+
+IMAGE = {"type": "image_url", "image_url": {"url": "data:image/jpeg;base64," + "A" * 4000}}
+ROUTE_RESULT = json.dumps({"response_text": "Route to India Gate: 12 km, 30 mins.",
+                           "map_data": {"routes": [{"path": [{"lat": 28.6, "lng": 77.2}] * 500}]}})
+
+
+def _turn(i: int, image: bool = False):
+    content = [{"type": "text", "text": f"question {i}"}] + ([IMAGE] if image else [])
+    call = tool_call("maps_api_search", call_id=f"call-{i}", search_term="India Gate")
+    return [HumanMessage(content=content, id=f"h{i}"), AIMessage(content="", tool_calls=call.tool_calls, id=f"a{i}"),
+            ToolMessage(content=ROUTE_RESULT, tool_call_id=f"call-{i}", name="maps_api_search", id=f"t{i}"),
+            AIMessage(content=f"answer {i}", id=f"r{i}")]
+
+
+def _state(*turns):
+    return {"messages": [m for t in turns for m in t], "user_location": {"lat": 1.0, "lng": 2.0}}
+
+
+def test_earlier_tool_results_and_images_are_shrunk_current_turn_is_not():
+    update = compact_history(_state(_turn(0, image=True), _turn(1, image=True)))
+    replaced = {m.id: m for m in update["messages"]}
+
+    assert set(replaced) == {"h0", "t0"}
+    assert replaced["t0"].content.startswith(STUB_PREFIX)
+    assert "12 km, 30 mins" in replaced["t0"].content
+    assert replaced["h0"].content[-1]["text"] == IMAGE_PLACEHOLDER
+    assert not any(p.get("type") == "image_url" for p in replaced["h0"].content)
+
+
+def test_stubs_are_not_shrunk_twice():
+    first = compact_history(_state(_turn(0), _turn(1)))
+    stub = next(m for m in first["messages"] if m.id == "t0")
+    turn = _turn(0)
+    turn[2] = stub
+
+    assert compact_history(_state(turn, _turn(1)))["messages"] == []
+
+
+def test_turns_beyond_the_limit_are_folded_into_the_summary(monkeypatch):
+    monkeypatch.setattr("app.services.context.settings.CONTEXT_KEEP_TURNS", 2)
+    update = compact_history({**_state(*[_turn(i) for i in range(5)]), "summary": "- User: earlier"})
+    removed = {m.id for m in update["messages"] if m.type == "remove"}
+
+    assert removed == {"h0", "a0", "t0", "r0", "h1", "a1", "t1", "r1"}
+    lines = update["summary"].splitlines()
+    assert lines[0] == "- User: earlier"
+    assert lines[1] == "- User: question 0 (tools: maps_api_search) -> Assistant: answer 0"
+    assert len(lines) == 3
+
+
+def test_token_budget_folds_turns_even_under_the_turn_limit(monkeypatch):
+    monkeypatch.setattr("app.services.context.settings.CONTEXT_MAX_TOKENS", 100)
+    state = _state(*[_turn(i) for i in range(3)])
+    update = compact_history(state)
+    removed = {m.id for m in update["messages"] if m.type == "remove"}
+    remaining = [m for m in state["messages"] if m.id not in removed]
+
+    assert {"h0", "t0"} <= removed
+    assert {"h2", "a2", "t2", "r2"} <= {m.id for m in remaining}
+    assert estimate_tokens(remaining, update["summary"]) <= 100 or len(remaining) == 4
+
+
+def test_graph_history_stays_bounded_and_reports_prompt_tokens(monkeypatch):
+    monkeypatch.setattr("app.services.context.settings.CONTEXT_KEEP_TURNS", 1)
+    monkeypatch.setattr(agent_service, "llm_with_tools", scripted(*[AIMessage(content=f"reply {i}") for i in range(4)]))
+    monkeypatch.setattr(agent_service, "app_graph", agent_service.setup_agent_graph(
+        BoundedMemorySaver(max_threads=10, ttl_seconds=3600, max_bytes=10 ** 7)))
+
+    results = [agent_service.invoke_agent_service(f"turn {i}", {"lat": 1.0, "lng": 2.0}, session_id="s")
+               for i in range(4)]
+    state = agent_service.app_graph.get_state({"configurable": {"thread_id": "s"}}).values
+
+    assert len(state["messages"]) == 4  # one earlier turn + the current one
+    assert "turn 1" in state["summary"] and "turn 0" in state["summary"]
+    assert all(r["prompt_tokens"] > 0 for r in results)
@@ -0,0 +1,80 @@
+import pytest
+from unittest.mock import patch
+
+from app.core.config import settings
+from app.services import geocoding
+
+
+@pytest.fixture(autouse=True)
+def live_geocoder(monkeypatch):
+    monkeypatch.setattr(settings, "MAPS_MOCK_ENABLED", False)
+    geocoding.clear_geocode_cache()
+    yield
+    geocoding.clear_geocode_cache()
+
+
+def _ok(lat, lng):
+    return {"status": "OK", "results": [{"geometry": {"location": {"lat": lat, "lng": lng}}}]}
+
+
+@patch('app.services.geocoding.http_client.get')
+def test_repeated_addresses_hit_the_cache(mock_get):
+    mock_get.return_value.json.return_value = _ok(28.63, 77.22)
+
+    first = geocoding.geocode("Connaught Place")
+    second = geocoding.geocode("  connaught   place. ")
+
+    assert first == second == {"lat": 28.63, "lng": 77.22}
+    mock_get.assert_called_once()
+    assert geocoding.geocode_cache_stats()["hits"] == 1
+
+
+@patch('app.services.geocoding.http_client.get')
+def test_zero_results_are_negatively_cached(mock_get):
+    mock_get.return_value.json.return_value = {"status": "ZERO_RESULTS", "results": []}
+
+    assert geocoding.geocode("NonExistentPlace12345") is None
+    assert geocoding.geocode("NonExistentPlace12345") is None
+    mock_get.assert_called_once()
+
+
+@patch('app.services.geocoding.http_client.get')
+def test_literal_coordinates_skip_the_lookup(mock_get):
+    assert geocoding.geocode("28.5272, 77.2159") == {"lat": 28.5272, "lng": 77.2159}
+    mock_get.assert_not_called()
+
+
+def test_sqlite_store_survives_reopen(tmp_path):
+    path = str(tmp_path / "geocode.sqlite3")
+    store = geocoding.SqliteGeocodeStore(path)
+    store.set("delhi", {"lat": 28.61, "lng": 77.21}, ttl=60)
+    store.close()
+
+    reopened = geocoding.SqliteGeocodeStore(path)
+    assert reopened.get("delhi") == {"lat": 28.61, "lng": 77.21}
+    assert reopened.get("unknown") is geocoding.MISSING
+    reopened.close()
+
+
+def test_disk_hits_keep_their_remaining_ttl_in_memory(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "GEOCODE_CACHE_DB_PATH", str(tmp_path / "geocode.sqlite3"))
+    try:
+        geocoding.open_geocode_store().set("delhi", {"lat": 28.61, "lng": 77.21}, ttl=5)
+        assert geocoding._cached("delhi") == {"lat": 28.61, "lng": 77.21}  # promoted from disk
+
+        with patch("app.services.cache.time.monotonic", return_value=geocoding.time.monotonic() + 10):
+            assert geocoding._memory_cache.get("delhi") is geocoding.MISSING
+    finally:
+        geocoding.close_geocode_store()
+
+
+def test_sqlite_store_purges_expired_rows(tmp_path):
+    store = geocoding.SqliteGeocodeStore(str(tmp_path / "geocode.sqlite3"))
+    store.set("gone", {"lat": 1.0, "lng": 2.0}, ttl=-1)
+    store.set("stale", None, ttl=-1)
+    store.set("kept", {"lat": 3.0, "lng": 4.0}, ttl=60)
+
+    assert store.get("gone") is geocoding.MISSING  # deleted on read
+    assert store.purge() == 1  # "stale"
+    assert store._conn.execute("SELECT key FROM geocode").fetchall() == [("kept",)]
+    store.close()
@@ -0,0 +1,51 @@
+import numpy as np
+
+from app.services import geometry, polyline
+
+
+def _zigzag_route(points=2000):
+    lats = np.linspace(28.4, 28.9, points)
+    lngs = 77.1 + 0.01 * np.sin(np.linspace(0, 40, points))
+    return np.column_stack((lats, lngs))
+
+
+def test_collinear_points_collapse_to_endpoints():
+    line = np.column_stack((np.linspace(28.0, 29.0, 100), np.linspace(77.0, 78.0, 100)))
+
+    assert len(geometry.simplify(line, tolerance_m=1.0)) == 2
+
+
+def test_lower_zoom_keeps_fewer_points():
+    route = _zigzag_route()
+
+    coarse = geometry.simplify(route, geometry.zoom_tolerance_m(8, 28.6))
+    fine = geometry.simplify(route, geometry.zoom_tolerance_m(15, 28.6))
+
+    assert 2 < len(coarse) < len(fine) <= len(route)
+
+
+def test_shape_route_honours_budget_and_encodes():
+    path = polyline.to_dicts(_zigzag_route())
+
+    shaped = geometry.shape_route({"path": path}, max_points=200, route_format="polyline", lods=True)
+
+    assert "path" not in shaped
+    decoded = polyline.decode_array(shaped["polyline"])
+    assert len(decoded) <= 200
+    assert np.allclose(decoded[[0, -1]], [[path[0]["lat"], path[0]["lng"]], [path[-1]["lat"], path[-1]["lng"]]],
+                       atol=1e-5)
+    lod_sizes = [len(polyline.decode_array(lod["polyline"])) for lod in shaped["lods"]]
+    assert lod_sizes == sorted(lod_sizes)
+
+
+def test_encoded_route_is_decoded_once_into_the_requested_format():
+    route = _zigzag_route(500)
+    encoded = polyline.encode_array(route)
+
+    as_coords = geometry.shape_route({"polyline": encoded}, route_format="coords")
+    as_path = geometry.shape_route({"polyline": encoded})
+    as_polyline = geometry.shape_route({"polyline": encoded}, route_format="polyline")
+
+    assert set(as_coords) == {"coords"} and np.allclose(as_coords["coords"], route, atol=1e-5)
+    assert set(as_path) == {"path"} and as_path["path"][0] == {"lat": 28.4, "lng": 77.1}
+    assert as_polyline == {"polyline": encoded}  # nothing dropped: the original string is passed through
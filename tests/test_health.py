@@ -0,0 +1,86 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import health
+from app.services.health import HealthChecker
+
+
+@pytest.fixture
+def checker(monkeypatch):
+    probes = {"maps": AsyncMock(return_value=(True, "")), "air_quality": AsyncMock(return_value=(True, "")),
+              "gemini": AsyncMock(return_value=(True, ""))}
+    checker = HealthChecker(probes)
+    checker.started = True
+    monkeypatch.setattr(health, "checker", checker)
+    monkeypatch.setattr(health.settings, "MAPS_MOCK_ENABLED", False)
+    monkeypatch.setattr(health.settings, "GEMINI_API_KEY", "key")
+    return checker
+
+
+def test_probes_never_touch_the_network(checker):
+    client = TestClient(app)
+
+    assert client.get("/livez").json() == {"status": "alive"}
+    ready = client.get("/readyz")
+    assert ready.status_code == 200
+    assert ready.json()["dependencies"]["maps"]["status"] == "unknown"
+    for probe in checker.probes.values():
+        probe.assert_not_called()
+
+
+def test_background_check_records_success_and_latency(checker):
+    asyncio.run(checker.check_due())
+
+    snapshot = TestClient(app).get("/health").json()
+    assert snapshot["status"] == "healthy"
+    maps = snapshot["dependencies"]["maps"]
+    assert maps["status"] == "ok" and maps["source"] == "probe"
+    assert maps["last_success"] is not None and maps["latency_ms"] is not None
+
+
+def test_recent_traffic_makes_a_probe_unnecessary(checker):
+    health.observe_response("https://maps.googleapis.com/maps/api/place/textsearch/json", 200, 0.12)
+
+    asyncio.run(checker.check_due())
+
+    checker.probes["maps"].assert_not_called()
+    checker.probes["gemini"].assert_awaited_once()
+    assert checker.snapshot()["dependencies"]["maps"]["source"] == "traffic"
+
+
+def test_failing_dependency_backs_off_and_goes_down(checker):
+    checker.probes["maps"].return_value = (False, "HTTP 503")
+    asyncio.run(checker.check_due())
+    delays = []
+    with patch.object(health.time, "monotonic", return_value=1e9):
+        for _ in range(4):
+            checker.dependencies["maps"].next_probe = 0.0
+            asyncio.run(checker.check_due())
+            delays.append(checker.dependencies["maps"].next_probe - 1e9)
+
+    interval, cap = health.settings.HEALTH_CHECK_INTERVAL_SECONDS, health.settings.HEALTH_CHECK_MAX_BACKOFF_SECONDS
+    assert delays == sorted(delays) and delays[0] >= interval * 0.8 * 2 and delays[-1] <= cap
+    response = TestClient(app).get("/readyz")
+    assert response.status_code == 503
+    assert response.json()["detail"]["dependencies"]["maps"]["status"] == "down"
+    assert response.json()["detail"]["dependencies"]["maps"]["last_error"] == "HTTP 503"
+
+
+def test_optional_dependency_failure_keeps_the_pod_ready(checker):
+    checker.observe("maps", True)
+    checker.observe("air_quality", False, error="HTTP 500", source="probe")
+
+    snapshot = checker.snapshot()
+
+    assert snapshot["dependencies"]["air_quality"]["status"] == "down"
+    assert snapshot["ready"] is True
+
+
+def test_not_ready_before_startup(checker):
+    checker.started = False
+
+    assert TestClient(app).get("/readyz").status_code == 503
@@ -0,0 +1,52 @@
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services import http_client
+
+
+@pytest.fixture
+def mock_transport(monkeypatch):
+    """Routes the pooled sync client through a scripted transport with no backoff sleep."""
+    calls = []
+
+    def install(*statuses):
+        responses = iter(statuses)
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(next(responses), json={"status": "OK"})
+
+        monkeypatch.setattr(http_client, "_client", httpx.Client(transport=httpx.MockTransport(handler)))
+        monkeypatch.setattr(http_client, "backoff_delay", lambda attempt: 0)
+        return calls
+
+    yield install
+    http_client.close_clients()
+
+
+def test_retries_transient_status_then_succeeds(mock_transport, monkeypatch):
+    monkeypatch.setattr(settings, "HTTP_MAX_RETRIES", 2)
+    calls = mock_transport(503, 200)
+
+    response = http_client.get("https://maps.example.test/geocode/json")
+
+    assert response.status_code == 200
+    assert len(calls) == 2
+
+
+def test_retries_are_bounded(mock_transport, monkeypatch):
+    monkeypatch.setattr(settings, "HTTP_MAX_RETRIES", 1)
+    calls = mock_transport(503, 503, 200)
+
+    response = http_client.get("https://maps.example.test/geocode/json")
+
+    assert response.status_code == 503
+    assert len(calls) == 2
+
+
+def test_backoff_delay_is_capped(monkeypatch):
+    monkeypatch.setattr(settings, "HTTP_BACKOFF_BASE_SECONDS", 1.0)
+    monkeypatch.setattr(settings, "HTTP_BACKOFF_MAX_SECONDS", 2.0)
+
+    assert all(0 <= http_client.backoff_delay(10) <= 2.0 for _ in range(50))
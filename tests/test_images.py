@@ -0,0 +1,138 @@
+import asyncio
+import base64
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+
+from app.main import app
+from app.services import agent_service, images, resilience
+from app.services.images import ImageValidationError
+from tests.fakes import scripted
+
+PIL = pytest.importorskip("PIL.Image")
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    images.clear_image_caches()
+
+
+def _jpeg(width: int, height: int) -> bytes:
+    out = io.BytesIO()
+    PIL.new("RGB", (width, height), (200, 120, 40)).save(out, format="JPEG")
+    return out.getvalue()
+
+
+def test_large_photos_are_downscaled_and_reencoded():
+    prepared = images.prepare(_jpeg(4000, 3000))
+
+    with PIL.open(io.BytesIO(prepared.data)) as img:
+        assert max(img.size) == images.settings.IMAGE_MAX_DIMENSION
+        assert img.size == (1024, 768)
+    assert prepared.mime_type == "image/jpeg"
+    assert prepared.data_url.startswith("data:image/jpeg;base64,")
+
+
+def test_small_photos_pass_through_and_repeats_are_deduplicated():
+    data = _jpeg(300, 200)
+    first = images.prepare_base64(base64.b64encode(data).decode())
+
+    assert first.data == data
+    assert images.prepare(data) is first
+
+
+def test_invalid_uploads_are_rejected_with_a_status(monkeypatch):
+    with pytest.raises(ImageValidationError) as not_base64:
+        images.prepare_base64("not base64!!")
+    with pytest.raises(ImageValidationError) as not_image:
+        images.prepare(b"plain text, not a photo")
+    monkeypatch.setattr(images.settings, "IMAGE_MAX_BYTES", 100)
+    with pytest.raises(ImageValidationError) as too_large:
+        images.prepare_base64("A" * 400)
+
+    assert not_base64.value.status_code == 400
+    assert not_image.value.status_code == 400
+    assert too_large.value.status_code == 413
+
+
+def test_identified_photo_is_named_instead_of_resent():
+    image = images.prepare(_jpeg(300, 200))
+    first = agent_service._build_initial_state("take me here", {"lat": 1.0, "lng": 2.0}, image)
+    assert first["messages"][0].content[1]["type"] == "image_url"
+
+    images.remember_place(image.digest, {
+        "points": [{"name": "India Gate", "latitude": 28.61, "longitude": 77.23}],
+        "routes": [{"path": []}]})
+    second = agent_service._build_initial_state("take me here", {"lat": 1.0, "lng": 2.0}, image)
+
+    parts = second["messages"][0].content
+    assert all(p["type"] == "text" for p in parts)
+    assert "India Gate" in parts[1]["text"]
+
+
+def test_chat_maps_image_errors_to_client_statuses(monkeypatch):
+    monkeypatch.setattr(agent_service, "llm_with_tools", scripted(AIMessage(content="ok")))
+    client = TestClient(app)
+
+    bad = client.post("/chat", json={"query": "where?", "location": {"lat": 1.0, "lng": 2.0}, "image": "%%%"})
+    monkeypatch.setattr(images.settings, "IMAGE_MAX_BYTES", 10)
+    big = client.post("/chat", json={"query": "where?", "location": {"lat": 1.0, "lng": 2.0}, "image": "A" * 100})
+
+    assert bad.status_code == 400
+    assert big.status_code == 413
+
+
+def test_multipart_upload(monkeypatch):
+    pytest.importorskip("python_multipart")
+    monkeypatch.setattr(agent_service, "llm_with_tools", scripted(AIMessage(content="That is a photo.")))
+    monkeypatch.setattr(agent_service, "app_graph", agent_service.setup_agent_graph())
+
+    response = TestClient(app).post("/chat/upload", data={"query": "what is this?", "lat": "1.0", "lng": "2.0"},
+                                    files={"image": ("photo.jpg", _jpeg(2000, 1500), "image/jpeg")})
+
+    assert response.status_code == 200
+    assert response.json()["response_text"] == "That is a photo."
+    assert response.json()["session_id"]
+
+
+def test_stream_prepares_the_photo_off_the_event_loop(monkeypatch):
+    monkeypatch.setattr(agent_service, "llm_with_tools", scripted(AIMessage(content="A photo.")))
+    monkeypatch.setattr(agent_service, "app_graph", agent_service.setup_agent_graph())
+    prepare, on_loop = agent_service._prepare_image, []
+
+    def recording(*args):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return prepare(*args)
+
+    monkeypatch.setattr(agent_service, "_prepare_image", recording)
+    image = base64.b64encode(_jpeg(300, 200)).decode()
+
+    response = TestClient(app).post("/chat/stream", json={"query": "what is this?",
+                                                          "location": {"lat": 1.0, "lng": 2.0}, "image": image})
+
+    assert response.status_code == 200
+    assert on_loop == [False]
+
+
+def test_stream_binds_the_session_where_upstream_calls_are_made(monkeypatch):
+    monkeypatch.setattr(agent_service, "llm_with_tools", scripted(AIMessage(content="Hello.")))
+    monkeypatch.setattr(agent_service, "app_graph", agent_service.setup_agent_graph())
+    acquire, sessions = resilience.Upstream.acquire, []
+
+    def spy(self):
+        sessions.append(resilience._session.get())
+        return acquire(self)
+
+    monkeypatch.setattr(resilience.Upstream, "acquire", spy)
+
+    response = TestClient(app).post("/chat/stream", json={"query": "hi there", "location": {"lat": 1.0, "lng": 2.0},
+                                                          "session_id": "sess-B"})
+
+    assert response.status_code == 200
+    assert sessions and set(sessions) == {"sess-B"}
@@ -0,0 +1,87 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from app.services import agent_service, google_maps, intent_router
+from app.services.intent_router import Intent, classify
+from tests.fakes import scripted
+
+HERE = {"lat": 28.5272, "lng": 77.2159}
+PLACES = {"results": [{"name": "Blue Tokai", "geometry": {"location": {"lat": 28.53, "lng": 77.21}}}]}
+
+
+@pytest.mark.parametrize("query, name, args", [
+    ("AQI here?", "aqi_here", {"lat": 28.5272, "lng": 77.2159}),
+    ("what's the air quality right now", "aqi_here", {"lat": 28.5272, "lng": 77.2159}),
+    ("Air quality in Paris", "aqi_place", {"location_name": "paris"}),
+    ("route to India Gate", "route", {"search_term": "india gate", "search_type": "route"}),
+    ("directions to IGI airport from Saket via Hauz Khas", "route",
+     {"search_term": "igi airport", "origin_override": "saket", "waypoints": "hauz khas"}),
+    ("coffee near me", "nearby", {"search_term": "coffee", "search_type": "nearby"}),
+    ("find a pharmacy nearby", "nearby", {"search_term": "pharmacy"}),
+    ("nearest ATM", "nearby", {"search_term": "atm"}),
+])
+def test_simple_queries_are_classified_confidently(query, name, args):
+    intent = classify(query, HERE)
+
+    assert intent.name == name
+    assert intent.confidence >= intent_router.settings.FAST_PATH_MIN_CONFIDENCE
+    assert args.items() <= intent.args.items()
+
+
+@pytest.mark.parametrize("query", [
+    "how do I get there from here",  # refers to an earlier turn
+    "compare AQI in Delhi and Mumbai",
+    "is it a good day for a run in Lodhi Garden?",
+    "cafes",
+    "weather near me",
+    "what's the weather nearby",
+    "traffic near me",
+    "news nearby",
+    "events near me",
+    "aqi in delhi tomorrow",
+    "directions to home",
+    "how do i get to work",
+    "route to my office",
+])
+def test_ambiguous_or_conversational_queries_fall_back(query):
+    intent = classify(query, HERE)
+
+    assert intent is None or intent.confidence < intent_router.settings.FAST_PATH_MIN_CONFIDENCE
+
+
+def test_registered_classifier_can_outrank_the_rules(monkeypatch):
+    monkeypatch.setattr(intent_router, "_classifiers", list(intent_router._classifiers))
+    intent_router.register_classifier(lambda q, loc: Intent("aqi_here", "get_aqi", {}, 0.99) if "smog" in q else None)
+
+    assert classify("smog near me", HERE).name == "aqi_here"
+
+
+def test_fast_path_answers_without_the_llm_and_keeps_the_session(monkeypatch):
+    model = scripted(AIMessage(content="Glad to help."))
+    monkeypatch.setattr(agent_service, "llm_with_tools", model)
+    monkeypatch.setattr(agent_service, "app_graph", agent_service.setup_agent_graph())
+    monkeypatch.setattr(google_maps, "_afetch_cached", AsyncMock(return_value=PLACES))
+
+    result = asyncio.run(agent_service.ainvoke_agent_service("coffee near me", HERE, session_id="fast"))
+
+    assert "Blue Tokai" in result["response_text"]
+    assert result["map_data"]["points"][0]["name"] == "Blue Tokai"
+    assert model.i == 0  # no LLM call
+
+    followup = asyncio.run(agent_service.ainvoke_agent_service("thanks!", HERE, session_id="fast"))
+    messages = agent_service.app_graph.get_state({"configurable": {"thread_id": "fast"}}).values["messages"]
+    assert followup["response_text"] == "Glad to help."
+    assert [m.type for m in messages] == ["human", "ai", "human", "ai"]
+
+
+def test_tool_miss_falls_back_to_the_agent(monkeypatch):
+    monkeypatch.setattr(agent_service, "llm_with_tools", scripted(AIMessage(content="Try a broader search.")))
+    monkeypatch.setattr(agent_service, "app_graph", agent_service.setup_agent_graph())
+    monkeypatch.setattr(google_maps, "_afetch_cached", AsyncMock(return_value={"results": []}))
+
+    result = asyncio.run(agent_service.ainvoke_agent_service("unicorn stables near me", HERE))
+
+    assert result["response_text"] == "Try a broader search."
@@ -0,0 +1,87 @@
+import asyncio
+import itertools
+import random
+from unittest.mock import AsyncMock, patch
+
+from app.services import itinerary
+from app.services.google_maps import _parse_matrix
+from app.services.itinerary import parse_window, schedule, solve
+
+ROUTE = {"routes": [{"legs": [{"end_location": {"lat": 28.6 + i / 100, "lng": 77.2}} for i in range(3)],
+                     "overview_polyline": {"points": "_p~iF~ps|U_ulLnnqC"}}]}
+
+
+def _matrix(points):
+    """Symmetric travel times (seconds) from 1-D positions."""
+    return [[abs(a - b) * 60 for b in points] for a in points]
+
+
+def test_solver_is_close_to_brute_force_on_small_tours():
+    rng = random.Random(3)
+    ratios = []
+    for _ in range(20):
+        n = 7
+        coords = [(rng.random(), rng.random()) for _ in range(n + 1)]
+        seconds = [[round(((ax - bx) ** 2 + (ay - by) ** 2) ** 0.5 * 3600) for bx, by in coords] for ax, ay in coords]
+        windows = [None] * (n + 1)
+
+        best = min(schedule(list(p), seconds, windows).finish for p in itertools.permutations(range(1, n + 1)))
+        ratios.append(solve(seconds, windows).finish / best)
+
+    assert sum(ratios) / len(ratios) < 1.02
+    assert max(ratios) < 1.15
+
+
+def test_time_windows_reorder_the_tour():
+    # Stop 1 is on the way but only opens later; stop 3 closes soon
+    seconds = _matrix([0, 1, 2, 30])
+    windows = [None, parse_window("11:00-18:00"), None, parse_window("10:00-10:45")]
+
+    plan = solve(seconds, windows, start=10 * 3600, visit=15 * 60)
+
+    assert solve(seconds, start=10 * 3600, visit=15 * 60).order == [1, 2, 3]
+    assert plan.order.index(3) < plan.order.index(1)
+    assert plan.lateness == 0
+
+
+def test_matrix_parse_marks_unreachable_pairs():
+    response = {"rows": [{"elements": [
+        {"status": "OK", "duration": {"value": 60}, "duration_in_traffic": {"value": 90}, "distance": {"value": 500}},
+        {"status": "ZERO_RESULTS"}]}]}
+
+    parsed = _parse_matrix(response, 1, 2)
+
+    assert parsed == {"seconds": [[90, None]], "meters": [[500, None]]}
+    assert "error_message" in _parse_matrix({"rows": []}, 1, 2)
+
+
+def test_plan_makes_one_matrix_and_one_directions_call():
+    seconds = _matrix([0, 5, 1, 3])  # best order: B (1), C (3), A (5)
+    with patch.object(itinerary, "travel_time_matrix", return_value={"seconds": seconds, "meters": seconds}) as m, \
+         patch.object(itinerary, "fetch_directions", return_value=ROUTE) as directions:
+        text, map_data = itinerary.plan_itinerary.func(["A", "B", "C"], 28.6, 77.2)
+
+    m.assert_called_once_with(["28.6,77.2", "A", "B", "C"], ["28.6,77.2", "A", "B", "C"])
+    directions.assert_called_once_with("28.6,77.2", "A", "B|C")
+    assert text.index("**B**") < text.index("**C**") < text.index("**A**")
+    assert [p["name"] for p in map_data["points"]] == ["1. B", "2. C", "3. A"]
+    assert map_data["routes"][0]["polyline"] == ROUTE["routes"][0]["overview_polyline"]["points"]
+
+
+def test_async_round_trip_returns_to_start():
+    seconds = _matrix([0, 5, 1, 3])
+    with patch.object(itinerary, "atravel_time_matrix", AsyncMock(return_value={"seconds": seconds})), \
+         patch.object(itinerary, "afetch_directions", AsyncMock(return_value=ROUTE)) as directions:
+        text, _ = asyncio.run(itinerary.plan_itinerary.coroutine(["A", "B", "C"], 28.6, 77.2, return_to_start=True))
+
+    origin, destination, waypoints = directions.await_args.args
+    assert destination == origin and sorted(waypoints.split("|")) == ["A", "B", "C"]
+    assert "Back at the start" in text
+
+
+def test_too_many_stops_is_refused_without_calls():
+    with patch.object(itinerary, "travel_time_matrix") as m:
+        text, map_data = itinerary.plan_itinerary.func([str(i) for i in range(20)], 28.6, 77.2)
+
+    m.assert_not_called()
+    assert map_data == {} and "up to" in text
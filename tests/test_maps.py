@@ -1,6 +1,19 @@
+import asyncio
+import numpy as np
 import pytest
-from unittest.mock import patch
-from app.services.google_maps import _geocode_address, decode_polyline
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.services.geocoding import clear_geocode_cache
+from app.services import google_maps, polyline
+from app.services.google_maps import _ageocode_address, _geocode_address, decode_polyline
+
+
+@pytest.fixture(autouse=True)
+def fresh_geocode_cache():
+    clear_geocode_cache()
+    google_maps._response_cache.clear()
+    yield
+    clear_geocode_cache()
+    google_maps._response_cache.clear()
 
 
 # --- 1. Testing Logic without APIs ---
@@ -16,10 +29,37 @@ def test_decode_polyline():
     assert result == pytest.approx(expected)
 
 
+def test_decode_array_known_vector():
+    """The three-point example from Google's polyline algorithm documentation."""
+    encoded = "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+    expected = [[38.5, -120.2], [40.7, -120.95], [43.252, -126.453]]
+
+    result = polyline.decode_array(encoded)
+
+    assert result.shape == (3, 2)
+    assert result == pytest.approx(np.array(expected))
+    assert polyline.encode_array(result) == encoded
+
+
+def test_decode_many_matches_single_decodes():
+    encoded = ["_p~iF~ps|U_ulLnnqC_mqNvxq`@", "", "_p~iF~ps|U_ulLnnqC"]
+
+    batch = polyline.decode_many(encoded)
+
+    assert [b.tolist() for b in batch] == [polyline.decode_array(e).tolist() for e in encoded]
+
+
+def test_decode_rejects_truncated_polyline():
+    with pytest.raises(ValueError):
+        polyline.decode_array("_p~iF~ps|U_")
+
+
 # --- 2. Testing API Logic with Mocks ---
-@patch('app.services.google_maps.requests.get')
-def test_geocode_address_success(mock_get):
+@patch('app.services.google_maps.http_client.get')
+def test_geocode_address_success(mock_get, monkeypatch):
     """Test geocoding logic by mocking a successful Google API response."""
+    monkeypatch.setattr(google_maps.settings, "MAPS_MOCK_ENABLED", False)
+    monkeypatch.setattr(google_maps.settings, "MAPS_API_KEY", "key")
     # Mock the internal JSON response from Google
     mock_get.return_value.status_code = 200
     mock_get.return_value.json.return_value = {
@@ -35,11 +75,110 @@ def test_geocode_address_success(mock_get):
     mock_get.assert_called_once()  # Ensure the API was actually "hit"
 
 
-@patch('app.services.google_maps.requests.get')
-def test_geocode_address_failure(mock_get):
+@patch('app.services.google_maps.http_client.get')
+def test_geocode_address_failure(mock_get, monkeypatch):
     """Test how the system handles a 'ZERO_RESULTS' response."""
+    monkeypatch.setattr(google_maps.settings, "MAPS_MOCK_ENABLED", False)
+    monkeypatch.setattr(google_maps.settings, "MAPS_API_KEY", "key")
     mock_get.return_value.status_code = 200
     mock_get.return_value.json.return_value = {"status": "ZERO_RESULTS", "results": []}
 
     result = _geocode_address("NonExistentPlace12345")
-    assert result is None
\ No newline at end of file
+    assert result is None
+
+
+@patch('app.services.google_maps.http_client.aget', new_callable=AsyncMock)
+def test_ageocode_address_uses_shared_async_client(mock_aget, monkeypatch):
+    """The async geocoder goes through the shared client instead of blocking."""
+    monkeypatch.setattr(google_maps.settings, "MAPS_MOCK_ENABLED", False)
+    monkeypatch.setattr(google_maps.settings, "MAPS_API_KEY", "key")
+    mock_aget.return_value = MagicMock()
+    mock_aget.return_value.json.return_value = {
+        "status": "OK",
+        "results": [{"geometry": {"location": {"lat": 1.5, "lng": 2.5}}}]
+    }
+
+    result = asyncio.run(_ageocode_address("Some Famous Landmark"))
+
+    assert result == {"lat": 1.5, "lng": 2.5}
+    mock_aget.assert_awaited_once()
+
+
+# --- 3. Response cache ---
+def test_cache_key_canonicalizes_route_params():
+    """Nearby origins and re-phrased destinations map onto one cache entry."""
+    a = google_maps._cache_key("directions/json", {
+        "origin": "28.52721,77.21594", "destination": "IGI Airport ", "mode": "driving", "key": "k1"})
+    b = google_maps._cache_key("directions/json", {
+        "origin": "28.52738,77.21571", "destination": "igi  airport", "mode": "driving", "key": "k2"})
+
+    assert a == b
+
+
+@patch('app.services.google_maps._fetch_maps_data')
+def test_repeated_place_searches_are_served_from_cache(mock_fetch, monkeypatch):
+    monkeypatch.setattr(google_maps.settings, "MAPS_MOCK_ENABLED", False)
+    mock_fetch.return_value = {"status": "OK", "results": [
+        {"name": "Blue Tokai", "rating": 4.6, "geometry": {"location": {"lat": 28.53, "lng": 77.21}}}]}
+
+    args = {"search_term": "coffee", "latitude": 28.5272, "longitude": 77.2159}
+    first = google_maps.maps_api_search.invoke(args)
+    second = google_maps.maps_api_search.invoke({**args, "search_term": "Coffee"})
+
+    assert "Blue Tokai" in first and "Blue Tokai" in second
+    mock_fetch.assert_called_once()
+    assert google_maps.maps_cache_stats()["hits"] == 1
+
+
+# --- 4. ETA ranking ---
+CANDIDATES = [
+    {"name": "Far Gem", "rating": 4.9, "geometry": {"location": {"lat": 28.60, "lng": 77.30}}},
+    {"name": "Close Dive", "rating": 3.0, "geometry": {"location": {"lat": 28.53, "lng": 77.22}}},
+    {"name": "Close Good", "rating": 4.5, "geometry": {"location": {"lat": 28.53, "lng": 77.21}}},
+    {"name": "No Road", "rating": 5.0, "geometry": {"location": {"lat": 28.40, "lng": 77.10}}},
+]
+
+
+def test_rank_by_eta_filters_by_budget_and_weighs_rating():
+    ranked = google_maps.rank_by_eta(CANDIDATES, [45 * 60, 6 * 60, 9 * 60, None], max_travel_minutes=30)
+
+    assert [place["name"] for place in ranked] == ["Close Good", "Close Dive"]
+    assert ranked[0]["eta_minutes"] == 9
+
+
+def test_time_budget_ranks_all_candidates_with_one_cached_matrix_call(monkeypatch):
+    monkeypatch.setattr(google_maps.settings, "MAPS_MOCK_ENABLED", False)
+    matrix = {"status": "OK", "rows": [{"elements": [
+        {"status": "OK", "duration": {"value": s}, "distance": {"value": s * 10}} for s in (2700, 360, 540)]
+        + [{"status": "ZERO_RESULTS"}]}]}
+
+    def fetch(url, params):
+        return matrix if url.endswith("distancematrix/json") else {"status": "OK", "results": CANDIDATES}
+
+    with patch.object(google_maps, "_fetch_maps_data", side_effect=fetch) as mock_fetch:
+        args = {"search_term": "coffee", "latitude": 28.5272, "longitude": 77.2159, "max_travel_minutes": 30}
+        text, map_data = google_maps._maps_api_search(**args, top_k=1)
+        google_maps._maps_api_search(**{**args, "latitude": 28.52724})  # same origin cell
+
+    matrix_calls = [c for c in mock_fetch.call_args_list if c.args[0].endswith("distancematrix/json")]
+    assert len(matrix_calls) == 1
+    assert matrix_calls[0].args[1]["destinations"].count("|") == len(CANDIDATES) - 1
+    assert map_data["points"] == [{"name": "Close Good", "latitude": 28.53, "longitude": 77.21, "eta_minutes": 9}]
+    assert "9 min drive" in text
+
+
+def test_matrix_failure_falls_back_to_relevance_order(monkeypatch, caplog):
+    monkeypatch.setattr(google_maps.settings, "MAPS_MOCK_ENABLED", False)
+
+    def fetch(url, params):
+        if url.endswith("distancematrix/json"):
+            return {"error_message": "Maps Error: OVER_QUERY_LIMIT"}
+        return {"status": "OK", "results": CANDIDATES}
+
+    with patch.object(google_maps, "_fetch_maps_data", side_effect=fetch):
+        text, map_data = google_maps._maps_api_search("coffee", 28.5272, 77.2159, max_travel_minutes=30)
+
+    assert [p["name"] for p in map_data["points"]] == [c["name"] for c in CANDIDATES]
+    assert "drive times couldn't be checked" in text
+    assert "within 30 minutes" not in text
+    assert "ETA ranking skipped: Maps Error: OVER_QUERY_LIMIT" in caplog.messages
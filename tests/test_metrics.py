@@ -0,0 +1,78 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+
+from app.main import app
+from app.services import agent_service, google_maps, metrics
+from tests.fakes import scripted
+
+HERE = {"lat": 28.5272, "lng": 77.2159}
+PLACES = {"results": [{"name": "Blue Tokai", "geometry": {"location": {"lat": 28.53, "lng": 77.21}}}]}
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("test_render_seconds", "Test histogram.", ("stage",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, stage="a")
+    histogram.observe(0.5, stage="a")
+    histogram.observe(5.0, stage="a")
+
+    lines = histogram.render()
+
+    assert '# TYPE test_render_seconds histogram' in lines
+    assert 'test_render_seconds_bucket{stage="a",le="0.1"} 1' in lines
+    assert 'test_render_seconds_bucket{stage="a",le="1.0"} 2' in lines
+    assert 'test_render_seconds_bucket{stage="a",le="+Inf"} 3' in lines
+    assert 'test_render_seconds_count{stage="a"} 3' in lines
+
+
+def test_spans_build_the_request_breakdown_across_tasks():
+    async def tool():
+        with metrics.span("tool", "lookup"):
+            await asyncio.sleep(0.01)
+
+    async def request():
+        token = metrics.begin_request()
+        await asyncio.gather(tool(), tool())
+        metrics.record_llm_usage("agent", AIMessage(content="ok", usage_metadata={
+            "input_tokens": 120, "output_tokens": 8, "total_tokens": 128}))
+        return metrics.end_request(token)
+
+    timings = asyncio.run(request())
+    header = metrics.server_timing(timings, total=0.05)
+
+    assert timings["tool.lookup"][1] == 2
+    assert timings["tool.lookup"][0] >= 0.02
+    assert 'tool.lookup;dur=' in header and 'desc="x2"' in header
+    assert 'llm_tokens;desc="in=120 out=8"' in header
+    assert metrics.current_timings() == {}  # nothing leaks past the request
+
+
+def test_chat_reports_stage_timings_and_token_metrics(monkeypatch):
+    model = scripted(
+        AIMessage(content="", tool_calls=[{"name": "maps_api_search", "id": "call-1", "args": {
+            "search_term": "coffee", "latitude": 28.5, "longitude": 77.2, "search_type": "nearby"}}],
+            usage_metadata={"input_tokens": 300, "output_tokens": 20, "total_tokens": 320}),
+        AIMessage(content="Try Blue Tokai.", usage_metadata={"input_tokens": 350, "output_tokens": 5,
+                                                             "total_tokens": 355}),
+    )
+    monkeypatch.setattr(agent_service, "llm_with_tools", model)
+    monkeypatch.setattr(agent_service, "app_graph", agent_service.setup_agent_graph())
+    monkeypatch.setattr(google_maps, "_afetch_cached", AsyncMock(return_value=PLACES))
+    tokens_before = metrics.LLM_TOKENS.value(role="agent", direction="in")
+    client = TestClient(app)
+
+    response = client.post("/chat", json={"query": "somewhere for a flat white?", "location": HERE})
+
+    assert response.status_code == 200
+    timing = response.headers["server-timing"]
+    for stage in ("node.agent", "llm.agent", "tool.maps_api_search", "serialize.chat_response", "total"):
+        assert stage in timing
+    assert 'llm_tokens;desc="in=650 out=25"' in timing
+    assert metrics.LLM_TOKENS.value(role="agent", direction="in") - tokens_before == 650
+
+    exposition = client.get("/metrics")
+    assert exposition.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'compassgenie_stage_duration_seconds_count{stage="tool",name="maps_api_search"}' in exposition.text
+    assert 'compassgenie_requests_total{route="/chat",method="POST",status="200"}' in exposition.text
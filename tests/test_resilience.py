@@ -0,0 +1,211 @@
+import asyncio
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.services import aqi_services, google_maps, http_client, resilience
+from app.services.resilience import CircuitOpen, QuotaExceeded, RateLimited, TokenBucket
+
+MAPS_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+READING = {"indexes": [{"code": "ind_cpcb", "aqi": 95, "category": "Satisfactory"}]}
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    """Scripted responses for the pooled sync client, without backoff sleeps or retries."""
+    calls = []
+
+    def install(*statuses):
+        responses = iter(statuses)
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(next(responses), json={"status": "OK"})
+
+        monkeypatch.setattr(http_client, "_client", httpx.Client(transport=httpx.MockTransport(handler)))
+        monkeypatch.setattr(http_client, "backoff_delay", lambda attempt: 0)
+        monkeypatch.setattr(settings, "HTTP_MAX_RETRIES", 0)
+        return calls
+
+    yield install
+    http_client.close_clients()
+
+
+def test_bucket_allows_a_burst_then_asks_callers_to_wait():
+    bucket = TokenBucket(rate=10, burst=3)
+
+    waits = [bucket.reserve(max_wait=1.0) for _ in range(4)]
+
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert 0.05 < waits[3] <= 0.1
+    assert bucket.reserve(max_wait=0.0) is None
+
+
+def test_one_session_cannot_starve_another(monkeypatch):
+    monkeypatch.setattr(settings, "SESSION_RATE_LIMIT", 1.0)
+    monkeypatch.setattr(settings, "SESSION_BURST", 2)
+    monkeypatch.setattr(settings, "RATE_LIMIT_MAX_WAIT_SECONDS", 0.0)
+    resilience.reset()
+
+    resilience.bind_session("chatty")
+    resilience.acquire("maps")
+    resilience.acquire("maps")
+    with pytest.raises(RateLimited):
+        resilience.acquire("maps")
+
+    resilience.bind_session("quiet")
+    resilience.acquire("maps")
+    assert resilience.REJECTIONS.value(upstream="maps", reason="rate_limited") >= 1
+
+
+def test_daily_quota_fails_fast_once_spent(monkeypatch):
+    monkeypatch.setattr(settings, "UPSTREAM_DAILY_QUOTAS", {"air_quality": 2})
+    resilience.reset()
+
+    resilience.acquire("air_quality")
+    resilience.acquire("air_quality")
+    with pytest.raises(QuotaExceeded) as raised:
+        resilience.acquire("air_quality")
+
+    assert raised.value.retry_after > 0
+    assert "compassgenie_upstream_quota_used{upstream=\"air_quality\"} 2" in TestClient(app).get("/metrics").text
+
+
+def test_circuit_opens_after_failures_then_recovers_through_one_trial(transport, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "CIRCUIT_FAILURE_THRESHOLD", 3)
+    resilience.reset()
+    calls = transport(503, 503, 503, 200)
+
+    for _ in range(3):
+        assert http_client.get(MAPS_URL).status_code == 503
+    with pytest.raises(CircuitOpen):
+        http_client.get(MAPS_URL)
+    assert len(calls) == 3  # rejected without touching the network
+
+    breaker = resilience.upstreams["maps"].breaker
+    with patch.object(resilience.time, "monotonic", return_value=breaker.opened_at + settings.CIRCUIT_RESET_SECONDS):
+        assert http_client.get(MAPS_URL).status_code == 200  # the single half-open trial
+    assert breaker.state == breaker.CLOSED and len(calls) == 4
+    assert "Circuit for maps opened after 3 consecutive failures." in caplog.messages
+
+
+def test_half_open_circuit_lets_one_trial_through_at_a_time():
+    breaker = resilience.CircuitBreaker(failure_threshold=1, reset_seconds=10)
+    breaker.record_failure()
+
+    with patch.object(resilience.time, "monotonic", return_value=breaker.opened_at + 10):
+        assert breaker.allow()
+        assert not breaker.allow()
+        breaker.record_failure()  # trial failed: open again
+    assert breaker.state == breaker.OPEN
+
+
+class ClientError(Exception):
+    code = 400
+
+
+def _open_until_trial(name: str):
+    """Opens `name`'s circuit as if its reset time had passed: the next call is the half-open trial."""
+    breaker = resilience.upstreams[name].breaker
+    breaker.failure_threshold = 1
+    breaker.record_failure()
+    breaker.opened_at -= breaker.reset_seconds
+
+
+def test_half_open_trial_that_raises_a_client_error_closes_the_circuit():
+    _open_until_trial("gemini")
+    with pytest.raises(ClientError):
+        with resilience.guard("gemini"):
+            raise ClientError("bad request")
+    with resilience.guard("gemini"):
+        pass  # not stuck behind the first trial
+
+    assert resilience.upstreams["gemini"].breaker.state == "closed"
+
+
+def test_calls_without_a_verdict_release_the_trial_and_never_open_the_circuit():
+    async def timed_out():
+        async with resilience.aguard("gemini"):
+            await asyncio.wait_for(asyncio.sleep(1), timeout=0.001)
+
+    async def cancelled():
+        async with resilience.aguard("gemini"):
+            raise asyncio.CancelledError
+
+    for _ in range(settings.CIRCUIT_FAILURE_THRESHOLD + 1):
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(timed_out())
+    assert resilience.upstreams["gemini"].breaker.state == "closed"
+
+    _open_until_trial("gemini")
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(cancelled())
+    assert resilience.upstreams["gemini"].breaker.allow()  # the trial was released
+
+
+def test_cancelled_http_trial_releases_the_circuit(monkeypatch):
+    async def hang(request):
+        await asyncio.sleep(1)
+
+    monkeypatch.setattr(http_client, "_async_client", httpx.AsyncClient(transport=httpx.MockTransport(hang)))
+
+    async def cancelled_trial():
+        task = asyncio.create_task(http_client.aget(MAPS_URL))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    _open_until_trial("maps")
+    asyncio.run(cancelled_trial())
+    assert resilience.upstreams["maps"].breaker.allow()
+
+
+def test_client_errors_do_not_open_the_circuit(transport, monkeypatch):
+    monkeypatch.setattr(settings, "CIRCUIT_FAILURE_THRESHOLD", 2)
+    resilience.reset()
+    transport(400, 400, 400)
+
+    for _ in range(3):
+        assert http_client.get(MAPS_URL).status_code == 400
+
+    assert resilience.upstreams["maps"].breaker.state == "closed"
+
+
+def test_expired_maps_entry_is_served_while_upstream_fails(monkeypatch):
+    monkeypatch.setattr(settings, "MAPS_MOCK_ENABLED", False)
+    params = {"query": "stale cafe"}
+    key = google_maps._cache_key("place/textsearch/json", params)
+    google_maps._response_cache.set(key, {"results": [{"name": "Old Cafe"}]}, ttl=-1)
+    monkeypatch.setattr(google_maps, "_fetch_maps_data",
+                        lambda url, params: {"error_message": "maps: circuit open"})
+
+    data = google_maps._fetch_cached("place/textsearch/json", params)
+
+    assert data == {"results": [{"name": "Old Cafe"}]}
+    assert resilience.STALE_SERVED.value(cache="maps") >= 1
+
+
+def test_aqi_falls_back_to_a_stale_reading_when_rejected():
+    aqi_services._aqi_cache.set(aqi_services.aqi_cell(12.97, 77.59), READING, ttl=-1)
+
+    with patch("app.services.aqi_services.http_client.post", side_effect=CircuitOpen("air_quality", "open", 20)):
+        answer = aqi_services.get_aqi.invoke({"lat": 12.97, "lng": 77.59})
+
+    assert "**AQI:** 95 (Satisfactory)" in answer
+
+
+def test_chat_returns_503_with_retry_after_when_the_llm_circuit_is_open(monkeypatch):
+    monkeypatch.setattr(settings, "FAST_PATH_ENABLED", False)
+    breaker = resilience.upstreams["gemini"].breaker
+    for _ in range(settings.CIRCUIT_FAILURE_THRESHOLD):
+        breaker.record_failure()
+
+    response = TestClient(app).post("/chat", json={"query": "plan my evening", "location": {"lat": 1.0, "lng": 2.0}})
+
+    assert response.status_code == 503
+    assert 1 <= int(response.headers["retry-after"]) <= settings.CIRCUIT_RESET_SECONDS
@@ -0,0 +1,118 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+
+from app.main import app
+from app.services import agent_service, google_maps, response_cache
+from app.services.response_cache import HashingEmbedder, canonical_query, lookup, store
+from tests.fakes import scripted
+
+HERE = {"lat": 28.5272, "lng": 77.2159}
+NEXT_DOOR = {"lat": 28.5275, "lng": 77.2161}
+ACROSS_TOWN = {"lat": 28.6139, "lng": 77.2090}
+ANSWER = {"response_text": "Blue Tokai is close.", "map_data": {"points": [{"name": "Blue Tokai"}]}}
+
+
+def test_canonical_query_folds_phrasing_and_plurals():
+    assert canonical_query("Cafes nearby?") == canonical_query("cafe near me") == "cafe near me"
+    assert canonical_query("glass shops") == "glass shop"
+
+
+def test_hits_are_per_location_cell():
+    store("coffee near me", HERE, ANSWER)
+
+    assert lookup("Coffee nearby", NEXT_DOOR)["response_text"] == ANSWER["response_text"]
+    assert lookup("coffee near me", ACROSS_TOWN) is None
+
+
+def test_similar_queries_hit_through_the_embedder():
+    store("coffee shops near me", HERE, ANSWER)
+
+    hit = lookup("coffe shop near me", HERE)
+    assert hit and hit["cached"]
+    assert response_cache.response_cache_stats()["semantic_hits"] == 1
+    assert lookup("petrol pump near me", HERE) is None
+
+
+def test_near_miss_routes_and_places_are_not_served_from_similar_queries():
+    store("route to delhi airport terminal 1", HERE, ANSWER)
+    store("route to gate 2", HERE, ANSWER)
+    store("aqi in noida sector 18", HERE, ANSWER)
+
+    assert lookup("route to delhi airport terminal 3", HERE) is None
+    assert lookup("route to gate 7", HERE) is None
+    assert lookup("aqi in noida sector 62", HERE) is None
+    assert lookup("the route to gate 2", HERE)  # same destination, other phrasing
+    assert response_cache.response_cache_stats()["semantic_hits"] == 1
+
+
+def test_general_questions_are_only_served_on_an_exact_match():
+    store("What's the weather in Paris?", HERE, ANSWER, new_session=True)
+
+    assert lookup("What's the weather in Parma?", HERE, new_session=True) is None
+    assert lookup("weather in perth", HERE, new_session=True) is None
+    assert lookup("what's the weather in paris", HERE, new_session=True)
+
+
+def test_similarity_index_never_outgrows_the_cache(monkeypatch):
+    monkeypatch.setattr(response_cache._cache, "maxsize", 50)
+    rng = np.random.default_rng(0)
+
+    for i in range(500):
+        store(f"cafe {i} near me", {"lat": float(rng.uniform(-80, 80)), "lng": float(rng.uniform(-170, 170))}, ANSWER)
+
+    indexed = sum(len(bucket) for bucket in response_cache._index.values())
+    assert len(response_cache._cache) == 50
+    assert indexed <= len(response_cache._cache) and len(response_cache._index) <= 50
+
+
+def test_pluggable_embedder(monkeypatch):
+    class SameVector:
+        def embed(self, texts):
+            return np.ones((len(texts), 4)) / 2.0
+
+    response_cache.set_embedder(SameVector())
+    try:
+        store("coffee near me", HERE, ANSWER)
+        assert lookup("bookstore near me", HERE)  # everything looks alike to this embedder
+    finally:
+        response_cache.set_embedder(HashingEmbedder())
+
+
+def test_ttl_depends_on_intent_kind():
+    with patch("app.services.cache.time.monotonic", return_value=1000.0):
+        store("aqi here", HERE, ANSWER)
+        store("pharmacy near me", HERE, ANSWER)
+
+    with patch("app.services.cache.time.monotonic", return_value=1000.0 + 20 * 60):
+        assert lookup("aqi here", HERE) is None  # past the 15 minute AQI TTL
+        assert lookup("pharmacy near me", HERE)  # places keep for an hour
+
+
+def test_contextual_and_continuing_conversation_queries_are_not_cached():
+    store("how do I get there", HERE, ANSWER)
+    store("is it raining in pune", HERE, ANSWER, new_session=False)
+    store("what's the weather in pune", HERE, ANSWER, new_session=True)
+
+    assert lookup("how do I get there", HERE) is None
+    assert lookup("what's the weather in pune", HERE, new_session=False) is None
+    assert lookup("what's the weather in pune", HERE, new_session=True)
+
+
+def test_repeated_question_skips_the_agent_and_reports_metrics(monkeypatch):
+    model = scripted(AIMessage(content="It is sunny in Pune."), AIMessage(content="Asked the model twice."))
+    monkeypatch.setattr(agent_service, "llm_with_tools", model)
+    monkeypatch.setattr(agent_service, "app_graph", agent_service.setup_agent_graph())
+    monkeypatch.setattr(google_maps, "_afetch_cached", AsyncMock())
+
+    first = asyncio.run(agent_service.ainvoke_agent_service("weather in Pune today", HERE))
+    second = asyncio.run(agent_service.ainvoke_agent_service("Weather in Pune today?", NEXT_DOOR))
+
+    assert first["response_text"] == second["response_text"] == "It is sunny in Pune."
+    assert first["session_id"] != second["session_id"]
+
+    stats = TestClient(app).get("/cache/stats").json()
+    assert stats["responses"]["hits"] == 1
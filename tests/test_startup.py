@@ -0,0 +1,79 @@
+import os
+import subprocess
+import sys
+from unittest.mock import AsyncMock
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import create_app
+from app.services import agent_service, geocoding, health, http_client
+from app.services.cache import MISSING
+from app.services.health import HealthChecker
+
+SEEDS = ["India Gate, New Delhi", "Qutub Minar, New Delhi"]
+GEOCODED = {"status": "OK", "results": [{"geometry": {"location": {"lat": 28.61, "lng": 77.23}}}]}
+
+
+@pytest.fixture
+def startup(monkeypatch):
+    """The lifespan against a scripted Maps transport and stub probes; records readiness during warm-up."""
+    probes = {name: AsyncMock(return_value=(True, "")) for name in ("maps", "air_quality", "gemini")}
+    monkeypatch.setattr(health, "checker", HealthChecker(probes))
+    monkeypatch.setattr(agent_service, "app_graph", agent_service.app_graph)  # restored after the lifespan
+    monkeypatch.setattr(settings, "MAPS_MOCK_ENABLED", False)
+    monkeypatch.setattr(settings, "GEMINI_API_KEY", "key")
+    monkeypatch.setattr(settings, "HEALTH_CHECK_ENABLED", False)
+    monkeypatch.setattr(settings, "WARMUP_GEOCODE_SEEDS", SEEDS)
+    geocoding.clear_geocode_cache()
+    ready_during_warmup = []
+
+    def install(handler):
+        def recording(request):
+            ready_during_warmup.append(health.checker.ready())
+            return handler(request)
+
+        monkeypatch.setattr(http_client, "_async_client",
+                            httpx.AsyncClient(transport=httpx.MockTransport(recording)))
+        return ready_during_warmup
+
+    yield install
+    geocoding.clear_geocode_cache()
+
+
+def test_import_does_not_build_the_llm_or_print():
+    code = "import sys, app.main; print(sorted(m for m in ('langchain_google_genai', 'google.genai') if m in sys.modules))"
+    env = {**os.environ, "GEMINI_API_KEY": "", "MAPS_API_KEY": "YOUR_MAPS_API_KEY_HERE"}
+
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)
+
+    assert result.stdout == "[]\n"
+
+
+def test_warm_up_fills_the_geocode_cache_before_ready(startup):
+    ready_during_warmup = startup(lambda request: httpx.Response(200, json=GEOCODED))
+    app = create_app()
+
+    with TestClient(app) as client:
+        assert client.get("/readyz").status_code == 200
+
+    assert app.state.warmup["geocoded"] == len(SEEDS)
+    assert ready_during_warmup and not any(ready_during_warmup)
+    assert all(geocoding._cached(geocoding.normalize_address(seed)) is not MISSING for seed in SEEDS)
+    assert health.checker.probes["maps"].await_count == 0  # the seeds already showed Maps healthy
+    assert health.checker.probes["gemini"].await_count == 1
+
+
+def test_failing_warm_up_does_not_block_startup(startup):
+    def unreachable(request):
+        raise httpx.ConnectError("no route to host")
+
+    startup(unreachable)
+    app = create_app()
+
+    with TestClient(app) as client:
+        assert client.get("/livez").status_code == 200
+
+    assert app.state.warmup["geocoded"] == 0
@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+from langchain_core.messages import AIMessage
+from langchain_core.tools import StructuredTool
+
+from app.core.config import settings
+from app.services.tool_executor import ToolExecutor
+
+
+def _slow_tool(name: str, delay: float) -> StructuredTool:
+    def run(city: str) -> str:
+        time.sleep(delay)
+        return f"{name}:{city}"
+
+    async def arun(city: str) -> str:
+        await asyncio.sleep(delay)
+        return f"{name}:{city}"
+
+    return StructuredTool.from_function(func=run, coroutine=arun, name=name, description=name)
+
+
+def _state(*calls):
+    return {"messages": [AIMessage(content="", tool_calls=[
+        {"name": name, "args": {"city": city}, "id": f"call-{i}"} for i, (name, city) in enumerate(calls)])]}
+
+
+def test_async_calls_run_concurrently_and_keep_order():
+    executor = ToolExecutor([_slow_tool("aqi", 0.2)])
+    state = _state(("aqi", "Delhi"), ("aqi", "Mumbai"), ("aqi", "Pune"))
+
+    start = time.perf_counter()
+    result = asyncio.run(executor.ainvoke(state, {}))
+
+    assert time.perf_counter() - start < 0.5
+    assert [m.content for m in result["messages"]] == ["aqi:Delhi", "aqi:Mumbai", "aqi:Pune"]
+    assert [m.tool_call_id for m in result["messages"]] == ["call-0", "call-1", "call-2"]
+
+
+def test_sync_calls_run_concurrently(monkeypatch):
+    executor = ToolExecutor([_slow_tool("aqi", 0.2)])
+
+    start = time.perf_counter()
+    result = executor.invoke(_state(("aqi", "Delhi"), ("aqi", "Mumbai")), {})
+
+    assert time.perf_counter() - start < 0.35
+    assert len(result["messages"]) == 2
+
+
+def test_concurrency_limit_and_timeouts(monkeypatch):
+    monkeypatch.setattr(settings, "TOOL_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(settings, "TOOL_TIMEOUTS", {"slow": 0.05})
+    executor = ToolExecutor([_slow_tool("fast", 0.1), _slow_tool("slow", 1.0)])
+
+    start = time.perf_counter()
+    result = asyncio.run(executor.ainvoke(_state(("fast", "A"), ("fast", "B"), ("slow", "C")), {}))
+    elapsed = time.perf_counter() - start
+
+    assert 0.2 <= elapsed < 0.6  # serialized by the limit, slow call cut off
+    assert result["messages"][2].status == "error"
+    assert "timed out" in result["messages"][2].content
+
+
+def test_sync_single_call_is_timed_out(monkeypatch):
+    monkeypatch.setattr(settings, "TOOL_TIMEOUTS", {"slow": 0.05})
+    executor = ToolExecutor([_slow_tool("slow", 0.5)])
+
+    start = time.perf_counter()
+    result = executor.invoke(_state(("slow", "A")), {})
+
+    assert time.perf_counter() - start < 0.3
+    assert result["messages"][0].status == "error"
+    assert "timed out" in result["messages"][0].content
+
+
+def test_sync_timeouts_run_from_a_common_start(monkeypatch):
+    monkeypatch.setattr(settings, "TOOL_TIMEOUTS", {"slow": 0.2, "hung": 0.2})
+    executor = ToolExecutor([_slow_tool("slow", 1.0), _slow_tool("hung", 1.0)])
+
+    start = time.perf_counter()
+    result = executor.invoke(_state(("slow", "A"), ("hung", "B")), {})
+
+    assert time.perf_counter() - start < 0.35  # the largest timeout, not their sum
+    assert [m.status for m in result["messages"]] == ["error", "error"]
+
+
+def test_unknown_tool_becomes_error_message():
+    result = ToolExecutor([]).invoke(_state(("missing", "X")), {})
+
+    assert result["messages"][0].status == "error"
+
+
+def test_map_artifacts_are_lifted_into_state_and_stripped_from_messages():
+    def run(city: str):
+        return f"Found {city}", {"points": [{"name": city, "latitude": 1.0, "longitude": 2.0}]}
+
+    tool = StructuredTool.from_function(func=run, name="maps", description="maps",
+                                        response_format="content_and_artifact")
+    result = ToolExecutor([tool]).invoke(_state(("maps", "Delhi"), ("maps", "Pune")), {})
+
+    assert [m.content for m in result["messages"]] == ["Found Delhi", "Found Pune"]
+    assert all(m.artifact is None for m in result["messages"])
+    assert result["map_data"]["points"][0]["name"] == "Pune"
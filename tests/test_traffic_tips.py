@@ -0,0 +1,112 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import MagicMock
+
+from app.core.config import settings
+from app.services import budget, llm as llm_client, traffic_tips
+
+
+class SlowLLM:
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        time.sleep(self.delay)
+        return MagicMock(content="* Avoid the ring road at 6pm.")
+
+    async def ainvoke(self, prompt):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return MagicMock(content="* Avoid the ring road at 6pm.")
+
+
+@pytest.fixture(autouse=True)
+def fresh_tip_cache():
+    traffic_tips._tip_cache.clear()
+    yield
+    traffic_tips._tip_cache.clear()
+
+
+def test_off_mode_never_calls_the_llm(monkeypatch):
+    llm = SlowLLM(0)
+    monkeypatch.setattr(llm_client, "_llm", llm)
+    monkeypatch.setattr(settings, "TRAFFIC_TIP_MODE", "off")
+
+    assert traffic_tips.start_tip("Home", "Airport").result() == traffic_tips.DEFAULT_TIP
+    assert llm.calls == 0
+
+
+def test_concurrent_mode_is_bounded_by_budget_then_cached(monkeypatch):
+    llm = SlowLLM(0.3)
+    monkeypatch.setattr(llm_client, "_llm", llm)
+    monkeypatch.setattr(settings, "TRAFFIC_TIP_MODE", "concurrent")
+    monkeypatch.setattr(settings, "TRAFFIC_TIP_TIMEOUT_SECONDS", 0.05)
+
+    async def scenario():
+        start = time.perf_counter()
+        first = await traffic_tips.astart_tip("Home", "Airport").result()
+        waited = time.perf_counter() - start
+        await asyncio.sleep(0.4)  # the tip finishes in the background
+        second = await traffic_tips.astart_tip("home", "airport").result()
+        return first, waited, second
+
+    first, waited, second = asyncio.run(scenario())
+
+    assert first == traffic_tips.DEFAULT_TIP
+    assert waited < 0.2
+    assert second == "* Avoid the ring road at 6pm."
+    assert llm.calls == 1
+
+
+def test_deferred_mode_fills_cache_for_next_request(monkeypatch):
+    llm = SlowLLM(0)
+    monkeypatch.setattr(llm_client, "_llm", llm)
+    monkeypatch.setattr(settings, "TRAFFIC_TIP_MODE", "deferred")
+
+    assert traffic_tips.start_tip("Home", "Airport").result() == traffic_tips.DEFAULT_TIP
+    traffic_tips._pool.submit(lambda: None).result()  # drain the background generation
+    time.sleep(0.05)
+    assert traffic_tips.start_tip("Home", "Airport").result() == "* Avoid the ring road at 6pm."
+
+
+def test_cancelling_the_only_waiter_cancels_the_llm_call(monkeypatch):
+    llm = SlowLLM(1.0)
+    monkeypatch.setattr(llm_client, "_llm", llm)
+    monkeypatch.setattr(settings, "TRAFFIC_TIP_MODE", "concurrent")
+
+    async def scenario():
+        shared = traffic_tips.astart_tip("Home", "Airport")
+        other = traffic_tips.astart_tip("Home", "Airport")
+        await asyncio.sleep(0.01)
+        shared.cancel()
+        await asyncio.sleep(0.01)
+        still_running = bool(traffic_tips._tip_flights._tasks)
+        other.cancel()
+        await asyncio.sleep(0.01)
+        return still_running, bool(traffic_tips._tip_flights._tasks)
+
+    still_running, running_after = asyncio.run(scenario())
+
+    assert still_running  # the second route still waited on the shared call
+    assert not running_after
+    assert traffic_tips._tip_cache.get(("home", "airport")) is traffic_tips.MISSING
+
+
+def test_sync_tip_runs_in_the_callers_context(monkeypatch):
+    seen = []
+
+    class RecordingLLM(SlowLLM):
+        def invoke(self, prompt):
+            seen.append(budget.current())
+            return super().invoke(prompt)
+
+    monkeypatch.setattr(llm_client, "_llm", RecordingLLM(0))
+    monkeypatch.setattr(settings, "TRAFFIC_TIP_MODE", "concurrent")
+    budget.start()
+
+    traffic_tips.start_tip("Home", "Airport").result()
+
+    assert seen == [budget.current()] and seen[0] is not None